@@ -0,0 +1,11 @@
+"""Microbenchmarks for the AI Code Task hot paths.
+
+Run from the repository root (Home Assistant must be installed)::
+
+    python -m benchmarks                 # full scales, JSON on stdout
+    python -m benchmarks --quick         # small scales, for a smoke run
+    python -m benchmarks -k prompt -o results.json
+
+``python -m benchmarks.corpus`` checks the response parser against the
+checked-in provider outputs in ``corpus/responses``.
+"""
@@ -0,0 +1,92 @@
+"""Benchmark runner: times every case and prints the results as JSON."""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+from datetime import datetime, timezone
+import json
+import os
+import platform
+import sys
+import tempfile
+from typing import Any
+
+from homeassistant.core import HomeAssistant
+
+from . import bench_history, bench_prompt, bench_response
+from .harness import BenchContext, run_case
+
+MODULES = (bench_prompt, bench_response, bench_history)
+MANIFEST = os.path.join(
+    os.path.dirname(__file__),
+    "..",
+    "custom_components",
+    "ai_code_task",
+    "manifest.json",
+)
+
+
+def _parse_args(argv: list[str] | None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__)
+    parser.add_argument("--quick", action="store_true", help="small scales only")
+    parser.add_argument(
+        "-k", dest="keyword", default="", help="only run cases whose group/name match"
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="timed rounds per case")
+    parser.add_argument(
+        "--target", type=float, default=0.1, help="seconds per timed round"
+    )
+    parser.add_argument("-o", "--output", help="write the JSON results to a file")
+    return parser.parse_args(argv)
+
+
+def _metadata(args: argparse.Namespace) -> dict[str, Any]:
+    with open(MANIFEST, encoding="utf-8") as file:
+        version = json.load(file).get("version")
+    return {
+        "version": version,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "quick": args.quick,
+        "repeat": args.repeat,
+    }
+
+
+async def _async_main(args: argparse.Namespace) -> dict[str, Any]:
+    results = []
+    with tempfile.TemporaryDirectory(prefix="ai_code_task_bench_") as config_dir:
+        hass = HomeAssistant(config_dir)
+        ctx = BenchContext(quick=args.quick, hass=hass)
+        try:
+            for module in MODULES:
+                for case in module.cases(ctx):
+                    if args.keyword not in f"{case.group}.{case.name}":
+                        continue
+                    result = await run_case(case, args.repeat, args.target)
+                    print(
+                        f"{case.group}.{case.name} {case.params}: "
+                        f"{result['median_ms']:.4f} ms",
+                        file=sys.stderr,
+                    )
+                    results.append(result)
+        finally:
+            await hass.async_stop(force=True)
+    return {"meta": _metadata(args), "results": results}
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Run the benchmarks and emit the JSON report."""
+    args = _parse_args(argv)
+    report = asyncio.run(_async_main(args))
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
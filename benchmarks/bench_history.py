@@ -0,0 +1,75 @@
+"""ChatHistoryService save/load at growing history sizes and user counts."""
+
+from __future__ import annotations
+
+from collections.abc import Iterator
+import random
+
+from custom_components.ai_code_task.helpers.chat_history import ChatHistoryService
+
+from . import synthetic
+from .harness import BenchContext, Case
+
+GROUP = "history"
+STORAGE_PATH = "ai_code_task_bench"
+
+
+async def _async_fill(service: ChatHistoryService, user_id: str, count: int) -> None:
+    """Save count messages (count / 2 exchanges) for a user."""
+    messages = synthetic.history(random.Random(user_id), count)
+    for user_msg, assistant_msg in zip(messages[::2], messages[1::2]):
+        await service.save_exchange_async(
+            user_id, user_msg["data"], assistant_msg["data"]
+        )
+
+
+def _save_case(ctx: BenchContext, existing: int) -> Case:
+    service = ChatHistoryService(ctx.hass, f"{STORAGE_PATH}/save_{existing}")
+    exchange = synthetic.history(random.Random(1), 2)
+
+    async def setup() -> None:
+        await service.async_load()
+        await _async_fill(service, "user", existing)
+
+    async def save() -> None:
+        await service.save_exchange_async(
+            "user", exchange[0]["data"], exchange[1]["data"]
+        )
+
+    return Case(GROUP, "save_exchange", {"existing_messages": existing}, save, setup)
+
+
+def _load_cases(ctx: BenchContext, users: int, messages: int) -> Iterator[Case]:
+    storage_path = f"{STORAGE_PATH}/load_{users}_{messages}"
+    user_ids = [f"user_{index}" for index in range(users)]
+    params = {"users": users, "messages": messages}
+    warm = ChatHistoryService(ctx.hass, storage_path)
+
+    async def setup() -> None:
+        writer = ChatHistoryService(ctx.hass, storage_path)
+        await writer.async_load()
+        for user_id in user_ids:
+            await _async_fill(writer, user_id, messages)
+        await warm.async_load()
+
+    async def load_cold() -> None:
+        # A new service has an empty cache: every shard comes from disk
+        service = ChatHistoryService(ctx.hass, storage_path)
+        for user_id in user_ids:
+            await service.load_history(user_id, limit=messages)
+
+    async def load_warm() -> None:
+        for user_id in user_ids:
+            await warm.load_history(user_id, limit=messages)
+
+    yield Case(GROUP, "load_history_cold", params, load_cold, setup)
+    yield Case(GROUP, "load_history_warm", params, load_warm)
+
+
+def cases(ctx: BenchContext) -> Iterator[Case]:
+    """Yield the history cases."""
+    for existing in ctx.scale([0, 50, 240], [0, 50]):
+        yield _save_case(ctx, existing)
+    for users in ctx.scale([1, 10, 100], [1, 10]):
+        for messages in ctx.scale([20, 200], [20]):
+            yield from _load_cases(ctx, users, messages)
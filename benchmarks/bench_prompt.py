@@ -0,0 +1,68 @@
+"""PromptBuilder.build_conversation_context at growing scales."""
+
+from __future__ import annotations
+
+from collections.abc import Iterator
+import random
+
+from custom_components.ai_code_task.helpers.prompt_builder import (
+    PromptBuilder,
+    render_history_fragments,
+)
+
+from . import synthetic
+from .harness import BenchContext, Case
+
+GROUP = "prompt"
+
+# Scale axes; each one is varied while the others stay at the baseline
+BASELINE = {"history": 20, "code_kb": 10, "attachments": 0}
+
+
+def _case(builder: PromptBuilder, system_prompt: str, **params: int) -> Case:
+    rng = random.Random(0)
+    history = synthetic.history(rng, params["history"])
+    for msg in history:
+        # The history service caches the fragments on load
+        msg["fragments"] = render_history_fragments(msg["role"], msg["data"])
+    code_context = synthetic.code(rng, params["code_kb"] * 1024)
+    attachments = synthetic.attachments(rng, params["attachments"])
+    prompt = synthetic.text(rng, 300)
+
+    def build() -> str:
+        return builder.build_conversation_context(
+            system_prompt=system_prompt,
+            history_messages=history,
+            user_prompt=prompt,
+            code_context=code_context,
+            file_path="/config/automations.yaml",
+            attachments=attachments,
+        )
+
+    return Case(
+        GROUP,
+        "build_conversation_context",
+        params,
+        build,
+        extra={"prompt_chars": len(build())},
+    )
+
+
+def cases(ctx: BenchContext) -> Iterator[Case]:
+    """Yield the prompt building cases."""
+    builder = PromptBuilder({})
+    system_prompt = builder.build_system_prompt()
+    axes = {
+        "history": ctx.scale([0, 20, 100, 500], [0, 20]),
+        "code_kb": ctx.scale([0, 10, 100, 1000], [0, 10]),
+        "attachments": ctx.scale([0, 5, 20], [0, 5]),
+    }
+    seen = set()
+    for axis, values in axes.items():
+        for value in values:
+            params = {**BASELINE, axis: value}
+            key = tuple(sorted(params.items()))
+            if key in seen:
+                continue
+            seen.add(key)
+            yield _case(builder, system_prompt, **params)
@@ -0,0 +1,58 @@
+"""parse_structured_response over response formats and sizes."""
+
+from __future__ import annotations
+
+from collections.abc import Iterator
+import random
+
+from custom_components.ai_code_task.helpers.response import (
+    PartialResponseParser,
+    parse_structured_response,
+)
+
+from . import synthetic
+from .corpus import load_responses
+from .harness import BenchContext, Case
+
+GROUP = "response"
+# Typical size of a streamed provider chunk
+STREAM_CHUNK_CHARS = 32
+
+
+def _stream(raw: str) -> None:
+    """Decode a response fed in stream-sized chunks."""
+    parser = PartialResponseParser()
+    for start in range(0, len(raw), STREAM_CHUNK_CHARS):
+        parser.feed(raw[start : start + STREAM_CHUNK_CHARS])
+
+
+def cases(ctx: BenchContext) -> Iterator[Case]:
+    """Yield the response parsing cases."""
+    # Real-world shapes from the checked-in corpus
+    for name, raw in load_responses().items():
+        yield Case(
+            GROUP,
+            "parse_structured_response",
+            {"corpus": name.removesuffix(".txt")},
+            lambda raw=raw: parse_structured_response(raw),
+            extra={"input_chars": len(raw)},
+        )
+    for fmt in synthetic.RESPONSE_FORMATS:
+        for code_kb in ctx.scale([1, 10, 100, 500], [1, 10]):
+            raw = synthetic.response(random.Random(0), fmt, code_kb * 1024)
+            yield Case(
+                GROUP,
+                "parse_structured_response",
+                {"format": fmt, "code_kb": code_kb},
+                lambda raw=raw: parse_structured_response(raw),
+                extra={"input_chars": len(raw)},
+            )
+    for code_kb in ctx.scale([1, 10, 100], [1, 10]):
+        raw = synthetic.response(random.Random(0), "json", code_kb * 1024)
+        yield Case(
+            GROUP,
+            "partial_response_stream",
+            {"code_kb": code_kb, "chunk_chars": STREAM_CHUNK_CHARS},
+            lambda raw=raw: _stream(raw),
+            extra={"input_chars": len(raw)},
+        )
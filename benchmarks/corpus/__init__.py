@@ -0,0 +1,46 @@
+"""Checked-in corpus of provider outputs.
+
+``responses/`` holds raw outputs in the shapes providers actually produce
+(strict JSON, fenced JSON, JSON in prose, malformed JSON, prose with code
+blocks). ``responses/expected.json`` has the result of
+``parse_structured_response`` for each of them; long fields are stored as
+a sha256 digest and length.
+
+Check the parser against it with ``python -m benchmarks.corpus``.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from typing import Any
+
+RESPONSES_DIR = os.path.join(os.path.dirname(__file__), "responses")
+EXPECTED_FILE = os.path.join(RESPONSES_DIR, "expected.json")
+
+
+def load_responses() -> dict[str, str]:
+    """Return the raw provider outputs by file name."""
+    responses = {}
+    for name in sorted(os.listdir(RESPONSES_DIR)):
+        if name.endswith(".txt"):
+            with open(os.path.join(RESPONSES_DIR, name), encoding="utf-8") as file:
+                responses[name] = file.read()
+    return responses
+
+
+def load_expected() -> dict[str, dict[str, Any]]:
+    """Return the expected parse result of every output."""
+    with open(EXPECTED_FILE, encoding="utf-8") as file:
+        return json.load(file)
+
+
+def matches(expected: str | dict[str, Any], actual: str) -> bool:
+    """Compare a parsed field with its expected value or digest."""
+    if isinstance(expected, str):
+        return expected == actual
+    return (
+        len(actual) == expected["length"]
+        and hashlib.sha256(actual.encode("utf-8")).hexdigest() == expected["sha256"]
+    )
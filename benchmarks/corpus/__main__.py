@@ -0,0 +1,36 @@
+"""Check parse_structured_response against the response corpus."""
+
+from __future__ import annotations
+
+import sys
+
+from custom_components.ai_code_task.helpers.response import (
+    parse_structured_response,
+)
+
+from . import load_expected, load_responses, matches
+
+
+def main() -> int:
+    """Parse every corpus output and report the mismatches."""
+    expected = load_expected()
+    failures = 0
+    for name, raw in load_responses().items():
+        if name not in expected:
+            print(f"MISSING {name}: no expected result")
+            failures += 1
+            continue
+        response_text, response_code = parse_structured_response(raw)
+        for field, actual in (
+            ("response_text", response_text),
+            ("response_code", response_code),
+        ):
+            if not matches(expected[name][field], actual):
+                print(f"FAIL {name}: {field} differs ({actual[:60]!r})")
+                failures += 1
+    print(f"{len(expected)} outputs, {failures} mismatches")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+"""Benchmark cases and the timing loop."""
+
+from __future__ import annotations
+
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+import inspect
+import statistics
+import time
+from typing import Any
+
+
+@dataclass
+class BenchContext:
+    """Shared state handed to every benchmark module."""
+
+    quick: bool
+    # Home Assistant instance for benchmarks that need storage
+    hass: Any = None
+
+    def scale(self, full: list[Any], quick: list[Any]) -> list[Any]:
+        """Pick the scale list for the current mode."""
+        return quick if self.quick else full
+
+
+@dataclass
+class Case:
+    """One benchmark at one scale.
+
+    ``func`` is timed; it may be a plain callable or a coroutine function.
+    ``setup`` runs once before the timing loop (and may also be async).
+    """
+
+    group: str
+    name: str
+    params: dict[str, Any]
+    func: Callable[[], Any]
+    setup: Callable[[], Any] | None = None
+    # Calls per timed round; None picks a count that runs ~0.1 s per round
+    number: int | None = None
+    extra: dict[str, Any] = field(default_factory=dict)
+
+
+async def _call(func: Callable[[], Any]) -> Any:
+    """Call a sync or async function."""
+    result = func()
+    if inspect.isawaitable(result):
+        result = await result
+    return result
+
+
+async def _time_round(func: Callable[[], Any], number: int) -> float:
+    """Return the seconds taken by number calls."""
+    if inspect.iscoroutinefunction(func):
+        start = time.perf_counter()
+        for _ in range(number):
+            await func()
+        return time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(number):
+        func()
+    return time.perf_counter() - start
+
+
+async def _calibrate(func: Callable[[], Any], target: float) -> int:
+    """Find a call count that takes about target seconds per round."""
+    number = 1
+    while True:
+        elapsed = await _time_round(func, number)
+        if elapsed >= target / 10 or number >= 1_000_000:
+            return max(1, int(number * target / max(elapsed, 1e-9)))
+        number *= 10
+
+
+async def run_case(case: Case, repeat: int, target: float) -> dict[str, Any]:
+    """Time a case and return its result record."""
+    if case.setup is not None:
+        setup: Callable[[], Awaitable[Any] | Any] = case.setup
+        await _call(setup)
+    # Warm caches and lazy imports before measuring
+    await _call(case.func)
+    number = case.number or await _calibrate(case.func, target)
+    rounds = [await _time_round(case.func, number) / number for _ in range(repeat)]
+    return {
+        "group": case.group,
+        "name": case.name,
+        "params": case.params,
+        "number": number,
+        "repeat": repeat,
+        "min_ms": round(min(rounds) * 1000, 4),
+        "median_ms": round(statistics.median(rounds) * 1000, 4),
+        "mean_ms": round(statistics.fmean(rounds) * 1000, 4),
+        "stdev_ms": round(statistics.pstdev(rounds) * 1000, 4),
+        **case.extra,
+    }
@@ -0,0 +1,96 @@
+"""Deterministic synthetic inputs for the benchmarks."""
+
+from __future__ import annotations
+
+import json
+import random
+
+_WORDS = (
+    "sensor light automation trigger condition action state entity template "
+    "switch climate script scene service target delay choose repeat"
+).split()
+
+_YAML_LINE = "  - {key}: {value}  # {comment}\n"
+
+
+def text(rng: random.Random, chars: int) -> str:
+    """Return prose of about the requested size."""
+    parts: list[str] = []
+    size = 0
+    while size < chars:
+        word = rng.choice(_WORDS)
+        parts.append(word)
+        size += len(word) + 1
+    return " ".join(parts)[:chars]
+
+
+def code(rng: random.Random, chars: int) -> str:
+    """Return YAML-like code of about the requested size.
+
+    Includes quotes, backslashes and braces so parsers meet the characters
+    that need escaping.
+    """
+    lines: list[str] = []
+    size = 0
+    while size < chars:
+        line = _YAML_LINE.format(
+            key=rng.choice(_WORDS),
+            value=rng.choice(
+                (
+                    '"{{ states(\'sensor.x\') }}"',
+                    "C:\\\\config\\\\file",
+                    "{entity_id: light.kitchen}",
+                    str(rng.randint(0, 10_000)),
+                )
+            ),
+            comment=text(rng, 30),
+        )
+        lines.append(line)
+        size += len(line)
+    return "".join(lines)[:chars]
+
+
+def history(rng: random.Random, count: int, code_chars: int = 400) -> list[dict]:
+    """Return structured history messages, alternating user/assistant."""
+    messages = []
+    for seq in range(count):
+        role = "user" if seq % 2 == 0 else "assistant"
+        messages.append(
+            {
+                "role": role,
+                "data": {
+                    "response_text": text(rng, 120),
+                    "response_code": code(rng, code_chars) if seq % 3 else "",
+                },
+                "timestamp": "2025-01-01T00:00:00",
+                "seq": seq + 1,
+            }
+        )
+    return messages
+
+
+def attachments(rng: random.Random, count: int, chars: int = 4000) -> list[dict]:
+    """Return uploaded file attachments."""
+    return [
+        {"filename": f"file_{index}.yaml", "content": code(rng, chars)}
+        for index in range(count)
+    ]
+
+
+RESPONSE_FORMATS = ("json", "fenced_json", "prose_code_block", "malformed_json")
+
+
+def response(rng: random.Random, fmt: str, code_chars: int) -> str:
+    """Return a raw provider response in one of RESPONSE_FORMATS."""
+    body = {"response_text": text(rng, 200), "response_code": code(rng, code_chars)}
+    if fmt == "json":
+        return json.dumps(body)
+    if fmt == "fenced_json":
+        return f"Here you go:\n```json\n{json.dumps(body, indent=2)}\n```\n"
+    if fmt == "prose_code_block":
+        return f"{body['response_text']}\n\n```yaml\n{body['response_code']}\n```\n"
+    if fmt == "malformed_json":
+        # Truncated JSON: the provider stopped mid-string
+        encoded = json.dumps(body)
+        return encoded[: len(encoded) * 9 // 10]
+    raise ValueError(f"Unknown response format: {fmt}")
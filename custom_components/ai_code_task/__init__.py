@@ -9,9 +9,9 @@ from homeassistant.helpers import config_validation as cv
 
 from .const import DOMAIN
 from .websockets import async_setup_websockets
-from .helpers import JSModuleRegistration
+from .helpers import AICodeTaskRuntime, JSModuleRegistration
 
-PLATFORMS: list[Platform] = []
+PLATFORMS: list[Platform] = [Platform.SENSOR]
 
 CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
 
@@ -25,6 +25,14 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up AI Code Task from a config entry."""
     hass.data.setdefault(DOMAIN, {})
 
+    # Build the shared runtime (history cache, prompt builder, providers)
+    runtime = AICodeTaskRuntime(hass, entry)
+    await runtime.async_setup()
+    entry.runtime_data = runtime
+
+    # Provider statistics sensors
+    await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+
     # Register websocket commands
     async_setup_websockets(hass)
 
@@ -40,15 +48,23 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
 
 
 async def async_update_options(hass: HomeAssistant, entry: ConfigEntry) -> None:
-    """Update options."""
+    """Update options.
+
+    Reloading the entry rebuilds the runtime with the new configuration.
+    """
     await hass.config_entries.async_reload(entry.entry_id)
 
 
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
+    if not await hass.config_entries.async_unload_platforms(entry, PLATFORMS):
+        return False
+
     # Unload javascript resources
     js_registration = hass.data[DOMAIN].get("js_registration")
     if js_registration:
         await js_registration.async_unload()
 
+    await entry.runtime_data.async_shutdown()
+
     return True
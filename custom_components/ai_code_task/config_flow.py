@@ -17,14 +17,29 @@ from homeassistant.helpers import selector
 from .const import (
     CONF_ASSISTANT_NAME,
     CONF_DEFAULT_PROVIDER,
+    CONF_FALLBACK_PROVIDERS,
+    CONF_HEDGE_PERCENTILE,
+    CONF_HEDGING,
     CONF_SYSTEM_PROMPT,
     CONF_CHAT_HISTORY_SIZE,
     CONF_ADVANCED_MODE,
     CONF_MAX_CONTEXT_CHARS,
+    CONF_MAX_CONCURRENT_REQUESTS,
+    CONF_MAX_QUEUE_DEPTH,
+    CONF_REQUEST_TIMEOUT,
+    CONF_RESPONSE_CACHE,
+    CONF_RESPONSE_CACHE_TTL,
     DEFAULT_ASSISTANT_NAME,
     DEFAULT_SYSTEM_PROMPT,
     DEFAULT_CHAT_HISTORY_SIZE,
     DEFAULT_ADVANCED_MODE,
+    DEFAULT_HEDGE_PERCENTILE,
+    DEFAULT_HEDGING,
+    DEFAULT_MAX_CONCURRENT_REQUESTS,
+    DEFAULT_MAX_QUEUE_DEPTH,
+    DEFAULT_REQUEST_TIMEOUT,
+    DEFAULT_RESPONSE_CACHE,
+    DEFAULT_RESPONSE_CACHE_TTL,
     INTEGRATION_TITLE,
     RECOMMENDED_MAX_CONTEXT_CHARS,
     DOMAIN,
@@ -114,6 +129,12 @@ class AICodeTaskOptionsFlow(OptionsFlow):
             vol.Optional(CONF_DEFAULT_PROVIDER): selector.EntitySelector(
                 selector.EntitySelectorConfig(domain="ai_task")
             ),
+            vol.Optional(
+                CONF_FALLBACK_PROVIDERS,
+                default=config.get(CONF_FALLBACK_PROVIDERS, []),
+            ): selector.EntitySelector(
+                selector.EntitySelectorConfig(domain="ai_task", multiple=True)
+            ),
             vol.Optional(
                 CONF_ASSISTANT_NAME,
                 default=config.get(CONF_ASSISTANT_NAME, DEFAULT_ASSISTANT_NAME),
@@ -165,6 +186,75 @@ class AICodeTaskOptionsFlow(OptionsFlow):
                         mode=selector.NumberSelectorMode.BOX,
                     )
                 ),
+                vol.Optional(
+                    CONF_RESPONSE_CACHE,
+                    default=config.get(CONF_RESPONSE_CACHE, DEFAULT_RESPONSE_CACHE),
+                ): selector.BooleanSelector(),
+                vol.Optional(
+                    CONF_RESPONSE_CACHE_TTL,
+                    default=config.get(
+                        CONF_RESPONSE_CACHE_TTL, DEFAULT_RESPONSE_CACHE_TTL
+                    ),
+                ): selector.NumberSelector(
+                    selector.NumberSelectorConfig(
+                        min=1,
+                        max=10080,
+                        step=1,
+                        unit_of_measurement="min",
+                        mode=selector.NumberSelectorMode.BOX,
+                    )
+                ),
+                vol.Optional(
+                    CONF_MAX_CONCURRENT_REQUESTS,
+                    default=config.get(
+                        CONF_MAX_CONCURRENT_REQUESTS, DEFAULT_MAX_CONCURRENT_REQUESTS
+                    ),
+                ): selector.NumberSelector(
+                    selector.NumberSelectorConfig(
+                        min=0,
+                        max=20,
+                        step=1,
+                        mode=selector.NumberSelectorMode.BOX,
+                    )
+                ),
+                vol.Optional(
+                    CONF_MAX_QUEUE_DEPTH,
+                    default=config.get(CONF_MAX_QUEUE_DEPTH, DEFAULT_MAX_QUEUE_DEPTH),
+                ): selector.NumberSelector(
+                    selector.NumberSelectorConfig(
+                        min=0,
+                        max=100,
+                        step=1,
+                        mode=selector.NumberSelectorMode.BOX,
+                    )
+                ),
+                vol.Optional(
+                    CONF_HEDGING,
+                    default=config.get(CONF_HEDGING, DEFAULT_HEDGING),
+                ): selector.BooleanSelector(),
+                vol.Optional(
+                    CONF_HEDGE_PERCENTILE,
+                    default=config.get(CONF_HEDGE_PERCENTILE, DEFAULT_HEDGE_PERCENTILE),
+                ): selector.NumberSelector(
+                    selector.NumberSelectorConfig(
+                        min=50,
+                        max=99,
+                        step=1,
+                        mode=selector.NumberSelectorMode.SLIDER,
+                    )
+                ),
+                vol.Optional(
+                    CONF_REQUEST_TIMEOUT,
+                    default=config.get(CONF_REQUEST_TIMEOUT, DEFAULT_REQUEST_TIMEOUT),
+                ): selector.NumberSelector(
+                    selector.NumberSelectorConfig(
+                        min=0,
+                        max=3600,
+                        step=1,
+                        unit_of_measurement="s",
+                        mode=selector.NumberSelectorMode.BOX,
+                    )
+                ),
             }
         )
 
@@ -11,14 +11,29 @@ CONF_ADVANCED_MODE = "advanced_mode"
 CONF_ASSISTANT_NAME = "assistant_name"
 CONF_CHAT_HISTORY_SIZE = "chat_history_size"
 CONF_DEFAULT_PROVIDER = "default_provider"
+CONF_FALLBACK_PROVIDERS = "fallback_providers"
+CONF_HEDGE_PERCENTILE = "hedge_percentile"
+CONF_HEDGING = "hedging"
 CONF_MAX_CONTEXT_CHARS = "max_context_chars"
+CONF_MAX_CONCURRENT_REQUESTS = "max_concurrent_requests"
+CONF_MAX_QUEUE_DEPTH = "max_queue_depth"
+CONF_REQUEST_TIMEOUT = "request_timeout"
+CONF_RESPONSE_CACHE = "response_cache"
+CONF_RESPONSE_CACHE_TTL = "response_cache_ttl"
 CONF_SYSTEM_PROMPT = "system_prompt"
 
 # Defaults
 DEFAULT_ADVANCED_MODE = False
 DEFAULT_ASSISTANT_NAME = "Code Assistant"
 DEFAULT_CHAT_HISTORY_SIZE = 20
+DEFAULT_HEDGE_PERCENTILE = 95
+DEFAULT_HEDGING = False
+DEFAULT_MAX_CONCURRENT_REQUESTS = 2  # per provider, 0 = no limit
+DEFAULT_MAX_QUEUE_DEPTH = 0  # per provider, 0 = no limit
 DEFAULT_MAX_RESPONSE_TOKENS = 4096
+DEFAULT_REQUEST_TIMEOUT = 300  # seconds, 0 = no timeout
+DEFAULT_RESPONSE_CACHE = False
+DEFAULT_RESPONSE_CACHE_TTL = 60  # minutes
 DEFAULT_TASK_NAME = "AI Code Task Generation"
 
 # Events
@@ -45,8 +60,62 @@ AI_TASK_OUTPUT_SCHEMA = {
 
 # Context Limits
 RECOMMENDED_MAX_CONTEXT_CHARS = 32000  # ~8k tokens
+CHARS_PER_TOKEN = 4
 # Storage limits
 RECOMMENDED_CHAT_HISTORY_MAX_MESSAGES = 250
+# In-memory chat history cache (per-user shards)
+CHAT_HISTORY_CACHE_MAX_BYTES = 8 * 1024 * 1024
+CHAT_HISTORY_CACHE_IDLE_SECONDS = 1800
+# Response cache (opt-in)
+RESPONSE_CACHE_MAX_MEMORY_ENTRIES = 64
+RESPONSE_CACHE_MAX_DISK_BYTES = 20 * 1024 * 1024
+# Provider statistics (calls kept per provider)
+PROVIDER_STATS_WINDOW = 100
+# Latency samples needed before a provider is hedged
+HEDGE_MIN_SAMPLES = 5
+# Request tracing (finished traces kept)
+TRACE_MAX_ENTRIES = 50
+# /config file index
+FILE_INDEX_MAX_ENTRIES = 100000
+FILE_INDEX_DEBOUNCE_SECONDS = 1.0
+# Rescan without watchdog: interval, directory mtimes checked per executor
+# job, and recently opened or followed files whose size and mtime are checked
+FILE_INDEX_RESCAN_SECONDS = 60
+FILE_INDEX_RESCAN_BATCH = 1000
+FILE_INDEX_WATCHED_FILES = 64
+# Explorer listing
+FILE_LIST_SORTS = ["name", "mtime", "size"]
+FILE_LIST_MAX_LIMIT = 1000
+# Partial reads (byte range and tail): bytes returned at most
+FILE_READ_MAX_BYTES = 1024 * 1024
+FILE_READ_BLOCK_BYTES = 64 * 1024
+FILE_READ_MAX_TAIL_LINES = 10000
+# Permissions of files created by a save
+FILE_SAVE_NEW_FILE_MODE = 0o644
+# Line-range replacements accepted by one save
+FILE_SAVE_MAX_EDITS = 1000
+# Live log following: one poll of all followed files per interval, which
+# is also the window over which appended lines are batched
+FILE_FOLLOW_EXTENSIONS = {".log"}
+FILE_FOLLOW_INTERVAL_SECONDS = 0.5
+FILE_FOLLOW_MAX_FOLLOWERS = 32
+# Bytes sent to a follower per interval; older appended data is dropped
+FILE_FOLLOW_MAX_BUFFER_BYTES = 256 * 1024
+# Quick-open file finder
+FILE_FIND_DEFAULT_LIMIT = 50
+FILE_FIND_MAX_LIMIT = 200
+FILE_FIND_TIME_BUDGET = 0.1
+# Full-text file search
+FILE_SEARCH_DEFAULT_MAX_PER_FILE = 20
+FILE_SEARCH_MAX_PER_FILE = 200
+FILE_SEARCH_DEFAULT_MAX_RESULTS = 500
+FILE_SEARCH_MAX_RESULTS = 5000
+# Bytes read by one executor job before the hits are streamed
+FILE_SEARCH_BATCH_BYTES = 1024 * 1024
+FILE_SEARCH_MAX_FILE_BYTES = 8 * 1024 * 1024
+# Time spent searching one file before the rest of it is skipped
+FILE_SEARCH_MAX_FILE_SECONDS = 2.0
+FILE_SEARCH_MAX_LINE_CHARS = 300
 
 
 # Frontend
@@ -61,6 +130,9 @@ JS_MODULES = [
 # Storage
 STORAGE_VERSION = 1
 STORAGE_KEY = f"{DOMAIN}.storage"
+CHAT_HISTORY_STORAGE_PATH = f"{DOMAIN}/history"
+LEGACY_CHAT_HISTORY_STORAGE_KEY = f"{DOMAIN}/chat_history"
+RESPONSE_CACHE_STORAGE_PATH = f"{DOMAIN}/response_cache"
 
 # Security
 EXCLUDED_FILES = {
@@ -0,0 +1,39 @@
+"""Diagnostics support for AI Code Task."""
+
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import CONF_SYSTEM_PROMPT
+from .helpers import AICodeTaskRuntime
+
+TO_REDACT = {CONF_SYSTEM_PROMPT, "user_id"}
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry.
+
+    Includes the provider statistics, the response cache counters, the file
+    index size, the number of followed log files and the most recent request
+    traces (timings only, no prompts or responses).
+    """
+    runtime: AICodeTaskRuntime = entry.runtime_data
+    cache = runtime.response_cache
+    return async_redact_data(
+        {
+            "options": runtime.config,
+            "providers": runtime.provider_manager.get_provider_availability(),
+            "provider_stats": runtime.provider_stats.as_dict(),
+            "response_cache": cache.stats if cache else None,
+            "file_index": runtime.file_index.stats,
+            "file_follow": runtime.file_follower.stats,
+            "traces": runtime.traces.as_list(),
+        },
+        TO_REDACT,
+    )
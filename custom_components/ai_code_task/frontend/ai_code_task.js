@@ -54,6 +54,7 @@ const run = async () => {
       DOMAIN: 'ai_code_task',
       WS: {
         GENERATE: 'ai_code_task/generate',
+        GENERATE_STREAM: 'ai_code_task/generate_stream',
         CLEAR_HISTORY: 'ai_code_task/clear_history',
         SYNC_HISTORY: 'ai_code_task/sync_history',
         GET_PROVIDERS: 'ai_code_task/get_providers',
@@ -75,6 +76,9 @@ const run = async () => {
       FILE: {
         MAX_SIZE_BYTES: 102400,
         MAX_HISTORY: 250,
+        EXPLORER_PAGE_SIZE: 200,
+        EXPLORER_MAX_OPEN_BYTES: 1048576,
+        EXPLORER_TAIL_LINES: 1000,
       }
     };
 
@@ -89,6 +93,8 @@ const run = async () => {
         _isCodeUserModified: { type: Boolean, state: true },
         _pendingAttachments: { type: Array, state: true },
         _isLoading: { type: Boolean, state: true },
+        _streamingMessage: { type: Object, state: true },
+        _queuePosition: { type: Number, state: true },
         _error: { type: String, state: true },
         _errorType: { type: String, state: true },
         _errorClosing: { type: Boolean, state: true },
@@ -123,6 +129,9 @@ const run = async () => {
       this._pendingAttachments = [];
       this._appliedThemeVars = [];
       this._isLoading = false;
+      this._streamingMessage = null;
+      this._queuePosition = 0;
+      this._activeGeneration = null;
       this._error = null;
       this._errorType = null;
       this._errorClosing = false;
@@ -139,7 +148,10 @@ const run = async () => {
       this._explorerItems = [];
       this._currentExplorerPath = '';
       this._activeFilePath = null;
+      this._activeFileVersion = null;
+      this._activeFileBase = null;
       this._explorerLoading = false;
+      this._explorerCursor = null;
       this._selectedEntities = [];
       this._entitySelectorOpen = false;
       this._entitySelectorSearchQuery = '';
@@ -171,6 +183,7 @@ const run = async () => {
     disconnectedCallback() {
       super.disconnectedCallback();
       window.removeEventListener('click', this._handleClickOutside);
+      this._cancelGeneration();
     }
 
 
@@ -342,11 +355,13 @@ const run = async () => {
       try {
         const response = await this._hass.connection.sendMessagePromise({
           type: AICodeTaskCard.CONSTANTS.WS.FILE_LIST,
-          path
+          path,
+          limit: AICodeTaskCard.CONSTANTS.FILE.EXPLORER_PAGE_SIZE
         });
 
         if (response?.items) {
           this._explorerItems = response.items;
+          this._explorerCursor = response.next_cursor || null;
           this._currentExplorerPath = path;
         }
       } catch (e) {
@@ -357,6 +372,81 @@ const run = async () => {
       }
     }
 
+    async _loadMoreExplorerItems() {
+      if (!this._explorerCursor || this._explorerLoading) return;
+      this._explorerLoading = true;
+      const path = this._currentExplorerPath;
+      try {
+        const response = await this._hass.connection.sendMessagePromise({
+          type: AICodeTaskCard.CONSTANTS.WS.FILE_LIST,
+          path,
+          limit: AICodeTaskCard.CONSTANTS.FILE.EXPLORER_PAGE_SIZE,
+          cursor: this._explorerCursor
+        });
+
+        // Ignore a page that arrives after navigating elsewhere
+        if (response?.items && path === this._currentExplorerPath) {
+          this._explorerItems = [...this._explorerItems, ...response.items];
+          this._explorerCursor = response.next_cursor || null;
+        }
+      } catch (e) {
+        console.error("AI Code Task - Failed to load directory:", e);
+        this._explorerCursor = null;
+      } finally {
+        this._explorerLoading = false;
+      }
+    }
+
+    _onExplorerScroll(e) {
+      const list = e.target;
+      // Fetch the next page shortly before the end of the list is reached
+      if (list.scrollTop + list.clientHeight >= list.scrollHeight - 40) {
+        this._loadMoreExplorerItems();
+      }
+    }
+
+    _openExplorerItem(item) {
+      if (item.is_dir) {
+        this._loadDirectory(item.path);
+      } else if (item.size > AICodeTaskCard.CONSTANTS.FILE.EXPLORER_MAX_OPEN_BYTES) {
+        this._openFileTail(item.path);
+      } else {
+        this._openExplorerFile(item.path);
+      }
+    }
+
+    async _openFileTail(path) {
+      // Large files (logs) are opened read-only: only their last lines are
+      // loaded, so there is no active file that could be saved over them
+      this._explorerLoading = true;
+      try {
+        const response = await this._hass.connection.sendMessagePromise({
+          type: AICodeTaskCard.CONSTANTS.WS.FILE_READ,
+          path,
+          tail_lines: AICodeTaskCard.CONSTANTS.FILE.EXPLORER_TAIL_LINES
+        });
+
+        if (response?.content !== undefined) {
+          this._currentCode = response.content;
+          this._activeFilePath = null;
+          this._activeFileVersion = null;
+          this._activeFileBase = null;
+          this._isCodeUserModified = false;
+
+          const editor = this.shadowRoot.querySelector('ha-code-editor');
+          if (editor) { editor.value = this._currentCode; }
+
+          this._showError(`${this._localize('msg.tail_loaded')}: ${path.split('/').pop()}`, 'success', 3000);
+          this._explorerOpen = false;
+        }
+      } catch (e) {
+        console.error("AI Code Task - Failed to read file:", e);
+        this._showError(this._localize('error.file_read'));
+      } finally {
+        this._explorerLoading = false;
+      }
+    }
+
     async _openExplorerFile(path) {
       this._explorerLoading = true;
       try {
@@ -368,6 +458,9 @@ const run = async () => {
         if (response?.content !== undefined) {
           this._currentCode = response.content;
           this._activeFilePath = path;
+          // Saves are conditional on the file not having changed since
+          this._activeFileVersion = response.version || null;
+          this._activeFileBase = response.content;
           this._isCodeUserModified = false;
 
           const editor = this.shadowRoot.querySelector('ha-code-editor');
@@ -386,22 +479,71 @@ const run = async () => {
       }
     }
 
+    _buildLineEdit(base, current) {
+      // One replacement covering the lines between the unchanged start and
+      // end of the file, or null when the whole content must be sent
+      const trailing = base.endsWith('\n');
+      if (trailing !== current.endsWith('\n')) return null;
+      // A lone "\r" breaks the line in the editor but not on the server
+      if (/\r(?!\n)/.test(base)) return null;
+      // An empty file has no lines, "\n" has one empty line
+      const toLines = text => (text ? (trailing ? text.slice(0, -1) : text).split('\n') : []);
+      // Lines end at "\n" only, as on the server. The file is read with its
+      // line endings and the editor turns "\r\n" into "\n", so a line is
+      // unchanged when only its "\r" is gone (the server keeps the ending).
+      const oldLines = toLines(base);
+      const newLines = toLines(current);
+      const same = (oldLine, newLine) => oldLine === newLine || oldLine === `${newLine}\r`;
+      let prefix = 0;
+      while (prefix < oldLines.length && prefix < newLines.length && same(oldLines[prefix], newLines[prefix])) {
+        prefix++;
+      }
+      let suffix = 0;
+      while (suffix < oldLines.length - prefix && suffix < newLines.length - prefix &&
+             same(oldLines[oldLines.length - 1 - suffix], newLines[newLines.length - 1 - suffix])) {
+        suffix++;
+      }
+      const end = oldLines.length - suffix;
+      const lines = newLines.slice(prefix, newLines.length - suffix);
+      // Changes to a last line without a line break cannot be expressed as lines
+      if (!trailing && end === oldLines.length && (lines.length || end > prefix)) return null;
+      return { start: prefix + 1, end, text: lines.length ? `${lines.join('\n')}\n` : '' };
+    }
+
     async _saveActiveFile() {
       if (!this._activeFilePath) return;
 
       this._isLoading = true;
       try {
-        await this._hass.connection.sendMessagePromise({
+        const message = {
           type: AICodeTaskCard.CONSTANTS.WS.FILE_SAVE,
           path: this._activeFilePath,
-          content: this._currentCode
-        });
+        };
+        // With the version and content the file was loaded with, only the
+        // changed lines are sent
+        const edit = this._activeFileVersion && this._activeFileBase !== null
+          ? this._buildLineEdit(this._activeFileBase, this._currentCode)
+          : null;
+        if (this._activeFileVersion) { message.version = this._activeFileVersion; }
+        let response;
+        if (edit) {
+          try {
+            response = await this._hass.connection.sendMessagePromise({ ...message, edits: [edit] });
+          } catch (e) {
+            if (e?.code !== 'patch_failed') throw e;
+          }
+        }
+        if (!response) {
+          response = await this._hass.connection.sendMessagePromise({ ...message, content: this._currentCode });
+        }
 
+        this._activeFileVersion = response?.version || null;
+        this._activeFileBase = this._currentCode;
         this._isCodeUserModified = false;
         this._showError(`${this._localize('msg.saved')}: ${this._activeFilePath.split('/').pop()}`, 'success', 3000);
       } catch (e) {
         console.error("AI Code Task - Failed to save file:", e);
-        this._showError(this._localize('error.file_save'));
+        this._showError(this._localize(e?.code === 'conflict' ? 'error.file_conflict' : 'error.file_save'));
       } finally {
         this._isLoading = false;
       }
@@ -443,6 +585,8 @@ const run = async () => {
 
     _performCloseFile() {
       this._activeFilePath = null;
+      this._activeFileVersion = null;
+      this._activeFileBase = null;
       this._currentCode = '';
       this._isCodeUserModified = false;
 
@@ -596,11 +740,18 @@ const run = async () => {
           ? html`<div class="empty-state">${this._localize('chat.empty')}</div>`
           : this._chatHistory.map(msg => this._renderMessage(msg))
         }
+            ${this._streamingMessage ? this._renderMessage({
+          role: 'assistant',
+          content: this._streamingMessage.content,
+          code: this._streamingMessage.code
+        }) : ''}
           </div>
-          ${this._isLoading ? html`
+          ${this._isLoading && !this._streamingMessage ? html`
             <div class="loading-overlay">
               <div class="loading-spinner"></div>
-              <div class="loading-text">${this._localize('chat.thinking')}</div>
+              <div class="loading-text">${this._queuePosition
+          ? `${this._localize('chat.queued')} ${this._queuePosition}`
+          : this._localize('chat.thinking')}</div>
             </div>
           ` : ''}
         </div>
@@ -629,11 +780,11 @@ const run = async () => {
               </button>
             `}
           </div>
-          <div class="explorer-list">
+          <div class="explorer-list" @scroll=${this._onExplorerScroll}>
             ${this._explorerItems.length === 0 && !this._explorerLoading ? html`<div class="explorer-empty">${this._localize('explorer.empty')}</div>` : ''}
             ${this._explorerItems.map(item => html`
               <div class="explorer-item ${item.is_dir ? 'directory' : 'file'}" 
-                   @click=${() => item.is_dir ? this._loadDirectory(item.path) : this._openExplorerFile(item.path)}>
+                   @click=${() => this._openExplorerItem(item)}>
                 <ha-icon icon="${item.is_dir ? 'mdi:folder' : 'mdi:file-code-outline'}"></ha-icon>
                 <span>${item.name}</span>
               </div>
@@ -737,7 +888,9 @@ const run = async () => {
         <textarea id="prompt-input" class="prompt-input" placeholder="${this._localize('input.placeholder')}" @keydown=${this._handleKeyDown} .disabled=${this._isLoading}></textarea>
         <div class="button-row">
           <button class="btn btn-danger" @click=${this._clearChat} .disabled=${this._isLoading}><ha-icon icon="mdi:delete-outline" style="color: white;"></ha-icon> ${this._localize('input.clear_chat')}</button>
-          <button class="btn btn-primary" @click=${this._sendPrompt} .disabled=${this._isLoading}><ha-icon icon="mdi:send-variant" style="color: white;"></ha-icon> ${this._localize('input.send')}</button>
+          ${this._isLoading
+          ? html`<button class="btn btn-primary" @click=${this._cancelGeneration}><ha-icon icon="mdi:stop" style="color: white;"></ha-icon> ${this._localize('input.stop')}</button>`
+          : html`<button class="btn btn-primary" @click=${this._sendPrompt}><ha-icon icon="mdi:send-variant" style="color: white;"></ha-icon> ${this._localize('input.send')}</button>`}
         </div>
       </div>
     `;
@@ -819,6 +972,60 @@ const run = async () => {
       }
     }
 
+    _generateStream(requestData) {
+      // Streams the response: "queued" events report the queue position,
+      // "delta" events grow the in-progress message, "reset" empties it (a
+      // fallback provider starts over), "done" resolves with the complete
+      // response, "error" rejects.
+      return new Promise((resolve, reject) => {
+        let unsubscribe = null;
+        let finished = false;
+
+        const finish = (callback, value) => {
+          if (finished) return;
+          finished = true;
+          this._activeGeneration = null;
+          // Unsubscribing also cancels the generation on the server
+          if (unsubscribe) { unsubscribe().catch(() => { }); }
+          callback(value);
+        };
+
+        this._activeGeneration = {
+          cancel: () => finish(reject, { code: 'cancelled', message: this._localize('msg.cancelled') })
+        };
+
+        this._hass.connection.subscribeMessage((event) => {
+          if (event.type === 'queued') {
+            this._queuePosition = event.position;
+          } else if (event.type === 'delta') {
+            const current = this._streamingMessage || { content: '', code: '' };
+            this._streamingMessage = {
+              content: current.content + (event.response_text || ''),
+              code: current.code + (event.response_code || '')
+            };
+          } else if (event.type === 'reset') {
+            this._streamingMessage = { content: '', code: '' };
+          } else if (event.type === 'done') {
+            finish(resolve, event);
+          } else if (event.type === 'error') {
+            finish(reject, { code: event.code, message: event.message });
+          }
+        }, {
+          type: AICodeTaskCard.CONSTANTS.WS.GENERATE_STREAM,
+          ...requestData
+        }).then((unsub) => {
+          unsubscribe = unsub;
+          if (finished) { unsub().catch(() => { }); }
+        }, (error) => finish(reject, error));
+      });
+    }
+
+    _cancelGeneration() {
+      if (this._activeGeneration) {
+        this._activeGeneration.cancel();
+      }
+    }
+
     _parseResponse(dataToParse) {
       if (typeof dataToParse === 'object' && dataToParse !== null) {
         return {
@@ -879,10 +1086,7 @@ const run = async () => {
       this._selectedEntities = [];
 
       try {
-        const response = await this._callServiceWithRetry({
-          type: AICodeTaskCard.CONSTANTS.WS.GENERATE,
-          ...requestData
-        });
+        const response = await this._generateStream(requestData);
 
         const { assistantContent, assistantCode, providerName } = this._parseResponse(response);
 
@@ -901,12 +1105,18 @@ const run = async () => {
           timestamp: new Date().toISOString()
         }];
       } catch (error) {
+        if (error?.code === 'cancelled') {
+          this._showError(this._localize('msg.cancelled'), 'warning');
+          return;
+        }
         const errorMessage = `Error: ${error.message || JSON.stringify(error)}`;
         console.error('Error calling generate_code:', error);
         this._showError(errorMessage);
         this._chatHistory = [...this._chatHistory, { role: 'assistant', content: errorMessage, code: '', timestamp: new Date().toISOString() }];
       } finally {
         this._isLoading = false;
+        this._streamingMessage = null;
+        this._queuePosition = 0;
         this._saveToStorage();
 
         await this.updateComplete;
@@ -939,6 +1149,8 @@ const run = async () => {
           // Provider
           this._selectedProvider = data.selectedProvider || '';
           this._activeFilePath = data.activeFilePath || null;
+          this._activeFileVersion = data.activeFileVersion || null;
+          this._activeFileBase = null;
           this._selectedEntities = data.selectedEntities || [];
         }
       } catch (e) { console.error('Failed to load from storage:', e); }
@@ -952,6 +1164,7 @@ const run = async () => {
         isCodeUserModified: this._isCodeUserModified,
         selectedProvider: this._selectedProvider,
         activeFilePath: this._activeFilePath,
+        activeFileVersion: this._activeFileVersion,
         selectedEntities: this._selectedEntities,
       });
     }
@@ -1220,6 +1433,8 @@ const run = async () => {
       if (!attachment.content) return;
       this._currentCode = attachment.content;
       this._activeFilePath = attachment.filename;
+      this._activeFileVersion = null;
+      this._activeFileBase = null;
       this._isCodeUserModified = false;
       const editor = this.shadowRoot.querySelector('ha-code-editor');
       if (editor) { editor.value = attachment.content; }
@@ -1,17 +1,38 @@
 """Helper modules for AI Code Task."""
 
-from .chat_history import ChatHistoryService
-from .response import parse_structured_response
-from .file_manager import FileManager
+from .chat_history import ChatHistoryService, serialize_history_message
+from .generation import GenerationError, GenerationRequest
+from .response import (
+    PartialResponseParser,
+    parse_partial_response,
+    parse_structured_response,
+)
+from .file_follow import FileFollower
+from .file_index import FileIndex
+from .file_manager import FileManager, FileManagerError
+from .file_search import compile_query
 from .javascript import JSModuleRegistration
 from .provider_manager import ProviderManager
 from .prompt_builder import PromptBuilder
+from .runtime import AICodeTaskRuntime
+from .tracing import Trace
 
 __all__ = [
+    "AICodeTaskRuntime",
     "ChatHistoryService",
+    "GenerationError",
+    "GenerationRequest",
+    "PartialResponseParser",
+    "compile_query",
+    "parse_partial_response",
     "parse_structured_response",
+    "serialize_history_message",
+    "FileFollower",
+    "FileIndex",
     "FileManager",
+    "FileManagerError",
     "JSModuleRegistration",
     "ProviderManager",
     "PromptBuilder",
+    "Trace",
 ]
@@ -7,19 +7,131 @@ Features:
 - Asynchronous message saving.
 - Asynchronous history loading (for frontend sync).
 - Automatic cleanup.
-- Per-user message storage.
+- Per-user message storage: one storage shard per user, loaded lazily.
+- Bounded in-memory cache: idle shards and shards over the byte budget are evicted.
+- Append-only writes: each exchange is one line appended to the shard's log,
+  folded into the snapshot by a background compaction.
+- Structured messages: payloads are stored as dicts and carry their prompt
+  fragments pre-rendered, so building a prompt never decodes history.
 """
 
 from __future__ import annotations
 
+import asyncio
+from collections import OrderedDict
+import hashlib
+import json
+import os
+import re
 import time
 from typing import Any
 
 from ..const import (
+    CHAT_HISTORY_CACHE_IDLE_SECONDS,
+    CHAT_HISTORY_CACHE_MAX_BYTES,
+    LEGACY_CHAT_HISTORY_STORAGE_KEY,
     LOGGER,
     RECOMMENDED_CHAT_HISTORY_MAX_MESSAGES,
     DEFAULT_CHAT_HISTORY_SIZE,
 )
+from .history_log import HistoryLog
+from .prompt_builder import render_history_fragments
+
+_SAFE_SHARD_NAME = re.compile(r"^[A-Za-z0-9_-]+$")
+
+
+def _parse_content(content: Any) -> dict[str, Any]:
+    """Convert a legacy JSON string payload to its structured form."""
+    try:
+        parsed = json.loads(content)
+    except (ValueError, TypeError):
+        parsed = None
+    if isinstance(parsed, dict):
+        return parsed
+    return {"response_text": content if isinstance(content, str) else ""}
+
+
+def _prepare_message(msg: dict[str, Any]) -> dict[str, Any]:
+    """Bring a stored message to its in-memory form with cached fragments."""
+    if "data" not in msg:
+        msg["data"] = _parse_content(msg.pop("content", ""))
+    msg["fragments"] = render_history_fragments(msg["role"], msg["data"])
+    return msg
+
+
+def _stored_message(msg: dict[str, Any]) -> dict[str, Any]:
+    """Return a message without its in-memory prompt fragments."""
+    return {key: value for key, value in msg.items() if key != "fragments"}
+
+
+def _message_size(msg: dict[str, Any]) -> int:
+    """Approximate the in-memory size of a message."""
+    return sum(len(fragment) for fragment in msg["fragments"])
+
+
+def serialize_history_message(msg: dict[str, Any]) -> dict[str, Any]:
+    """Convert a message to the wire format used by the frontend.
+
+    The frontend expects ``content`` to be the JSON encoded payload.
+    """
+    return {
+        "role": msg["role"],
+        "content": json.dumps(msg["data"]),
+        "timestamp": msg.get("timestamp"),
+        "seq": msg.get("seq", 0),
+    }
+
+
+class _HistoryShard:
+    """History of a single user: a snapshot store plus an append-only log."""
+
+    def __init__(self, store, log: HistoryLog, data: dict | None) -> None:
+        """Initialize the shard from the stored snapshot."""
+        self.store = store
+        self.log = log
+        self.lock = asyncio.Lock()
+        if not isinstance(data, dict):
+            now = time.time()
+            data = {"messages": [], "created_at": now, "last_updated": now}
+        self.data = data
+        self.last_access = time.monotonic()
+        for msg in self.messages:
+            _prepare_message(msg)
+        self.size = sum(_message_size(msg) for msg in self.messages)
+        self.last_seq = max(
+            (msg.get("seq", 0) for msg in self.messages),
+            default=data.get("last_seq", 0),
+        )
+        # Messages in the log, which is folded into the snapshot once it
+        # holds more than the retention limit
+        self.log_messages = 0
+        self.compacting = False
+        # Set when the history is cleared: saves still holding this shard
+        # must not write to the log again
+        self.cleared = False
+
+    def replay(self, messages: list[dict[str, Any]], log_messages: int) -> None:
+        """Apply the log tail read from disk on top of the snapshot."""
+        for msg in messages:
+            _prepare_message(msg)
+        self.messages.extend(messages)
+        self.size += sum(_message_size(msg) for msg in messages)
+        self.last_seq = max((msg["seq"] for msg in messages), default=self.last_seq)
+        self.log_messages = log_messages
+
+    @property
+    def messages(self) -> list[dict[str, Any]]:
+        """Return the stored messages."""
+        return self.data.setdefault("messages", [])
+
+    @property
+    def busy(self) -> bool:
+        """Return True while a write or compaction is in progress."""
+        return self.lock.locked() or self.compacting
+
+    def touch(self) -> None:
+        """Mark the shard as recently used."""
+        self.last_access = time.monotonic()
 
 
 class ChatHistoryService:
@@ -27,6 +139,9 @@ class ChatHistoryService:
 
     Manages full message storage (user prompts + assistant responses) for:
     - Frontend card UI synchronization across devices.
+
+    Each ``user:{id}`` history lives in its own storage shard, so a save only
+    rewrites the history of the user that sent the message.
     """
 
     def __init__(self, hass, storage_path: str, entry=None):
@@ -34,41 +149,98 @@ class ChatHistoryService:
 
         Args:
             hass: Home Assistant instance
-            storage_path: Storage file path
+            storage_path: Storage directory of the per-user shards
             entry: Config entry (optional)
         """
-        from homeassistant.helpers.storage import Store
-
         self.hass = hass
-
-        # Ensure directory exists if path implies one
-        if "/" in storage_path:
-            import os
-
-            full_path = hass.config.path(".storage", storage_path.rsplit("/", 1)[0])
-            os.makedirs(full_path, exist_ok=True)
-
-        self._store = Store(hass, 1, storage_path)
-        self._history: dict[str, dict] = {}
+        self._storage_path = storage_path
+        self._shards: OrderedDict[str, _HistoryShard] = OrderedDict()
+        self._shard_locks: dict[str, asyncio.Lock] = {}
+        self._cache_bytes = 0
         self._loaded = False
+        self._load_lock = asyncio.Lock()
+        self._unsub_evict = None
+
+    async def async_load(self):
+        """Prepare the storage directory and migrate the legacy single store."""
+        await self._ensure_loaded()
 
     async def _ensure_loaded(self):
-        """Ensure history is loaded from storage."""
+        """Ensure storage is ready (shards themselves are loaded lazily)."""
         if self._loaded:
             return
 
+        async with self._load_lock:
+            if self._loaded:
+                return
+            await self._async_load()
+
+    async def _async_load(self):
+        """Create the shard directory and split the legacy store if present."""
+        full_path = self.hass.config.path(".storage", self._storage_path)
+        await self.hass.async_add_executor_job(
+            lambda: os.makedirs(full_path, exist_ok=True)
+        )
+
         try:
-            data = await self._store.async_load()
-            if isinstance(data, dict):
-                self._history = data
-            else:
-                self._history = {}
-            self._loaded = True
-            LOGGER.debug("Chat history loaded: %d conversations", len(self._history))
+            await self._async_migrate_legacy_store()
         except Exception as err:
-            LOGGER.warning("Failed to load chat history: %s", err)
-            self._history = {}
-            self._loaded = True
+            LOGGER.warning("Failed to migrate legacy chat history: %s", err)
+        self._loaded = True
+
+    async def _async_migrate_legacy_store(self):
+        """Move histories from the single legacy document into per-user shards.
+
+        Shards that already exist are left alone: they were written by an
+        earlier run that failed before removing the legacy document, and may
+        hold newer messages since.
+        """
+        from homeassistant.helpers.storage import Store
+
+        legacy_store = Store(self.hass, 1, LEGACY_CHAT_HISTORY_STORAGE_KEY)
+        data = await legacy_store.async_load()
+        if not isinstance(data, dict):
+            return
+
+        migrated = 0
+        for history_key, history_entry in data.items():
+            if not history_key.startswith("user:") or not isinstance(
+                history_entry, dict
+            ):
+                continue
+            user_id = history_key.split(":", 1)[1]
+            store = self._create_store(user_id)
+            log_path = self._create_log(user_id).path
+            if await store.async_load() is not None or (
+                await self.hass.async_add_executor_job(os.path.exists, log_path)
+            ):
+                LOGGER.debug("Chat history shard already migrated: %s", history_key)
+                continue
+            await store.async_save(history_entry)
+            migrated += 1
+
+        await legacy_store.async_remove()
+        LOGGER.info("Chat history migrated to %d per-user shards", migrated)
+
+    def async_start(self):
+        """Start the periodic eviction of idle shards."""
+        from datetime import timedelta
+
+        from homeassistant.helpers.event import async_track_time_interval
+
+        self._unsub_evict = async_track_time_interval(
+            self.hass,
+            self._async_evict_idle,
+            timedelta(seconds=CHAT_HISTORY_CACHE_IDLE_SECONDS / 2),
+        )
+
+    def async_stop(self):
+        """Stop the periodic eviction and drop the cache."""
+        if self._unsub_evict:
+            self._unsub_evict()
+            self._unsub_evict = None
+        self._shards.clear()
+        self._cache_bytes = 0
 
     def _get_history_key(self, user_id: str) -> str:
         """Build history key for user.
@@ -81,54 +253,241 @@ class ChatHistoryService:
         """
         return f"user:{user_id}"
 
-    async def _do_save(self, user_id: str, role: str, content: str):
-        """Internal save implementation (runs async)."""
+    def _get_shard_name(self, user_id: str) -> str:
+        """Build a file-system safe shard name for a user."""
+        if _SAFE_SHARD_NAME.match(user_id):
+            return f"user_{user_id}"
+        digest = hashlib.sha256(user_id.encode("utf-8")).hexdigest()[:32]
+        return f"user_{digest}"
+
+    def _create_store(self, user_id: str):
+        """Create the snapshot storage object of a user's shard."""
+        from homeassistant.helpers.storage import Store
+
+        return Store(
+            self.hass, 1, f"{self._storage_path}/{self._get_shard_name(user_id)}"
+        )
+
+    def _create_log(self, user_id: str) -> HistoryLog:
+        """Create the append-only log of a user's shard."""
+        return HistoryLog(
+            self.hass.config.path(
+                ".storage",
+                self._storage_path,
+                f"{self._get_shard_name(user_id)}.jsonl",
+            )
+        )
+
+    def _get_shard_lock(self, history_key: str) -> asyncio.Lock:
+        """Return the lock that serializes loading of a shard."""
+        return self._shard_locks.setdefault(history_key, asyncio.Lock())
+
+    async def _get_shard(self, user_id: str) -> _HistoryShard:
+        """Return a user's shard, loading it from disk on first access."""
         await self._ensure_loaded()
 
         history_key = self._get_history_key(user_id)
+        shard = self._shards.get(history_key)
+        if shard is None:
+            async with self._get_shard_lock(history_key):
+                shard = self._shards.get(history_key)
+                if shard is None:
+                    shard = await self._async_load_shard(user_id)
+                    self._shards[history_key] = shard
+                    self._cache_bytes += shard.size
+                    LOGGER.debug(
+                        "Chat history shard loaded: %s (%d messages)",
+                        history_key,
+                        len(shard.messages),
+                    )
+
+        shard.touch()
+        self._shards.move_to_end(history_key)
+        self._evict_over_budget(keep=history_key)
+        return shard
+
+    async def _async_load_shard(self, user_id: str) -> _HistoryShard:
+        """Rebuild a shard from its snapshot plus the log tail."""
+        history_key = self._get_history_key(user_id)
+        store = self._create_store(user_id)
+        log = self._create_log(user_id)
+        try:
+            data = await store.async_load()
+        except Exception as err:
+            LOGGER.warning("Failed to load chat history %s: %s", history_key, err)
+            data = None
 
-        # Get or create history entry
-        if history_key not in self._history:
-            self._history[history_key] = {
-                "messages": [],
-                "created_at": time.time(),
-                "last_updated": time.time(),
-            }
-
-        # Add message with timestamp
-        self._history[history_key]["messages"].append(
-            {"role": role, "content": content, "timestamp": time.time()}
-        )
-        self._history[history_key]["last_updated"] = time.time()
-
-        # Apply limits (keep last N messages max)
-        if (
-            len(self._history[history_key]["messages"])
-            > RECOMMENDED_CHAT_HISTORY_MAX_MESSAGES
-        ):
-            self._history[history_key]["messages"] = self._history[history_key][
-                "messages"
-            ][-RECOMMENDED_CHAT_HISTORY_MAX_MESSAGES:]
-
-        # Save to disk (async, non-blocking)
-        # Save to disk (async, non-blocking)
+        shard = _HistoryShard(store, log, data)
         try:
-            await self._store.async_save(self._history)
+            tail, log_messages = await self.hass.async_add_executor_job(
+                log.read, shard.data.get("last_seq", 0)
+            )
+        except OSError as err:
+            LOGGER.warning("Failed to read chat history log %s: %s", history_key, err)
+        else:
+            shard.replay(tail, log_messages)
+            self._trim_shard(history_key, shard)
+        return shard
+
+    def _trim_shard(self, history_key: str, shard: _HistoryShard) -> None:
+        """Apply limits (keep last N messages max) to the in-memory history."""
+        if len(shard.messages) <= RECOMMENDED_CHAT_HISTORY_MAX_MESSAGES:
+            return
+        dropped = shard.messages[:-RECOMMENDED_CHAT_HISTORY_MAX_MESSAGES]
+        shard.data["messages"] = shard.messages[-RECOMMENDED_CHAT_HISTORY_MAX_MESSAGES:]
+        self._resize_shard(
+            history_key,
+            shard,
+            -sum(_message_size(msg) for msg in dropped),
+        )
+
+    def _drop_shard(self, history_key: str) -> None:
+        """Remove a shard from the in-memory cache."""
+        shard = self._shards.pop(history_key, None)
+        if shard is not None:
+            self._cache_bytes -= shard.size
+
+    def _resize_shard(self, history_key: str, shard: _HistoryShard, delta: int):
+        """Account for a change of a shard's in-memory size."""
+        shard.size += delta
+        if self._shards.get(history_key) is shard:
+            self._cache_bytes += delta
+
+    def _evict_over_budget(self, keep: str) -> None:
+        """Evict least recently used shards while the cache is over budget."""
+        for history_key in list(self._shards):
+            if self._cache_bytes <= CHAT_HISTORY_CACHE_MAX_BYTES:
+                return
+            if history_key == keep or self._shards[history_key].busy:
+                continue
+            LOGGER.debug("Chat history shard evicted (budget): %s", history_key)
+            self._drop_shard(history_key)
+
+    async def _async_evict_idle(self, _now=None) -> None:
+        """Evict shards that have not been used recently."""
+        deadline = time.monotonic() - CHAT_HISTORY_CACHE_IDLE_SECONDS
+        for history_key, shard in list(self._shards.items()):
+            if shard.last_access < deadline and not shard.busy:
+                LOGGER.debug("Chat history shard evicted (idle): %s", history_key)
+                self._drop_shard(history_key)
+
+    async def _do_save(
+        self, user_id: str, messages: list[tuple[str, dict[str, Any]]]
+    ):
+        """Internal save implementation (runs async).
+
+        All messages are appended to the log in a single write, so concurrent
+        exchanges of the same user never interleave.
+        """
+        shard = await self._get_shard(user_id)
+        history_key = self._get_history_key(user_id)
+
+        async with shard.lock:
+            if shard.cleared:
+                LOGGER.debug("Chat history cleared, save dropped: %s", history_key)
+                return
+            now = time.time()
+            new_messages = []
+            for role, data in messages:
+                shard.last_seq += 1
+                new_messages.append(
+                    {
+                        "role": role,
+                        "data": data,
+                        "timestamp": now,
+                        "seq": shard.last_seq,
+                    }
+                )
+
+            # Append to disk first so memory never holds unsaved messages
+            try:
+                await self.hass.async_add_executor_job(shard.log.append, new_messages)
+            except OSError as err:
+                shard.last_seq -= len(new_messages)
+                LOGGER.error("Failed to save chat history: %s", err)
+                return
+
+            for msg in new_messages:
+                _prepare_message(msg)
+            shard.messages.extend(new_messages)
+            shard.data["last_updated"] = now
+            shard.log_messages += len(new_messages)
+            self._resize_shard(
+                history_key, shard, sum(_message_size(msg) for msg in new_messages)
+            )
+            self._trim_shard(history_key, shard)
             LOGGER.debug(
-                "Chat history saved: %s role=%s len=%d", history_key, role, len(content)
+                "Chat history appended: %s messages=%d log_messages=%d",
+                history_key,
+                len(new_messages),
+                shard.log_messages,
             )
+
+            if (
+                shard.log_messages > RECOMMENDED_CHAT_HISTORY_MAX_MESSAGES
+                and not shard.compacting
+            ):
+                shard.compacting = True
+                self.hass.async_create_background_task(
+                    self._async_compact(history_key, shard),
+                    f"{history_key} chat history compaction",
+                )
+
+        self._evict_over_budget(keep=history_key)
+
+    async def _async_compact(self, history_key: str, shard: _HistoryShard):
+        """Fold the log into the snapshot and truncate the log."""
+        try:
+            async with shard.lock:
+                if shard.cleared:
+                    return
+                shard.data["last_seq"] = shard.last_seq
+                await shard.store.async_save(
+                    {
+                        **shard.data,
+                        "messages": [_stored_message(msg) for msg in shard.messages],
+                    }
+                )
+                # A crash before truncating is harmless: the loader skips
+                # log entries already covered by the snapshot's last_seq.
+                await self.hass.async_add_executor_job(shard.log.truncate)
+                shard.log_messages = 0
+                LOGGER.debug("Chat history compacted: %s", history_key)
         except Exception as err:
-            LOGGER.error("Failed to save chat history: %s", err)
+            LOGGER.error("Failed to compact chat history %s: %s", history_key, err)
+        finally:
+            shard.compacting = False
 
-    async def save_message_async(self, user_id: str, role: str, content: str):
+    async def save_message_async(
+        self, user_id: str, role: str, content: str | dict[str, Any]
+    ):
         """Save message asynchronously.
 
         Args:
             user_id: User ID
             role: Message role (user/assistant)
-            content: Message content
+            content: Message payload, or its JSON encoded form
+        """
+        if not isinstance(content, dict):
+            content = _parse_content(content)
+        await self._do_save(user_id, [(role, content)])
+
+    async def save_exchange_async(
+        self,
+        user_id: str,
+        user_data: dict[str, Any],
+        assistant_data: dict[str, Any],
+    ):
+        """Save a user prompt and the assistant reply as one atomic append.
+
+        Args:
+            user_id: User ID
+            user_data: User message payload
+            assistant_data: Assistant message payload
         """
-        await self._do_save(user_id, role, content)
+        await self._do_save(
+            user_id, [("user", user_data), ("assistant", assistant_data)]
+        )
 
     async def load_history(
         self, user_id: str, limit: int = DEFAULT_CHAT_HISTORY_SIZE
@@ -140,25 +499,24 @@ class ChatHistoryService:
             limit: Maximum number of messages to return
 
         Returns:
-            List of messages with role, content, timestamp
+            List of messages with role, data, fragments, timestamp and seq.
+            Use ``serialize_history_message`` for the frontend wire format.
         """
-        await self._ensure_loaded()
-
         # Defensive casting to ensure limit is an integer for slicing
         try:
             limit = int(limit)
         except (ValueError, TypeError):
             limit = DEFAULT_CHAT_HISTORY_SIZE
 
-        history_key = self._get_history_key(user_id)
-        history_entry = self._history.get(history_key)
+        shard = await self._get_shard(user_id)
+        messages = shard.messages
 
-        if not history_entry:
-            LOGGER.debug("No chat history found for %s", history_key)
+        if not messages:
+            LOGGER.debug(
+                "No chat history found for %s", self._get_history_key(user_id)
+            )
             return []
 
-        messages = history_entry.get("messages", [])
-
         # Return last N messages
         result = messages[-limit:] if limit else messages
 
@@ -170,17 +528,31 @@ class ChatHistoryService:
         Args:
             user_id: User ID
         """
-        await self._ensure_loaded()
-
+        shard = await self._get_shard(user_id)
         history_key = self._get_history_key(user_id)
 
-        if history_key in self._history:
-            del self._history[history_key]
+        if not shard.messages:
+            LOGGER.debug("No chat history to clear for %s", history_key)
+            return
 
+        async with shard.lock:
             try:
-                await self._store.async_save(self._history)
-                LOGGER.info("Chat history cleared: %s", history_key)
+                # Empty the log first: a log left behind by a failure would
+                # bring the cleared history back on the next load
+                await self.hass.async_add_executor_job(shard.log.truncate)
+                shard.log_messages = 0
+                await shard.store.async_remove()
             except Exception as err:
-                LOGGER.error("Failed to save after clearing history: %s", err)
-        else:
-            LOGGER.debug("No chat history to clear for %s", history_key)
+                # The shard stays loaded, so nothing is lost until a restart
+                LOGGER.error("Failed to remove chat history %s: %s", history_key, err)
+                return
+            shard.cleared = True
+            self._drop_shard(history_key)
+            try:
+                await self.hass.async_add_executor_job(shard.log.remove)
+            except OSError as err:
+                # Already empty: an empty log restores nothing
+                LOGGER.debug(
+                    "Failed to remove chat history log %s: %s", history_key, err
+                )
+            LOGGER.info("Chat history cleared: %s", history_key)
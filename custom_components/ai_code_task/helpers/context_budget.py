@@ -0,0 +1,209 @@
+"""Context budgeting for AI Code Task prompts.
+
+Fits a prompt into the configured context size instead of rejecting it.
+Sections are trimmed in priority order:
+
+1. Oldest history messages are dropped.
+2. Attachments are truncated, largest first.
+3. The code context is windowed to its head and tail.
+
+The system prompt, entity context and user prompt are never trimmed; if
+they alone exceed the budget the request is still rejected.
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+from ..const import CHARS_PER_TOKEN
+from .prompt_builder import PromptBuilder
+
+ATTACHMENT_TRUNCATED_MARKER = "\n[... {count} chars truncated to fit the context budget]"
+CODE_WINDOW_MARKER = (
+    "\n[... {count} lines omitted to fit the context budget; "
+    "return only the parts you change ...]\n"
+)
+
+# Passes over the trimming policy before giving up (markers change sizes)
+_MAX_PASSES = 3
+
+
+def estimate_tokens(text: str | None) -> int:
+    """Estimate the token count of a text (~4 chars per token)."""
+    if not text:
+        return 0
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+class ContextBudgeter:
+    """Trim prompt sections so the assembled prompt fits the budget."""
+
+    def __init__(self, prompt_builder: PromptBuilder, max_chars: int) -> None:
+        """Initialize with the prompt builder and the budget in characters."""
+        self.prompt_builder = prompt_builder
+        self.max_chars = max_chars
+
+    def estimate_sections(
+        self,
+        system_prompt: str,
+        history_messages: list[dict],
+        code_context: str,
+        attachments: list[dict] | None,
+        entity_context: str,
+    ) -> dict[str, int]:
+        """Estimate the tokens used by each prompt section."""
+        return {
+            "system": estimate_tokens(system_prompt),
+            "entities": estimate_tokens(entity_context),
+            "history": sum(
+                estimate_tokens(
+                    self.prompt_builder.render_history_message(msg, code_context)
+                )
+                for msg in history_messages
+            ),
+            "code": estimate_tokens(code_context),
+            "attachments": sum(
+                estimate_tokens(att.get("content")) for att in attachments or []
+            ),
+        }
+
+    def fit(
+        self,
+        system_prompt: str,
+        history_messages: list[dict],
+        user_prompt: str,
+        code_context: str = "",
+        file_path: str = "",
+        attachments: list[dict] | None = None,
+        entity_context: str = "",
+    ) -> tuple[str, dict[str, Any]]:
+        """Build the prompt, trimming sections until it fits the budget.
+
+        Returns:
+            Tuple of (prompt, trim report). The report is empty when nothing
+            was trimmed; the prompt may still exceed the budget when only
+            untrimmable sections remain.
+        """
+        history = list(history_messages)
+        attachments = [dict(att) for att in attachments or []]
+        report: dict[str, Any] = {}
+
+        def _build() -> str:
+            return self.prompt_builder.build_conversation_context(
+                system_prompt=system_prompt,
+                history_messages=history,
+                user_prompt=user_prompt,
+                code_context=code_context,
+                file_path=file_path,
+                attachments=attachments,
+                entity_context=entity_context,
+            )
+
+        prompt = _build()
+        if len(prompt) <= self.max_chars:
+            return prompt, report
+
+        report["sections"] = self.estimate_sections(
+            system_prompt, history, code_context, attachments, entity_context
+        )
+
+        for _ in range(_MAX_PASSES):
+            excess = len(prompt) - self.max_chars
+            if excess <= 0:
+                break
+            excess = self._drop_history(history, code_context, excess, report)
+            if excess > 0:
+                excess = self._truncate_attachments(attachments, excess, report)
+            if excess > 0:
+                code_context = self._window_code(code_context, excess, report)
+            prompt = _build()
+
+        report["budget_tokens"] = self.max_chars // CHARS_PER_TOKEN
+        report["prompt_tokens"] = estimate_tokens(prompt)
+        return prompt, report
+
+    def _drop_history(
+        self,
+        history: list[dict],
+        code_context: str,
+        excess: int,
+        report: dict[str, Any],
+    ) -> int:
+        """Drop oldest history messages; return the remaining excess."""
+        dropped = 0
+        while history and excess > 0:
+            msg = history.pop(0)
+            excess -= len(self.prompt_builder.render_history_message(msg, code_context))
+            dropped += 1
+        if dropped:
+            report["history_messages_dropped"] = (
+                report.get("history_messages_dropped", 0) + dropped
+            )
+        return excess
+
+    def _truncate_attachments(
+        self, attachments: list[dict], excess: int, report: dict[str, Any]
+    ) -> int:
+        """Truncate the largest attachments; return the remaining excess."""
+        truncated = report.setdefault("attachments_truncated", {})
+        for att in sorted(
+            attachments, key=lambda att: len(att.get("content") or ""), reverse=True
+        ):
+            if excess <= 0:
+                break
+            # Keep the untrimmed text so later passes cut from the original
+            source = att.setdefault("_source", att.get("content") or "")
+            kept = att.get("_kept", len(source))
+            if not kept:
+                continue
+            current_len = len(att.get("content") or "")
+            marker = ATTACHMENT_TRUNCATED_MARKER.format(count=len(source))
+            keep = max(0, kept - excess - len(marker))
+            att["_kept"] = keep
+            att["content"] = source[:keep] + ATTACHMENT_TRUNCATED_MARKER.format(
+                count=len(source) - keep
+            )
+            truncated[att.get("filename", "unknown")] = len(source) - keep
+            excess -= current_len - len(att["content"])
+        if not truncated:
+            del report["attachments_truncated"]
+        return excess
+
+    def _window_code(self, code_context: str, excess: int, report: dict[str, Any]) -> str:
+        """Keep the head and tail of the code context within the budget."""
+        lines = code_context.splitlines(keepends=True)
+        marker = CODE_WINDOW_MARKER.format(count=len(lines))
+        keep_chars = len(code_context) - excess - len(marker)
+        if not lines or keep_chars <= 0:
+            if code_context:
+                report["code_lines_omitted"] = (
+                    report.get("code_lines_omitted", 0) + len(lines)
+                )
+            return ""
+
+        head: list[str] = []
+        tail: list[str] = []
+        used = 0
+        start, end = 0, len(lines) - 1
+        # Alternate head/tail lines so both ends of the file stay visible
+        while start <= end:
+            line = lines[start] if len(head) <= len(tail) else lines[end]
+            if used + len(line) > keep_chars:
+                break
+            used += len(line)
+            if len(head) <= len(tail):
+                head.append(line)
+                start += 1
+            else:
+                tail.append(line)
+                end -= 1
+
+        omitted = len(lines) - len(head) - len(tail)
+        if not omitted:
+            return code_context
+        report["code_lines_omitted"] = report.get("code_lines_omitted", 0) + omitted
+        return (
+            "".join(head)
+            + CODE_WINDOW_MARKER.format(count=omitted)
+            + "".join(reversed(tail))
+        )
@@ -0,0 +1,147 @@
+"""Fuzzy path matching for the quick-open file finder.
+
+A path matches when the query is a case-insensitive subsequence of it.
+Matches are scored like editor quick-open: characters at the start of a
+path segment or word, consecutive runs and matches in the file name score
+higher, while gaps and long paths score lower.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Sequence
+import heapq
+import os
+import time
+from typing import Any
+
+SCORE_MATCH = 16
+BONUS_SEGMENT = 12  # first character of a directory or file name
+BONUS_WORD = 8  # after "_", "-", "." or " "
+BONUS_CAMEL = 6  # lower to upper case transition
+BONUS_CONSECUTIVE = 10
+BONUS_BASENAME = 4
+PENALTY_GAP_START = 3
+PENALTY_GAP_EXTENSION = 1
+MAX_GAP_PENALTY = 12
+# One point lost per LENGTH_PENALTY_CHARS characters of path
+LENGTH_PENALTY_CHARS = 8
+# How many paths are matched between two deadline checks
+DEADLINE_CHECK_INTERVAL = 512
+
+_WORD_SEPARATORS = frozenset("_-. ")
+
+
+def _align(lower: str, query: str, end: int) -> list[int]:
+    """Match the query backwards from end: the tightest span ending there."""
+    positions = [0] * len(query)
+    for index in range(len(query) - 1, -1, -1):
+        end = lower.rfind(query[index], 0, end)
+        positions[index] = end
+    return positions
+
+
+def _score(path: str, positions: list[int]) -> int:
+    """Score matched positions within path."""
+    basename = path.rfind(os.sep) + 1
+    score = -(len(path) // LENGTH_PENALTY_CHARS)
+    previous = -1
+    for pos in positions:
+        score += SCORE_MATCH
+        before = path[pos - 1] if pos else os.sep
+        if before == os.sep:
+            score += BONUS_SEGMENT
+        elif before in _WORD_SEPARATORS:
+            score += BONUS_WORD
+        elif before.islower() and path[pos].isupper():
+            score += BONUS_CAMEL
+        if pos >= basename:
+            score += BONUS_BASENAME
+        if previous >= 0:
+            gap = pos - previous - 1
+            if gap == 0:
+                score += BONUS_CONSECUTIVE
+            else:
+                score -= min(
+                    PENALTY_GAP_START + PENALTY_GAP_EXTENSION * (gap - 1),
+                    MAX_GAP_PENALTY,
+                )
+        previous = pos
+    return score
+
+
+def fuzzy_match(query: str, path: str) -> tuple[int, list[int]] | None:
+    """Score path against a lowercase query.
+
+    Args:
+        query: Lowercase query without whitespace
+        path: Path relative to the configuration directory
+
+    Returns:
+        Tuple of (score, matched character positions), or None if the query
+        is not a subsequence of the path
+    """
+    lower = path.lower()
+    if len(lower) != len(path):
+        # Lowercasing changed the length: positions must index into path
+        lower = path
+    # Forward pass: the earliest position where the whole query has matched
+    end = -1
+    for char in query:
+        end = lower.find(char, end + 1)
+        if end == -1:
+            return None
+
+    positions = _align(lower, query, end + 1)
+    best = _score(path, positions), positions
+    # Also try ending at the last occurrence, which favours file name matches
+    last = lower.rfind(query[-1]) if query else end
+    if last != end:
+        positions = _align(lower, query, last + 1)
+        best = max(best, (_score(path, positions), positions))
+    return best
+
+
+def find_paths(
+    paths: Sequence[str], query: str, limit: int, time_budget: float
+) -> dict[str, Any]:
+    """Rank paths against a query within a time budget.
+
+    Args:
+        paths: Candidate paths
+        query: User query (case and whitespace are ignored)
+        limit: Maximum number of matches to return
+        time_budget: Seconds after which the search stops early
+
+    Returns:
+        Dict with the ``matches`` (best first, each with ``path``, ``score``
+        and ``positions``), the number of paths ``searched`` and whether the
+        search was ``complete``
+    """
+    query = "".join(query.split()).lower()
+    deadline = time.monotonic() + time_budget
+    # Min-heap of the best matches: (score, -length, path, positions)
+    best: list[tuple[int, int, str, list[int]]] = []
+    searched = 0
+    complete = True
+    for path in paths:
+        if searched % DEADLINE_CHECK_INTERVAL == 0 and searched:
+            if time.monotonic() > deadline:
+                complete = False
+                break
+        searched += 1
+        match = fuzzy_match(query, path)
+        if match is None:
+            continue
+        entry = (match[0], -len(path), path, match[1])
+        if len(best) < limit:
+            heapq.heappush(best, entry)
+        elif entry[:3] > best[0][:3]:
+            heapq.heapreplace(best, entry)
+
+    matches = [
+        {"path": path, "score": score, "positions": positions}
+        for score, _, path, positions in sorted(
+            best, key=lambda entry: (-entry[0], -entry[1], entry[2])
+        )
+    ]
+    return {"matches": matches, "searched": searched, "complete": complete}
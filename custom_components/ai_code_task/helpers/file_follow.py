@@ -0,0 +1,245 @@
+"""Live following of the lines appended to log files.
+
+All followed files share one timer. Each tick, a single executor job opens
+every followed file once and reads what was appended since each follower's
+position, so adding followers does not add executor threads. The tick
+interval is also the batching window: a busy log produces at most one
+message per follower per tick rather than one per line.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Callable
+from datetime import datetime, timedelta
+import os
+from typing import Any, BinaryIO
+
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.event import async_track_time_interval
+
+from ..const import (
+    FILE_FOLLOW_INTERVAL_SECONDS,
+    FILE_FOLLOW_MAX_BUFFER_BYTES,
+    LOGGER,
+)
+
+
+class _Follower:
+    """One subscription: its position in the file and event callback."""
+
+    def __init__(
+        self, position: int, on_event: Callable[[dict[str, Any]], None]
+    ) -> None:
+        """Initialize at a byte position."""
+        self.position = position
+        self.on_event = on_event
+        # File size when last read, so an incomplete last line is not
+        # read again until the file grows
+        self.seen_size = -1
+        self.active = True
+
+
+class _FollowedFile:
+    """A followed file and the identity of the file currently at its path."""
+
+    def __init__(self, path: str, identity: tuple[int, int]) -> None:
+        """Initialize."""
+        self.path = path
+        self.identity: tuple[int, int] | None = identity
+        self.followers: list[_Follower] = []
+
+
+def read_appended(file: BinaryIO, position: int, size: int) -> dict[str, Any] | None:
+    """Read the complete lines between position and size.
+
+    At most ``FILE_FOLLOW_MAX_BUFFER_BYTES`` are read: when more was
+    appended, the oldest data is skipped up to the next line start and
+    counted as ``dropped``.
+
+    Args:
+        file: File opened in binary mode
+        position: Byte position of the follower
+        size: Current file size
+
+    Returns:
+        A ``lines`` event with the byte ``offset`` and ``end`` of the lines,
+        or None if no line was completed since position
+    """
+    start = max(position, size - FILE_FOLLOW_MAX_BUFFER_BYTES)
+    file.seek(start)
+    data = file.read(size - start)
+    if start > position:
+        # Resume at the first line that starts inside the buffer
+        cut = data.find(b"\n") + 1
+        data = data[cut:]
+        start += cut
+    end = data.rfind(b"\n") + 1
+    if not end:
+        if start == position and len(data) < FILE_FOLLOW_MAX_BUFFER_BYTES:
+            return None
+        # Over-long line: send what fits rather than stall
+        end = len(data)
+    lines = data[:end].decode("utf-8", errors="replace").split("\n")
+    if data[end - 1 : end] == b"\n":
+        lines.pop()
+    return {
+        "type": "lines",
+        "lines": [line.rstrip("\r") for line in lines],
+        "offset": start,
+        "end": start + end,
+        "dropped": start - position,
+    }
+
+
+def _poll_file(followed: _FollowedFile) -> list[tuple[_Follower, dict[str, Any]]]:
+    """Collect the events of the followers of one file."""
+    events: list[tuple[_Follower, dict[str, Any]]] = []
+    try:
+        file = open(followed.path, "rb")
+    except OSError:
+        # Rotation in progress: the next file at this path is new
+        followed.identity = None
+        return events
+
+    with file:
+        stat = os.fstat(file.fileno())
+        identity = (stat.st_dev, stat.st_ino)
+        rotated = identity != followed.identity
+        followed.identity = identity
+        # Followers at the same position share a read
+        reads: dict[int, dict[str, Any] | None] = {}
+        for follower in list(followed.followers):
+            if rotated or stat.st_size < follower.position:
+                events.append(
+                    (
+                        follower,
+                        {
+                            "type": "rotated" if rotated else "truncated",
+                            "size": stat.st_size,
+                        },
+                    )
+                )
+                follower.position = 0
+                follower.seen_size = -1
+            if stat.st_size == follower.seen_size:
+                continue
+            follower.seen_size = stat.st_size
+            if follower.position not in reads:
+                reads[follower.position] = read_appended(
+                    file, follower.position, stat.st_size
+                )
+            event = reads[follower.position]
+            if event is not None:
+                follower.position = event["end"]
+                events.append((follower, event))
+    return events
+
+
+def _poll_files(
+    files: list[_FollowedFile],
+) -> list[tuple[_Follower, dict[str, Any]]]:
+    """Collect the events of all followers (runs in the executor)."""
+    events = []
+    for followed in files:
+        try:
+            events.extend(_poll_file(followed))
+        except OSError as err:
+            LOGGER.debug("Cannot follow %s: %s", followed.path, err)
+    return events
+
+
+class FileFollower:
+    """Push the lines appended to followed files to their subscribers."""
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize."""
+        self.hass = hass
+        self._files: dict[str, _FollowedFile] = {}
+        self._unsub_poll: CALLBACK_TYPE | None = None
+        self._polling = False
+
+    @property
+    def follower_count(self) -> int:
+        """Return the number of active followers."""
+        return sum(len(followed.followers) for followed in self._files.values())
+
+    @property
+    def stats(self) -> dict[str, Any]:
+        """Return the followed files and follower count."""
+        return {"files": len(self._files), "followers": self.follower_count}
+
+    async def async_follow(
+        self,
+        path: str,
+        offset: int | None,
+        on_event: Callable[[dict[str, Any]], None],
+    ) -> tuple[CALLBACK_TYPE, dict[str, Any]]:
+        """Start following a file.
+
+        Args:
+            path: Absolute path of the file
+            offset: Byte position to start from, or None for the end
+            on_event: Callback receiving the ``lines``, ``rotated`` and
+                ``truncated`` events
+
+        Returns:
+            Tuple of (callback to stop following, dict with the starting
+            ``offset`` and the file ``size``)
+
+        Raises:
+            OSError: If the file cannot be read
+        """
+        stat = await self.hass.async_add_executor_job(os.stat, path)
+        position = stat.st_size if offset is None else min(offset, stat.st_size)
+        followed = self._files.get(path)
+        if followed is None:
+            followed = self._files[path] = _FollowedFile(
+                path, (stat.st_dev, stat.st_ino)
+            )
+        follower = _Follower(position, on_event)
+        followed.followers.append(follower)
+        if self._unsub_poll is None:
+            self._unsub_poll = async_track_time_interval(
+                self.hass,
+                self._async_poll,
+                timedelta(seconds=FILE_FOLLOW_INTERVAL_SECONDS),
+            )
+
+        @callback
+        def _unfollow() -> None:
+            follower.active = False
+            if follower in followed.followers:
+                followed.followers.remove(follower)
+            if not followed.followers and self._files.get(path) is followed:
+                del self._files[path]
+            if not self._files and self._unsub_poll is not None:
+                self._unsub_poll()
+                self._unsub_poll = None
+
+        return _unfollow, {"offset": position, "size": stat.st_size}
+
+    @callback
+    def async_stop(self) -> None:
+        """Stop polling and drop all followers."""
+        if self._unsub_poll is not None:
+            self._unsub_poll()
+            self._unsub_poll = None
+        for followed in self._files.values():
+            for follower in followed.followers:
+                follower.active = False
+        self._files.clear()
+
+    async def _async_poll(self, _now: datetime | None = None) -> None:
+        """Read the appended lines of all followed files and dispatch them."""
+        if self._polling or not self._files:
+            return
+        self._polling = True
+        try:
+            events = await self.hass.async_add_executor_job(
+                _poll_files, list(self._files.values())
+            )
+        finally:
+            self._polling = False
+        for follower, event in events:
+            if follower.active:
+                follower.on_event(event)
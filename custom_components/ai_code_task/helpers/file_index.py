@@ -0,0 +1,624 @@
+"""In-memory index of the files the explorer may show under /config.
+
+The tree is scanned once in the background, then kept current from
+filesystem notifications when ``watchdog`` is installed, or otherwise by
+periodically re-scanning the directories whose mtime changed. A file written
+in place, such as a log, does not change the mtime of its directory, so the
+files recently opened or followed are re-stated as well; other files pick up
+their new size and mtime when their directory next changes. The directory
+mtimes are checked in batches, so one executor job never walks the whole
+tree. Directory listings are kept sorted, so serving one is a dict lookup.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections import OrderedDict
+from collections.abc import Iterable, Iterator
+from contextlib import suppress
+from datetime import datetime, timedelta
+import fnmatch
+import os
+from typing import Any
+
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later, async_track_time_interval
+
+from ..const import (
+    ALLOWED_FILES_MAP,
+    EXCLUDED_FILES,
+    FILE_INDEX_DEBOUNCE_SECONDS,
+    FILE_INDEX_MAX_ENTRIES,
+    FILE_INDEX_RESCAN_BATCH,
+    FILE_INDEX_RESCAN_SECONDS,
+    FILE_INDEX_WATCHED_FILES,
+    LOGGER,
+)
+
+try:
+    from watchdog.events import FileSystemEvent, FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:  # Optional: the periodic rescan keeps the index current
+    FileSystemEventHandler = object
+    Observer = None
+
+# Directory listing: (directory mtime, items by name)
+_Directory = tuple[float, dict[str, dict[str, Any]]]
+
+
+def is_listed(name: str, is_dir: bool) -> bool:
+    """Return whether the explorer may show an entry with this name."""
+    if name.startswith("."):
+        return False
+    if any(fnmatch.fnmatch(name, pattern) for pattern in EXCLUDED_FILES):
+        return False
+    return is_dir or os.path.splitext(name)[1].lower() in ALLOWED_FILES_MAP
+
+
+def entry_item(entry: os.DirEntry, config_dir: str) -> dict[str, Any] | None:
+    """Describe a directory entry for the explorer.
+
+    Args:
+        entry: Entry returned by ``os.scandir``
+        config_dir: Home Assistant configuration directory
+
+    Returns:
+        Item dict, or None if the entry is hidden, excluded or not allowed
+    """
+    try:
+        is_dir = entry.is_dir()
+        if not is_listed(entry.name, is_dir):
+            return None
+        stat = entry.stat()
+    except OSError:
+        return None
+    return {
+        "name": entry.name,
+        "path": os.path.relpath(entry.path, config_dir),
+        "is_dir": is_dir,
+        "size": None if is_dir else stat.st_size,
+        "mtime": stat.st_mtime,
+    }
+
+
+def sort_key(item: dict[str, Any]) -> tuple[bool, str]:
+    """Sort directories first, then alphabetically."""
+    return not item["is_dir"], item["name"].lower()
+
+
+class _Descending:
+    """Wrap a value so that it sorts in reverse order."""
+
+    __slots__ = ("value",)
+
+    def __init__(self, value: Any) -> None:
+        """Initialize the wrapper."""
+        self.value = value
+
+    def __lt__(self, other: _Descending) -> bool:
+        """Compare in reverse."""
+        return other.value < self.value
+
+    def __eq__(self, other: object) -> bool:
+        """Compare the wrapped values."""
+        return isinstance(other, _Descending) and self.value == other.value
+
+
+def order_key(item: dict[str, Any], sort: str) -> tuple[bool, Any, str]:
+    """Return the JSON serializable position of item in a sorted listing.
+
+    Directories come first; ties on the sort field are broken by name.
+    """
+    if sort == "mtime":
+        value = item["mtime"]
+    elif sort == "size":
+        value = item["size"] or 0
+    else:
+        value = item["name"].lower()
+    return not item["is_dir"], value, item["name"]
+
+
+def comparable_key(key: tuple[bool, Any, str], descending: bool) -> tuple:
+    """Make an order key comparable in the requested direction."""
+    if not descending:
+        return key
+    return key[0], _Descending(key[1:])
+
+
+def order_items(
+    items: Iterable[dict[str, Any]], sort: str, descending: bool
+) -> tuple[list[dict[str, Any]], list[tuple]]:
+    """Sort items by a field (name, mtime or size), directories first.
+
+    Returns:
+        Tuple of (sorted items, their comparable keys for bisecting)
+    """
+    keyed = sorted(
+        ((comparable_key(order_key(item, sort), descending), item) for item in items),
+        key=lambda pair: pair[0],
+    )
+    return [item for _, item in keyed], [key for key, _ in keyed]
+
+
+class _EventHandler(FileSystemEventHandler):
+    """Forward watchdog events to the index (runs in the observer thread)."""
+
+    def __init__(self, index: FileIndex) -> None:
+        """Initialize the handler."""
+        super().__init__()
+        self._index = index
+
+    def on_any_event(self, event: FileSystemEvent) -> None:
+        """Queue the directories or file touched by the event."""
+        index = self._index
+        src = index.relative(event.src_path)
+        if event.event_type == "modified":
+            if src is None:
+                return
+            if event.is_directory:
+                index.hass.loop.call_soon_threadsafe(index.async_mark_dirty, src)
+            else:
+                index.hass.loop.call_soon_threadsafe(index.async_mark_stale, src)
+            return
+        if event.event_type not in ("created", "deleted", "moved"):
+            return
+        parents = {os.path.dirname(src)} if src is not None else set()
+        dest = index.relative(getattr(event, "dest_path", ""))
+        if dest is not None:
+            parents.add(os.path.dirname(dest))
+        for parent in parents:
+            index.hass.loop.call_soon_threadsafe(index.async_mark_dirty, parent)
+
+
+class FileIndex:
+    """Index of the allowed files under the configuration directory."""
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the index."""
+        self.hass = hass
+        self.config_dir = hass.config.config_dir
+        self._dirs: dict[str, _Directory] = {}
+        self._listings: dict[str, list[dict[str, Any]]] = {}
+        self._entries = 0
+        # Listings in other orders, by directory then (sort, descending)
+        self._orders: dict[str, dict[tuple[str, bool], tuple[list, list]]] = {}
+        # File paths of the whole tree, rebuilt after the tree changes
+        self._file_paths: tuple[str, ...] | None = None
+        self._ready = False
+        self._truncated = False
+        # Directories to re-scan and files to re-stat on the next flush
+        self._dirty_dirs: set[str] = set()
+        self._stale_files: set[str] = set()
+        # Files recently opened or followed, re-stated by the rescan
+        self._watched: OrderedDict[str, None] = OrderedDict()
+        self._rescanning = False
+        self._lock = asyncio.Lock()
+        self._build_task: asyncio.Task | None = None
+        self._observer: Any = None
+        self._unsub_flush: CALLBACK_TYPE | None = None
+        self._unsub_rescan: CALLBACK_TYPE | None = None
+
+    @property
+    def ready(self) -> bool:
+        """Return whether the initial scan has completed."""
+        return self._ready
+
+    @property
+    def stats(self) -> dict[str, Any]:
+        """Return the size and update mode of the index."""
+        return {
+            "ready": self._ready,
+            "directories": len(self._dirs),
+            "entries": self._entries,
+            "truncated": self._truncated,
+            "watching": self._observer is not None,
+        }
+
+    def relative(self, path: str | bytes) -> str | None:
+        """Return path relative to config_dir, or None if it is never indexed.
+
+        Safe to call from any thread.
+        """
+        if not isinstance(path, str) or not path:
+            return None
+        rel = os.path.relpath(path, self.config_dir)
+        if rel == ".":
+            return ""
+        if rel.startswith(".."):
+            return None
+        # Hidden directories (.storage, .git...) are never listed
+        if any(part.startswith(".") for part in rel.split(os.sep)):
+            return None
+        return rel
+
+    def listing(self, rel_dir: str) -> list[dict[str, Any]] | None:
+        """Return the sorted items of an indexed directory.
+
+        Args:
+            rel_dir: Directory relative to config_dir ("" for the root)
+
+        Returns:
+            Items (shared, must not be modified), or None if not indexed
+        """
+        return self._listings.get(rel_dir)
+
+    def ordered_listing(
+        self, rel_dir: str, sort: str, descending: bool
+    ) -> tuple[list[dict[str, Any]], list[tuple]] | None:
+        """Return an indexed directory sorted by name, mtime or size.
+
+        Returns:
+            Result of ``order_items`` (cached until the directory changes),
+            or None if the directory is not indexed
+        """
+        listing = self._listings.get(rel_dir)
+        if listing is None:
+            return None
+        orders = self._orders.setdefault(rel_dir, {})
+        if (ordered := orders.get((sort, descending))) is None:
+            ordered = orders[sort, descending] = order_items(listing, sort, descending)
+        return ordered
+
+    def iter_items(self) -> Iterator[dict[str, Any]]:
+        """Iterate over every indexed file and directory."""
+        for listing in self._listings.values():
+            yield from listing
+
+    def file_paths(self) -> tuple[str, ...]:
+        """Return the paths of every indexed file."""
+        if self._file_paths is None:
+            self._file_paths = tuple(
+                item["path"] for item in self.iter_items() if not item["is_dir"]
+            )
+        return self._file_paths
+
+    @callback
+    def async_start(self) -> None:
+        """Build the index in the background and start keeping it current."""
+        self._build_task = self.hass.async_create_background_task(
+            self._async_build(), "ai_code_task file index build"
+        )
+
+    async def async_stop(self) -> None:
+        """Stop watching and drop the index."""
+        if self._build_task is not None:
+            build_task, self._build_task = self._build_task, None
+            build_task.cancel()
+            # Lets a build that was starting the observer stop it again
+            await asyncio.gather(build_task, return_exceptions=True)
+        for unsub in (self._unsub_flush, self._unsub_rescan):
+            if unsub is not None:
+                unsub()
+        self._unsub_flush = self._unsub_rescan = None
+        if self._observer is not None:
+            observer, self._observer = self._observer, None
+            await self.hass.async_add_executor_job(self._stop_observer, observer)
+        self._dirs.clear()
+        self._listings.clear()
+        self._orders.clear()
+        self._watched.clear()
+        self._file_paths = None
+        self._entries = 0
+        self._ready = False
+
+    async def async_refresh_path(self, rel_path: str) -> None:
+        """Bring the directory of a file written by us up to date now."""
+        if not self._ready:
+            return
+        self.async_mark_dirty(os.path.dirname(rel_path))
+        await self._async_flush()
+
+    @callback
+    def async_watch(self, path: str) -> None:
+        """Keep an opened or followed file current without watchdog.
+
+        Args:
+            path: Absolute path of the file
+        """
+        rel_path = self.relative(path)
+        if rel_path is None:
+            return
+        self._watched[rel_path] = None
+        self._watched.move_to_end(rel_path)
+        if len(self._watched) > FILE_INDEX_WATCHED_FILES:
+            self._watched.popitem(last=False)
+
+    @callback
+    def async_mark_dirty(self, rel_dir: str) -> None:
+        """Queue an indexed directory for a re-scan."""
+        if rel_dir in self._dirs:
+            self._dirty_dirs.add(rel_dir)
+            self._async_schedule_flush()
+
+    @callback
+    def async_mark_stale(self, rel_path: str) -> None:
+        """Queue an indexed file for a re-stat (its size or mtime changed)."""
+        directory = self._dirs.get(os.path.dirname(rel_path))
+        if directory is not None and os.path.basename(rel_path) in directory[1]:
+            self._stale_files.add(rel_path)
+            self._async_schedule_flush()
+
+    @callback
+    def _async_schedule_flush(self) -> None:
+        """Coalesce bursts of changes into one update."""
+        if self._unsub_flush is None:
+            self._unsub_flush = async_call_later(
+                self.hass, FILE_INDEX_DEBOUNCE_SECONDS, self._async_flush
+            )
+
+    async def _async_build(self) -> None:
+        """Scan the whole tree, then start the watcher or the periodic rescan."""
+        async with self._lock:
+            scanned = await self.hass.async_add_executor_job(
+                self._scan_tree, "", frozenset(), FILE_INDEX_MAX_ENTRIES
+            )
+            self._apply(scanned, {})
+            self._ready = True
+        LOGGER.debug(
+            "File index built: %d entries in %d directories",
+            self._entries,
+            len(self._dirs),
+        )
+
+        if Observer is not None:
+            start = self.hass.async_add_executor_job(self._start_observer)
+            try:
+                self._observer = await asyncio.shield(start)
+            except asyncio.CancelledError:
+                # Stopped while the observer was starting: stop it once started
+                with suppress(OSError):
+                    observer = await start
+                    await self.hass.async_add_executor_job(
+                        self._stop_observer, observer
+                    )
+                raise
+            except OSError as err:
+                LOGGER.warning("Cannot watch %s for changes: %s", self.config_dir, err)
+        if self._observer is None:
+            self._unsub_rescan = async_track_time_interval(
+                self.hass,
+                self._async_rescan,
+                timedelta(seconds=FILE_INDEX_RESCAN_SECONDS),
+            )
+        self._build_task = None
+
+    def _start_observer(self) -> Any:
+        """Start watching config_dir (runs in the executor)."""
+        observer = Observer()
+        observer.schedule(_EventHandler(self), self.config_dir, recursive=True)
+        observer.start()
+        return observer
+
+    @staticmethod
+    def _stop_observer(observer: Any) -> None:
+        """Stop a watchdog observer (runs in the executor)."""
+        observer.stop()
+        observer.join()
+
+    async def _async_rescan(self, _now: datetime | None = None) -> None:
+        """Re-scan changed directories and re-stat watched files (no watcher)."""
+        if self._rescanning:
+            return
+        self._rescanning = True
+        try:
+            mtimes = [(rel_dir, mtime) for rel_dir, (mtime, _) in self._dirs.items()]
+            changed: set[str] = set()
+            for start in range(0, len(mtimes), FILE_INDEX_RESCAN_BATCH):
+                changed.update(
+                    await self.hass.async_add_executor_job(
+                        self._changed_dirs,
+                        mtimes[start : start + FILE_INDEX_RESCAN_BATCH],
+                    )
+                )
+            watched = {}
+            for rel_path in self._watched:
+                rel_dir = os.path.dirname(rel_path)
+                directory = self._dirs.get(rel_dir)
+                if directory is None or rel_dir in changed:
+                    continue
+                item = directory[1].get(os.path.basename(rel_path))
+                if item is not None and not item["is_dir"]:
+                    watched[rel_path] = (item["size"], item["mtime"])
+            stale = await self.hass.async_add_executor_job(
+                self._changed_files, watched
+            )
+            for rel in changed:
+                self.async_mark_dirty(rel)
+            for rel_path in stale:
+                self.async_mark_stale(rel_path)
+            if self._dirty_dirs or self._stale_files:
+                await self._async_flush()
+        finally:
+            self._rescanning = False
+
+    async def _async_flush(self, _now: datetime | None = None) -> None:
+        """Apply the queued directory re-scans and file re-stats."""
+        if self._unsub_flush is not None:
+            self._unsub_flush()
+            self._unsub_flush = None
+        async with self._lock:
+            dirs, self._dirty_dirs = self._dirty_dirs, set()
+            files, self._stale_files = self._stale_files, set()
+            if not dirs and not files:
+                return
+            scanned, stats = await self.hass.async_add_executor_job(
+                self._refresh,
+                dirs,
+                files,
+                frozenset(self._dirs),
+                FILE_INDEX_MAX_ENTRIES - self._entries,
+            )
+            self._apply(scanned, stats)
+
+    def _scan_dir(self, rel_dir: str) -> tuple[float, dict, list[str]] | None:
+        """List one directory (runs in the executor).
+
+        Returns:
+            Tuple of (mtime, items by name, subdirectories to descend into),
+            or None if the directory cannot be read
+        """
+        path = os.path.join(self.config_dir, rel_dir)
+        items: dict[str, dict[str, Any]] = {}
+        subdirs = []
+        try:
+            mtime = os.stat(path).st_mtime
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    item = entry_item(entry, self.config_dir)
+                    if item is None:
+                        continue
+                    items[entry.name] = item
+                    # Symlinked directories are listed but not followed
+                    if item["is_dir"] and not entry.is_symlink():
+                        subdirs.append(entry.name)
+        except OSError as err:
+            LOGGER.debug("Cannot index %s: %s", path, err)
+            return None
+        return mtime, items, subdirs
+
+    def _scan_tree(
+        self, root: str, known: frozenset[str], budget: int
+    ) -> dict[str, _Directory | None]:
+        """Scan root and the subdirectories not yet indexed (runs in the executor).
+
+        Returns:
+            Directories by relative path; None for a root that is gone
+        """
+        scanned: dict[str, _Directory | None] = {}
+        pending = [root]
+        while pending:
+            rel_dir = pending.pop()
+            result = self._scan_dir(rel_dir)
+            if result is None:
+                if rel_dir == root:
+                    scanned[root] = None
+                continue
+            mtime, items, subdirs = result
+            scanned[rel_dir] = (mtime, items)
+            budget -= len(items)
+            for name in subdirs:
+                child = os.path.join(rel_dir, name)
+                if child in known:
+                    continue
+                if budget <= 0:
+                    if not self._truncated:
+                        self._truncated = True
+                        LOGGER.warning(
+                            "More than %d files under %s, only part of the tree "
+                            "is indexed",
+                            FILE_INDEX_MAX_ENTRIES,
+                            self.config_dir,
+                        )
+                    break
+                pending.append(child)
+        return scanned
+
+    def _refresh(
+        self, dirs: set[str], files: set[str], known: frozenset[str], budget: int
+    ) -> tuple[dict[str, _Directory | None], dict[str, os.stat_result | None]]:
+        """Re-scan dirs and re-stat files (runs in the executor)."""
+        scanned: dict[str, _Directory | None] = {}
+        for rel_dir in dirs:
+            scanned.update(self._scan_tree(rel_dir, known, budget))
+        stats: dict[str, os.stat_result | None] = {}
+        for rel_path in files:
+            if os.path.dirname(rel_path) in scanned:
+                continue
+            try:
+                stats[rel_path] = os.stat(os.path.join(self.config_dir, rel_path))
+            except OSError:
+                stats[rel_path] = None
+        return scanned, stats
+
+    def _changed_dirs(self, mtimes: list[tuple[str, float]]) -> list[str]:
+        """Find the directories whose mtime changed (runs in the executor).
+
+        Args:
+            mtimes: Directories and their mtime at the last scan
+
+        Returns:
+            Directories to re-scan
+        """
+        changed = []
+        for rel_dir, mtime in mtimes:
+            try:
+                current = os.stat(os.path.join(self.config_dir, rel_dir)).st_mtime
+            except OSError:
+                current = None
+            if current != mtime:
+                # A deleted directory is dropped when its parent is re-scanned
+                changed.append(os.path.dirname(rel_dir) if current is None else rel_dir)
+        return changed
+
+    def _changed_files(self, files: dict[str, tuple[int, float]]) -> list[str]:
+        """Find the files whose size or mtime changed (runs in the executor).
+
+        Args:
+            files: Size and mtime of each file at the last scan
+
+        Returns:
+            Files to re-stat
+        """
+        stale = []
+        for rel_path, (size, mtime) in files.items():
+            try:
+                stat = os.stat(os.path.join(self.config_dir, rel_path))
+            except OSError:
+                stale.append(rel_path)
+                continue
+            if stat.st_size != size or stat.st_mtime != mtime:
+                stale.append(rel_path)
+        return stale
+
+    @callback
+    def _apply(
+        self,
+        scanned: dict[str, _Directory | None],
+        stats: dict[str, os.stat_result | None],
+    ) -> None:
+        """Merge scan results into the index."""
+        if scanned:
+            self._file_paths = None
+        for rel_dir, directory in scanned.items():
+            old = self._dirs.get(rel_dir)
+            if directory is None:
+                self._drop_tree(rel_dir)
+                continue
+            if old is not None:
+                self._entries -= len(old[1])
+                # Forget subdirectories that were removed or replaced
+                for name, item in old[1].items():
+                    new = directory[1].get(name)
+                    if item["is_dir"] and (new is None or not new["is_dir"]):
+                        self._drop_tree(os.path.join(rel_dir, name))
+            self._dirs[rel_dir] = directory
+            self._listings[rel_dir] = sorted(directory[1].values(), key=sort_key)
+            self._orders.pop(rel_dir, None)
+            self._entries += len(directory[1])
+
+        for rel_path, stat in stats.items():
+            rel_dir = os.path.dirname(rel_path)
+            directory = self._dirs.get(rel_dir)
+            if directory is None:
+                continue
+            item = directory[1].get(os.path.basename(rel_path))
+            if item is None or item["is_dir"]:
+                continue
+            if stat is None:
+                self.async_mark_dirty(rel_dir)
+                continue
+            # Items are shared with the sorted listing: update them in place
+            item["size"] = stat.st_size
+            item["mtime"] = stat.st_mtime
+            self._orders.pop(rel_dir, None)
+
+    @callback
+    def _drop_tree(self, rel_dir: str) -> None:
+        """Remove a directory and everything below it from the index."""
+        prefix = rel_dir + os.sep
+        for key in [
+            key for key in self._dirs if key == rel_dir or key.startswith(prefix)
+        ]:
+            self._entries -= len(self._dirs.pop(key)[1])
+            self._listings.pop(key, None)
+            self._orders.pop(key, None)
@@ -2,20 +2,279 @@
 
 from __future__ import annotations
 
-import os
+import base64
+from bisect import bisect_right
+from collections.abc import Callable
+import contextlib
 import fnmatch
-from homeassistant.core import HomeAssistant
+import json
+import os
+import re
+import tempfile
+import threading
+from typing import Any
+
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant
+from homeassistant.exceptions import HomeAssistantError
+
+from ..const import (
+    ALLOWED_FILES_MAP,
+    EXCLUDED_FILES,
+    FILE_FIND_TIME_BUDGET,
+    FILE_FOLLOW_EXTENSIONS,
+    FILE_FOLLOW_MAX_FOLLOWERS,
+    FILE_READ_BLOCK_BYTES,
+    FILE_READ_MAX_BYTES,
+    FILE_SAVE_NEW_FILE_MODE,
+    LOGGER,
+)
+from .file_finder import find_paths
+from .file_follow import FileFollower
+from .file_index import (
+    FileIndex,
+    comparable_key,
+    entry_item,
+    order_items,
+    order_key,
+)
+from .file_patch import PatchError, apply_line_edits, apply_unified_diff
+from .file_search import search_batch
+
+
+class FileManagerError(HomeAssistantError):
+    """File operation failure carrying the websocket error code to report."""
+
+    def __init__(self, code: str, message: str) -> None:
+        """Initialize with a websocket error code and message."""
+        super().__init__(message)
+        self.code = code
+
+
+def _encode_cursor(
+    rel_dir: str, sort: str, descending: bool, key: tuple[bool, Any, str]
+) -> str:
+    """Encode the position after which the next page starts."""
+    data = {"p": rel_dir, "s": sort, "d": descending, "k": list(key)}
+    return base64.urlsafe_b64encode(json.dumps(data).encode("utf-8")).decode("ascii")
+
+
+def _decode_cursor(
+    cursor: str, rel_dir: str, sort: str, descending: bool
+) -> tuple[bool, Any, str]:
+    """Decode a cursor and check that it belongs to this listing."""
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        is_file, value, name = data["k"]
+        valid = (
+            data["p"] == rel_dir
+            and data["s"] == sort
+            and data["d"] == descending
+            and isinstance(is_file, bool)
+            and isinstance(name, str)
+            and isinstance(value, str if sort == "name" else (int, float))
+        )
+    except (ValueError, TypeError, KeyError, UnicodeError):
+        valid = False
+    if not valid:
+        raise FileManagerError("invalid_cursor", "Invalid cursor for this listing")
+    return is_file, value, name
+
+
+def version_token(stat: os.stat_result) -> str:
+    """Return the version token of a file: changes whenever the file does.
+
+    Built from the inode, modification time and size, so it costs a stat
+    rather than a read. An atomic save replaces the inode, so even a save
+    of the same size within the timestamp resolution changes the token.
+    """
+    return f"{stat.st_ino:x}-{stat.st_mtime_ns:x}-{stat.st_size:x}"
+
+
+def _check_version(
+    stat: os.stat_result | None, expected_version: str | None
+) -> None:
+    """Raise a conflict if the file no longer has the expected version."""
+    if expected_version is not None and (
+        stat is None or version_token(stat) != expected_version
+    ):
+        raise FileManagerError(
+            "conflict", "The file was changed since it was read; reload it first"
+        )
+
+
+def _write_atomic(path: str, data: bytes, expected_version: str | None) -> str:
+    """Replace a file with data through a synced temporary file.
+
+    Runs in the executor. The temporary file is created next to the target,
+    given the target's permissions (and owner, where allowed), synced and
+    renamed over it, so a crash leaves either the old or the new content.
+
+    Args:
+        path: File to write (a symlink is written through)
+        data: New content
+        expected_version: Token the file must still have, or None to save
+            unconditionally
 
-from ..const import ALLOWED_FILES_MAP, EXCLUDED_FILES, LOGGER
+    Returns:
+        Version token of the saved file
+
+    Raises:
+        FileManagerError: If the file changed since expected_version
+        OSError: If the file cannot be written
+    """
+    path = os.path.realpath(path)
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        stat = None
+    _check_version(stat, expected_version)
+
+    fd, temp_path = tempfile.mkstemp(
+        dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, "wb") as file:
+            file.write(data)
+            file.flush()
+            os.fsync(file.fileno())
+        if stat is None:
+            os.chmod(temp_path, FILE_SAVE_NEW_FILE_MODE)
+        else:
+            os.chmod(temp_path, stat.st_mode & 0o7777)
+            if hasattr(os, "chown"):
+                try:
+                    os.chown(temp_path, stat.st_uid, stat.st_gid)
+                except OSError:
+                    pass
+        os.replace(temp_path, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.unlink(temp_path)
+        raise
+
+    # Persist the rename itself
+    if hasattr(os, "O_DIRECTORY"):
+        with contextlib.suppress(OSError):
+            dir_fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
+    return version_token(os.stat(path))
+
+
+def _utf8_lead_skip(data: bytes) -> int:
+    """Return the number of leading UTF-8 continuation bytes."""
+    skip = 0
+    while skip < min(3, len(data)) and 0x80 <= data[skip] <= 0xBF:
+        skip += 1
+    return skip
+
+
+def _utf8_complete_length(data: bytes) -> int:
+    """Return the length of data without a trailing incomplete character."""
+    for back in range(1, min(4, len(data)) + 1):
+        byte = data[-back]
+        if byte < 0x80:
+            break
+        if byte >= 0xC0:
+            needed = 2 if byte < 0xE0 else 3 if byte < 0xF0 else 4
+            return len(data) if back >= needed else len(data) - back
+    return len(data)
+
+
+def _read_range(path: str, offset: int, length: int) -> dict[str, Any]:
+    """Read a byte range of a file (runs in the executor)."""
+    length = min(length, FILE_READ_MAX_BYTES)
+    with open(path, "rb") as file:
+        stat = os.fstat(file.fileno())
+        offset = min(offset, stat.st_size)
+        file.seek(offset)
+        data = file.read(length)
+    skip = _utf8_lead_skip(data) if offset else 0
+    end = offset + len(data)
+    keep = len(data) if end >= stat.st_size else _utf8_complete_length(data)
+    return {
+        "content": data[skip:keep].decode("utf-8", errors="replace"),
+        "size": stat.st_size,
+        "mtime": stat.st_mtime,
+        "offset": offset + skip,
+        "end": offset + keep,
+        "truncated": False,
+        "version": version_token(stat),
+    }
+
+
+def _read_tail(path: str, lines: int) -> dict[str, Any]:
+    """Read the last lines of a file, seeking back block by block.
+
+    Runs in the executor. A newline at the very end of the file does not
+    start a new line. Stops at ``FILE_READ_MAX_BYTES`` even if fewer lines
+    were found, in which case ``truncated`` is True.
+    """
+    blocks: list[bytes] = []
+    with open(path, "rb") as file:
+        stat = os.fstat(file.fileno())
+        pos = stat.st_size
+        newlines = 0
+        trailing = None
+        while pos > 0 and stat.st_size - pos < FILE_READ_MAX_BYTES:
+            size = min(
+                FILE_READ_BLOCK_BYTES, pos, FILE_READ_MAX_BYTES - (stat.st_size - pos)
+            )
+            pos -= size
+            file.seek(pos)
+            block = file.read(size)
+            blocks.append(block)
+            if trailing is None:
+                trailing = block.endswith(b"\n")
+            newlines += block.count(b"\n")
+            if newlines > lines - (0 if trailing else 1):
+                break
+    data = b"".join(reversed(blocks))
+
+    start = len(data) - 1 if data.endswith(b"\n") else len(data)
+    for _ in range(lines):
+        start = data.rfind(b"\n", 0, start)
+        if start == -1:
+            break
+    truncated = False
+    if start != -1:
+        start += 1
+    elif pos > 0:
+        # Byte cap reached before enough lines: start at a character boundary
+        start = _utf8_lead_skip(data)
+        truncated = True
+    else:
+        start = 0
+    return {
+        "content": data[start:].decode("utf-8", errors="replace"),
+        "size": stat.st_size,
+        "mtime": stat.st_mtime,
+        "offset": pos + start,
+        "end": pos + len(data),
+        "truncated": truncated,
+        "version": version_token(stat),
+    }
 
 
 class FileManager:
     """Class to manage file operations within Home Assistant /config."""
 
-    def __init__(self, hass: HomeAssistant) -> None:
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        index: FileIndex | None = None,
+        follower: FileFollower | None = None,
+    ) -> None:
         """Initialize."""
         self.hass = hass
         self.config_dir = hass.config.config_dir
+        self.index = index
+        self.follower = follower
+        self._save_lock = threading.Lock()
 
     def _is_excluded(self, filename: str) -> bool:
         """Check if a file should be excluded based on EXCLUDED_FILES patterns."""
@@ -47,93 +306,399 @@ class FileManager:
 
         return full_path
 
-    async def list_files(self, relative_path: str = "") -> list[dict]:
-        """List files and directories in a given path."""
-        # We need a custom resolve here because _resolve_path checks basename,
-        # but here 'relative_path' is a directory, so we don't want to block listing a folder
-        # just because its name matches an excluded file (unlikely for folders but safe to separate).
-        # However, checking if the *directory* itself is excluded isn't the requirement,
-        # we filter the *content* of the directory.
+    async def list_files(
+        self,
+        relative_path: str = "",
+        sort: str = "name",
+        descending: bool = False,
+        limit: int | None = None,
+        cursor: str | None = None,
+    ) -> dict[str, Any]:
+        """List a page of the files and directories in a given path.
+
+        Indexed directories are served from the file index; anything else
+        (index still building, symlinked or truncated subtrees) is scanned.
+
+        Args:
+            relative_path: Directory relative to the configuration directory
+            sort: "name", "mtime" or "size" (directories always come first)
+            descending: Reverse the order within directories and files
+            limit: Page size, or None for all remaining items
+            cursor: ``next_cursor`` of the previous page
 
+        Returns:
+            Dict with the ``items`` of the page, the ``next_cursor`` (None on
+            the last page) and the ``total`` number of items
+
+        Raises:
+            FileManagerError: If the cursor is invalid for this listing
+        """
+        # The directory itself is not checked against EXCLUDED_FILES: only
+        # its content is filtered
         full_path = self.hass.config.path(relative_path)
         if not full_path.startswith(self.config_dir):
-            return []
+            return {"items": [], "next_cursor": None, "total": 0}
+        rel_dir = os.path.relpath(full_path, self.config_dir)
+        if rel_dir == ".":
+            rel_dir = ""
+        after = _decode_cursor(cursor, rel_dir, sort, descending) if cursor else None
 
-        target_path = await self.hass.async_add_executor_job(lambda: full_path)
+        ordered = None
+        if self.index is not None:
+            ordered = self.index.ordered_listing(rel_dir, sort, descending)
+        if ordered is None:
 
-        if not target_path or not os.path.isdir(target_path):
-            return []
+            def _list():
+                if not os.path.isdir(full_path):
+                    return []
+                try:
+                    with os.scandir(full_path) as entries:
+                        return [
+                            item
+                            for entry in entries
+                            if (item := entry_item(entry, self.config_dir))
+                            is not None
+                        ]
+                except OSError as err:
+                    LOGGER.error("Error listing directory %s: %s", full_path, err)
+                    return []
 
-        def _list():
-            items = []
-            try:
-                for entry in os.scandir(target_path):
-                    # Skip hidden files/dirs (starting with .)
-                    if entry.name.startswith("."):
-                        continue
-
-                    # Skip excluded files
-                    if self._is_excluded(entry.name):
-                        continue
-
-                    # Filter files by allowed extensions
-                    if entry.is_file():
-                        _, ext = os.path.splitext(entry.name)
-                        if ext.lower() not in ALLOWED_FILES_MAP:
-                            continue
-
-                    items.append(
-                        {
-                            "name": entry.name,
-                            "path": os.path.relpath(entry.path, self.config_dir),
-                            "is_dir": entry.is_dir(),
-                            "size": entry.stat().st_size if entry.is_file() else None,
-                            "mtime": entry.stat().st_mtime,
-                        }
-                    )
-                # Sort: dirs first, then alphabetical
-                return sorted(items, key=lambda x: (not x["is_dir"], x["name"].lower()))
-            except Exception as err:
-                LOGGER.error("Error listing directory %s: %s", target_path, err)
-                return []
+            items = await self.hass.async_add_executor_job(_list)
+            ordered = order_items(items, sort, descending)
 
-        return await self.hass.async_add_executor_job(_list)
+        items, keys = ordered
+        # Keyset pagination: resume after the last item of the previous page,
+        # which stays correct when entries are added or removed in between
+        start = bisect_right(keys, comparable_key(after, descending)) if after else 0
+        end = len(items) if limit is None else min(start + limit, len(items))
+        next_cursor = None
+        if end < len(items):
+            next_cursor = _encode_cursor(
+                rel_dir, sort, descending, order_key(items[end - 1], sort)
+            )
+        return {
+            "items": items[start:end],
+            "next_cursor": next_cursor,
+            "total": len(items),
+        }
 
-    async def read_file(self, relative_path: str) -> str | None:
-        """Read content of a file."""
-        target_path = await self.hass.async_add_executor_job(
-            self._resolve_path, relative_path
+    async def find_files(self, query: str, limit: int) -> dict[str, Any]:
+        """Rank the indexed file paths against a fuzzy query.
+
+        Args:
+            query: Subsequence to look for in the paths
+            limit: Maximum number of matches
+
+        Returns:
+            Result of ``find_paths`` plus ``total`` (indexed files) and
+            ``ready`` (False while the index is still being built)
+        """
+        if self.index is None:
+            return {
+                "matches": [],
+                "searched": 0,
+                "complete": False,
+                "total": 0,
+                "ready": False,
+            }
+        paths = self.index.file_paths()
+        result = await self.hass.async_add_executor_job(
+            find_paths, paths, query, limit, FILE_FIND_TIME_BUDGET
         )
-        if not target_path or not os.path.isfile(target_path):
-            return None
+        return {**result, "total": len(paths), "ready": self.index.ready}
+
+    async def search_files(
+        self,
+        pattern: re.Pattern[str],
+        relative_path: str,
+        max_per_file: int,
+        max_results: int,
+        on_results: Callable[[list[dict]], None],
+    ) -> dict[str, Any]:
+        """Search the indexed files, streaming the matches.
+
+        Args:
+            pattern: Compiled query (see ``compile_query``)
+            relative_path: Only search below this directory ("" for all)
+            max_per_file: Maximum number of hits per file
+            max_results: Stop once this many hits were found
+            on_results: Called on the event loop with the files that matched
+                in each batch
+
+        Returns:
+            Summary with the number of files ``searched``, ``skipped`` and
+            ``timed_out`` (searched only in part), the ``hits`` found and
+            whether more hits exist than were sent (``truncated``)
+        """
+        summary = {
+            "searched": 0,
+            "skipped": 0,
+            "timed_out": 0,
+            "hits": 0,
+            "truncated": False,
+        }
+        full_path = self.hass.config.path(relative_path)
+        if self.index is None or not full_path.startswith(self.config_dir):
+            return summary
+        prefix = os.path.relpath(full_path, self.config_dir)
+        paths = self.index.file_paths()
+        if prefix != ".":
+            paths = tuple(
+                path for path in paths if path.startswith(prefix + os.sep)
+            )
+
+        stop = threading.Event()
+        position = 0
+        try:
+            while position < len(paths) and not summary["truncated"]:
+                batch = await self.hass.async_add_executor_job(
+                    search_batch,
+                    self.config_dir,
+                    paths,
+                    position,
+                    pattern,
+                    max_per_file,
+                    stop,
+                )
+                position += batch["consumed"]
+                summary["searched"] += batch["consumed"] - batch["skipped"]
+                summary["skipped"] += batch["skipped"]
+                summary["timed_out"] += batch["timed_out"]
+                files = []
+                for file in batch["files"]:
+                    room = max_results - summary["hits"]
+                    # Once max_results is reached, searching goes on only
+                    # until a further hit shows that the results are cut
+                    if len(file["hits"]) > room or (
+                        file["truncated"] and len(file["hits"]) == room
+                    ):
+                        summary["truncated"] = True
+                        file["truncated"] = True
+                        del file["hits"][room:]
+                    if file["hits"]:
+                        summary["hits"] += len(file["hits"])
+                        files.append(file)
+                    if summary["truncated"]:
+                        break
+                if files:
+                    on_results(files)
+        finally:
+            # Cancelled: let a running batch stop after its current file
+            stop.set()
+        return summary
+
+    async def read_file(
+        self,
+        relative_path: str,
+        offset: int | None = None,
+        length: int | None = None,
+        tail_lines: int | None = None,
+    ) -> dict[str, Any] | None:
+        """Read a file, a byte range of it or its last lines.
+
+        With ``offset`` (and optionally ``length``), returns that byte range;
+        with ``tail_lines``, the last lines of the file. Both are read with
+        seeks and capped at ``FILE_READ_MAX_BYTES``; partial UTF-8 characters
+        at the edges of a range are left out. Otherwise the whole file is
+        read as text, as before.
+
+        Args:
+            relative_path: File relative to the configuration directory
+            offset: First byte of the range
+            length: Bytes to read from offset
+            tail_lines: Number of lines to read from the end
+
+        Returns:
+            Dict with the ``content``, the file ``size``, ``mtime`` and
+            ``version`` token, the byte ``offset`` and ``end`` of the content
+            and whether a tail was ``truncated`` by the byte cap; None if the
+            file cannot be read
+        """
 
         def _read():
+            target_path = self._resolve_path(relative_path)
+            if not target_path or not os.path.isfile(target_path):
+                return None
             try:
-                with open(target_path, "r", encoding="utf-8") as f:
-                    return f.read()
+                if tail_lines is not None:
+                    return _read_tail(target_path, tail_lines)
+                if offset is not None:
+                    return _read_range(
+                        target_path, offset, length or FILE_READ_MAX_BYTES
+                    )
+                # Line endings are kept as they are, so line numbers agree
+                # with the "\n"-only line model of patch_file
+                with open(target_path, "r", encoding="utf-8", newline="") as f:
+                    stat = os.fstat(f.fileno())
+                    content = f.read()
             except Exception as err:
                 LOGGER.error("Error reading file %s: %s", target_path, err)
                 return None
+            return {
+                "content": content,
+                "size": stat.st_size,
+                "mtime": stat.st_mtime,
+                "offset": 0,
+                "end": stat.st_size,
+                "truncated": False,
+                "version": version_token(stat),
+            }
+
+        result = await self.hass.async_add_executor_job(_read)
+        if result is not None and self.index is not None:
+            self.index.async_watch(self.hass.config.path(relative_path))
+        return result
+
+    async def follow_file(
+        self,
+        relative_path: str,
+        offset: int | None,
+        on_event: Callable[[dict[str, Any]], None],
+    ) -> tuple[CALLBACK_TYPE, dict[str, Any]]:
+        """Follow the lines appended to a log file.
+
+        Args:
+            relative_path: Log file relative to the configuration directory
+            offset: Byte position to start from, or None for the end
+            on_event: Callback receiving the follow events
+
+        Returns:
+            Tuple of (callback to stop following, dict with the starting
+            ``offset`` and the file ``size``)
+
+        Raises:
+            FileManagerError: If the file cannot be followed
+        """
+        if self.follower is None:
+            raise FileManagerError("follow_failed", "File following is not available")
+        target_path = await self.hass.async_add_executor_job(
+            self._resolve_path, relative_path
+        )
+        _, ext = os.path.splitext(target_path or "")
+        if not target_path or ext.lower() not in FILE_FOLLOW_EXTENSIONS:
+            raise FileManagerError(
+                "invalid_path", f"Cannot follow file: {relative_path}"
+            )
+        if self.follower.follower_count >= FILE_FOLLOW_MAX_FOLLOWERS:
+            raise FileManagerError("too_many_followers", "Too many files followed")
+        try:
+            result = await self.follower.async_follow(target_path, offset, on_event)
+        except OSError as err:
+            raise FileManagerError(
+                "follow_failed", f"Cannot follow file {relative_path}: {err.strerror}"
+            ) from err
+        if self.index is not None:
+            self.index.async_watch(target_path)
+        return result
+
+    async def save_file(
+        self, relative_path: str, content: str, expected_version: str | None = None
+    ) -> str | None:
+        """Save content to a file atomically.
 
-        return await self.hass.async_add_executor_job(_read)
+        Args:
+            relative_path: File relative to the configuration directory
+            content: New content
+            expected_version: ``version`` returned when the file was read;
+                the save fails with a conflict if the file changed since
 
-    async def save_file(self, relative_path: str, content: str) -> bool:
-        """Save content to a file."""
+        Returns:
+            Version token of the saved file, or None if it cannot be saved
+
+        Raises:
+            FileManagerError: If the file changed since expected_version
+        """
         target_path = await self.hass.async_add_executor_job(
             self._resolve_path, relative_path
         )
         if not target_path:
-            return False
+            return None
 
         def _write():
-            try:
-                # Ensure directory exists
-                os.makedirs(os.path.dirname(target_path), exist_ok=True)
-                with open(target_path, "w", encoding="utf-8") as f:
-                    f.write(content)
-                return True
-            except Exception as err:
-                LOGGER.error("Error writing file %s: %s", target_path, err)
-                return False
+            # Saves are serialized so the version check and the rename of one
+            # save cannot interleave with another
+            with self._save_lock:
+                try:
+                    return _write_atomic(
+                        target_path, content.encode("utf-8"), expected_version
+                    )
+                except (OSError, UnicodeError) as err:
+                    LOGGER.error("Error writing file %s: %s", target_path, err)
+                    return None
+
+        version = await self.hass.async_add_executor_job(_write)
+        if version is not None and self.index is not None:
+            await self.index.async_refresh_path(
+                os.path.relpath(target_path, self.config_dir)
+            )
+        return version
+
+    async def patch_file(
+        self,
+        relative_path: str,
+        expected_version: str,
+        patch: str | None = None,
+        edits: list[dict[str, Any]] | None = None,
+    ) -> str | None:
+        """Apply a unified diff or line-range edits to a file atomically.
+
+        The file is read, patched and written back on the executor, so only
+        the edit travels over the websocket.
+
+        Args:
+            relative_path: File relative to the configuration directory
+            expected_version: ``version`` of the content the patch was made
+                against
+            patch: Unified diff of the file
+            edits: Line-range replacements (see ``apply_line_edits``), used
+                when no patch is given
+
+        Returns:
+            Version token of the saved file, or None if it cannot be saved
+
+        Raises:
+            FileManagerError: If the file changed since expected_version or
+                the patch does not apply
+        """
+        target_path = await self.hass.async_add_executor_job(
+            self._resolve_path, relative_path
+        )
+        if not target_path:
+            return None
+
+        def _patch():
+            with self._save_lock:
+                try:
+                    with open(target_path, "rb") as file:
+                        stat = os.fstat(file.fileno())
+                        data = file.read()
+                except FileNotFoundError:
+                    stat = None
+                except OSError as err:
+                    LOGGER.error("Error reading file %s: %s", target_path, err)
+                    return None
+                _check_version(stat, expected_version)
+                try:
+                    text = data.decode("utf-8")
+                    if patch is not None:
+                        text = apply_unified_diff(text, patch)
+                    else:
+                        text = apply_line_edits(text, edits or [])
+                except (UnicodeError, PatchError) as err:
+                    raise FileManagerError(
+                        "patch_failed", f"Cannot patch {relative_path}: {err}"
+                    ) from err
+                try:
+                    return _write_atomic(
+                        target_path, text.encode("utf-8"), expected_version
+                    )
+                except (OSError, UnicodeError) as err:
+                    LOGGER.error("Error writing file %s: %s", target_path, err)
+                    return None
 
-        return await self.hass.async_add_executor_job(_write)
+        version = await self.hass.async_add_executor_job(_patch)
+        if version is not None and self.index is not None:
+            await self.index.async_refresh_path(
+                os.path.relpath(target_path, self.config_dir)
+            )
+        return version
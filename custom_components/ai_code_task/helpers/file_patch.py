@@ -0,0 +1,185 @@
+"""Apply edits to file content: unified diffs or line-range replacements.
+
+Patches are applied against the exact version they were made from (the
+caller checks the version token first), so hunks must match where their
+header says: there is no fuzzy matching. Line endings are not compared, and
+inserted lines take the line ending of the file, since the editor in the
+browser always uses "\n".
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterator, Sequence
+import re
+from typing import Any
+
+_HUNK_HEADER = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+_NO_NEWLINE = "\\"
+
+
+class PatchError(ValueError):
+    """A patch or edit that does not apply to the content."""
+
+
+def _split_lines(text: str) -> list[str]:
+    """Split text into lines that keep their ending.
+
+    Only "\n" ends a line (unlike ``str.splitlines``), so line numbers agree
+    with diff tools and editors.
+    """
+    lines = text.split("\n")
+    last = lines.pop()
+    lines = [line + "\n" for line in lines]
+    if last:
+        lines.append(last)
+    return lines
+
+
+def _newline(lines: Sequence[str]) -> str:
+    """Return the line ending used by the content."""
+    for line in lines:
+        if line.endswith("\n"):
+            return "\r\n" if line.endswith("\r\n") else "\n"
+    return "\n"
+
+
+def _strip(line: str) -> str:
+    """Return a line without its line ending."""
+    return line.rstrip("\r\n")
+
+
+def _parse_hunks(
+    diff: str,
+) -> Iterator[tuple[int, int, list[tuple[str, str, bool]]]]:
+    """Parse the hunks of a unified diff.
+
+    Yields:
+        Tuples of (old start line, old line count, operations), where each
+        operation is (" ", "-" or "+", line, whether it ends with a newline)
+    """
+    lines = diff.split("\n")
+    index = 0
+    found = False
+    while index < len(lines):
+        match = _HUNK_HEADER.match(lines[index])
+        index += 1
+        if match is None:
+            # File headers ("---", "+++", "diff", "index") and other noise
+            continue
+        found = True
+        old_start = int(match.group(1))
+        old_left = old_count = int(match.group(2) or 1)
+        new_left = int(match.group(4) or 1)
+        ops: list[tuple[str, str, bool]] = []
+        while old_left or new_left:
+            if index >= len(lines):
+                raise PatchError(f"Hunk at line {old_start} is incomplete")
+            line = lines[index]
+            index += 1
+            tag, content = (line[:1] or " "), line[1:]
+            if tag == " ":
+                old_left -= 1
+                new_left -= 1
+            elif tag == "-":
+                old_left -= 1
+            elif tag == "+":
+                new_left -= 1
+            elif tag == _NO_NEWLINE and ops:
+                ops[-1] = (*ops[-1][:2], False)
+                continue
+            else:
+                raise PatchError(f"Unexpected line in hunk: {line[:80]!r}")
+            if old_left < 0 or new_left < 0:
+                raise PatchError(f"Hunk at line {old_start} has the wrong length")
+            ops.append((tag, content, True))
+        if index < len(lines) and lines[index].startswith(_NO_NEWLINE) and ops:
+            ops[-1] = (*ops[-1][:2], False)
+            index += 1
+        yield old_start, old_count, ops
+    if not found:
+        raise PatchError("The patch contains no hunks")
+
+
+def apply_unified_diff(text: str, diff: str) -> str:
+    """Apply a unified diff to text.
+
+    Args:
+        text: Current content
+        diff: Unified diff of a single file (file headers are ignored)
+
+    Returns:
+        Patched content
+
+    Raises:
+        PatchError: If the diff is malformed or a hunk does not match
+    """
+    old = _split_lines(text)
+    newline = _newline(old)
+    result: list[str] = []
+    pos = 0
+    for old_start, old_count, ops in _parse_hunks(diff):
+        # A hunk that removes nothing is anchored after its start line
+        start = old_start if old_count == 0 else old_start - 1
+        if start < pos or start > len(old):
+            raise PatchError(f"Hunk at line {old_start} is out of order or range")
+        result.extend(old[pos:start])
+        pos = start
+        for tag, content, has_newline in ops:
+            if tag == "+":
+                result.append(_strip(content) + newline if has_newline else content)
+                continue
+            if pos >= len(old) or _strip(old[pos]) != _strip(content):
+                raise PatchError(
+                    f"Hunk at line {old_start} does not match line {pos + 1}"
+                )
+            if tag == " ":
+                result.append(old[pos])
+            pos += 1
+    result.extend(old[pos:])
+    return "".join(result)
+
+
+def apply_line_edits(text: str, edits: Sequence[dict[str, Any]]) -> str:
+    """Replace line ranges of text.
+
+    Args:
+        text: Current content
+        edits: Non-overlapping edits in file order, each with the 1-based
+            ``start`` line, the last replaced line ``end`` (``start - 1`` to
+            insert before start) and the replacement ``text``
+
+    Returns:
+        Edited content
+
+    Raises:
+        PatchError: If an edit is out of range or overlaps the previous one
+    """
+    old = _split_lines(text)
+    newline = _newline(old)
+    result: list[str] = []
+    pos = 0
+    for edit in edits:
+        start, end = edit["start"], edit["end"]
+        if start - 1 < pos or end < start - 1 or end > len(old):
+            raise PatchError(
+                f"Edit of lines {start}-{end} is out of order or range"
+                f" (the file has {len(old)} lines)"
+            )
+        result.extend(old[pos : start - 1])
+        replacement = [
+            _strip(line) + newline if line.endswith("\n") else line
+            for line in _split_lines(edit["text"])
+        ]
+        if replacement:
+            if result and not result[-1].endswith("\n"):
+                # Appending after a last line without a line break
+                result[-1] += newline
+            if not replacement[-1].endswith("\n") and (
+                end < len(old) or text.endswith("\n")
+            ):
+                # Keep the line break that separated the range from what follows
+                replacement[-1] += newline
+        result.extend(replacement)
+        pos = end
+    result.extend(old[pos:])
+    return "".join(result)
@@ -0,0 +1,271 @@
+"""Full-text search over the configuration files.
+
+Files are searched in batches on the executor. A batch stops once it has
+read ``FILE_SEARCH_BATCH_BYTES``, so no executor thread is held for long,
+and the caller can stream each batch's hits and cancel between batches.
+Within a file, the search gives up after ``FILE_SEARCH_MAX_FILE_SECONDS``
+or once cancelled. A single regex match cannot be interrupted, so regular
+expressions that repeat a quantified or alternating group without bound,
+which can backtrack for ages on a line that almost matches, are rejected up
+front.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Sequence
+import os
+import re
+import threading
+import time
+from typing import Any
+
+from ..const import (
+    FILE_SEARCH_BATCH_BYTES,
+    FILE_SEARCH_MAX_FILE_BYTES,
+    FILE_SEARCH_MAX_FILE_SECONDS,
+    FILE_SEARCH_MAX_LINE_CHARS,
+    LOGGER,
+)
+
+# Bounded repeat count, like {3} or {2,5}; an unbounded one ends with ","
+_REPEAT = re.compile(r"\{(\d*),?(\d*)\}")
+
+
+def _quantifier_at(query: str, index: int) -> tuple[int, bool]:
+    """Return the length of the quantifier at index and whether it is unbounded.
+
+    Returns:
+        Tuple of (length, unbounded); length is 0 if there is no quantifier
+    """
+    char = query[index : index + 1]
+    if char in ("*", "+"):
+        return 1, True
+    if char == "?":
+        return 1, False
+    if char == "{" and (match := _REPEAT.match(query, index)):
+        if not any(match.groups()):
+            return 0, False
+        unbounded = "," in match.group(0) and not match.group(2)
+        return len(match.group(0)), unbounded
+    return 0, False
+
+
+def has_nested_quantifier(query: str) -> bool:
+    """Return whether a quantified or alternating group is repeated without bound.
+
+    Patterns like ``(a+)+``, ``(\\w+\\s?)*`` or ``(a|aa)*`` can take
+    exponential time. Alternations are rejected even when their branches
+    look disjoint, since ``(\\w|\\d)*`` or ``(\\s| )*`` overlap too.
+    """
+    # Per open group: whether it contains a quantifier or an alternation
+    groups: list[bool] = []
+    index = 0
+    while index < len(query):
+        char = query[index]
+        if char == "\\":
+            index += 2
+            continue
+        if char == "[":
+            # Skip the character class; "]" first in it is a literal
+            index += 1
+            if query[index : index + 1] == "^":
+                index += 1
+            if query[index : index + 1] == "]":
+                index += 1
+            while index < len(query) and query[index] != "]":
+                index += 2 if query[index] == "\\" else 1
+            index += 1
+            continue
+        if char == "(":
+            groups.append(False)
+            index += 1
+            if query[index : index + 1] == "?":
+                # Group extension such as (?: or (?P<name>, not a quantifier
+                index += 1
+            continue
+        if char == ")" and groups:
+            quantified = groups.pop()
+            length, unbounded = _quantifier_at(query, index + 1)
+            if quantified and unbounded:
+                return True
+            if groups and (quantified or length):
+                groups[-1] = True
+            index += 1 + length
+            continue
+        if char == "|":
+            if groups:
+                groups[-1] = True
+            index += 1
+            continue
+        length, _ = _quantifier_at(query, index)
+        if length:
+            if groups:
+                groups[-1] = True
+            index += length
+            continue
+        index += 1
+    return False
+
+
+def compile_query(query: str, regex: bool, case_sensitive: bool) -> re.Pattern[str]:
+    """Compile a search query.
+
+    Args:
+        query: Literal text or regular expression
+        regex: Whether query is a regular expression
+        case_sensitive: Whether case must match
+
+    Returns:
+        Compiled pattern (``^`` and ``$`` match at line boundaries)
+
+    Raises:
+        re.error: If the regular expression is invalid or repeats a
+            quantified or alternating group without bound
+    """
+    if regex and has_nested_quantifier(query):
+        raise re.error(
+            "repeating a group with a quantifier or alternation, such as (a+)+ "
+            "or (a|b)*, is not supported"
+        )
+    flags = re.MULTILINE
+    if not case_sensitive:
+        flags |= re.IGNORECASE
+    return re.compile(query if regex else re.escape(query), flags)
+
+
+def _hit(text: str, line: int, line_start: int, start: int, end: int) -> dict:
+    """Build a hit with the matched line, cut around the match if too long."""
+    line_end = text.find("\n", start)
+    if line_end == -1:
+        line_end = len(text)
+    content = text[line_start:line_end].rstrip("\r")
+    start -= line_start
+    end = min(end - line_start, len(content))
+    if len(content) > FILE_SEARCH_MAX_LINE_CHARS:
+        cut = max(
+            0,
+            min(
+                start - FILE_SEARCH_MAX_LINE_CHARS // 4,
+                len(content) - FILE_SEARCH_MAX_LINE_CHARS,
+            ),
+        )
+        content = content[cut : cut + FILE_SEARCH_MAX_LINE_CHARS]
+        start -= cut
+        end = min(end - cut, len(content))
+    return {"line": line, "start": start, "end": max(end, start), "text": content}
+
+
+def search_text(
+    text: str,
+    pattern: re.Pattern[str],
+    max_hits: int,
+    deadline: float | None = None,
+    stop: threading.Event | None = None,
+) -> tuple[list[dict], bool, bool]:
+    """Find the lines of text matching pattern.
+
+    Args:
+        text: File content
+        pattern: Compiled query
+        max_hits: Maximum number of hits (one per line)
+        deadline: ``time.monotonic()`` value after which to give up
+        stop: Set by the caller to give up
+
+    Returns:
+        Tuple of (hits with 1-based ``line``, match ``start``/``end`` within
+        ``text`` of the line, whether hits were left out, whether the search
+        gave up before the end of text)
+    """
+    hits: list[dict] = []
+    line = 1
+    counted = 0
+    pos = 0
+    while pos <= len(text):
+        if (deadline is not None and time.monotonic() > deadline) or (
+            stop is not None and stop.is_set()
+        ):
+            return hits, True, True
+        match = pattern.search(text, pos)
+        if match is None:
+            break
+        if len(hits) == max_hits:
+            return hits, True, False
+        start = match.start()
+        line += text.count("\n", counted, start)
+        counted = start
+        line_start = text.rfind("\n", 0, start) + 1
+        hits.append(_hit(text, line, line_start, start, match.end()))
+        # Continue on the next line: one hit per line
+        line_end = text.find("\n", start)
+        if line_end == -1:
+            break
+        pos = line_end + 1
+    return hits, False, False
+
+
+def search_batch(
+    config_dir: str,
+    paths: Sequence[str],
+    start: int,
+    pattern: re.Pattern[str],
+    max_hits: int,
+    stop: threading.Event,
+) -> dict[str, Any]:
+    """Search paths from index start until a batch is read.
+
+    Runs in the executor.
+
+    Args:
+        config_dir: Home Assistant configuration directory
+        paths: Paths relative to config_dir
+        start: Index of the first path to search
+        pattern: Compiled query
+        max_hits: Maximum number of hits per file
+        stop: Set by the caller to stop searching
+
+    Returns:
+        Dict with the ``files`` that matched, how many paths were
+        ``consumed`` (searched or skipped), how many were ``skipped`` and
+        how many were ``timed_out`` (only partly searched)
+    """
+    files = []
+    read = 0
+    consumed = 0
+    skipped = 0
+    timed_out = 0
+    for index in range(start, len(paths)):
+        if stop.is_set() or read >= FILE_SEARCH_BATCH_BYTES:
+            break
+        consumed += 1
+        path = paths[index]
+        full_path = os.path.join(config_dir, path)
+        try:
+            size = os.path.getsize(full_path)
+            if size > FILE_SEARCH_MAX_FILE_BYTES:
+                skipped += 1
+                continue
+            with open(full_path, encoding="utf-8", errors="replace") as file:
+                text = file.read()
+        except OSError as err:
+            LOGGER.debug("Cannot search %s: %s", full_path, err)
+            skipped += 1
+            continue
+        read += size
+        hits, truncated, gave_up = search_text(
+            text,
+            pattern,
+            max_hits,
+            time.monotonic() + FILE_SEARCH_MAX_FILE_SECONDS,
+            stop,
+        )
+        if gave_up and not stop.is_set():
+            LOGGER.debug("Search of %s took too long, skipping the rest", path)
+            timed_out += 1
+        if hits:
+            files.append({"path": path, "hits": hits, "truncated": truncated})
+    return {
+        "files": files,
+        "consumed": consumed,
+        "skipped": skipped,
+        "timed_out": timed_out,
+    }
@@ -0,0 +1,668 @@
+"""Code generation pipeline for AI Code Task.
+
+Shared by the ``generate`` and ``generate_stream`` websocket commands:
+provider resolution, prompt assembly, the provider call, response parsing,
+history recording and the response event.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Callable
+from contextlib import nullcontext
+from datetime import datetime
+import hashlib
+import json
+import time
+from typing import TYPE_CHECKING, Any
+
+from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import HomeAssistantError
+
+from ..const import (
+    AI_TASK_OUTPUT_SCHEMA,
+    EVENT_CODE_RESPONSE,
+    HEDGE_MIN_SAMPLES,
+    LOGGER,
+)
+from .context_budget import ContextBudgeter
+from .limiter import QueueFullError
+from .provider_stats import OUTCOME_ERROR, OUTCOME_OK, OUTCOME_TIMEOUT
+from .response import extract_response_fields
+from .tracing import Trace
+
+if TYPE_CHECKING:
+    from .runtime import AICodeTaskRuntime
+
+
+class GenerationError(HomeAssistantError):
+    """Generation failure carrying the websocket error code to report."""
+
+    def __init__(self, code: str, message: str) -> None:
+        """Initialize with a websocket error code and message."""
+        super().__init__(message)
+        self.code = code
+
+
+class GenerationRequest:
+    """Parameters of a single generate request."""
+
+    def __init__(
+        self, msg: dict[str, Any], user_id: str | None, trace: Trace | None = None
+    ) -> None:
+        """Initialize from a validated websocket message."""
+        self.prompt: str = msg.get("prompt", "")
+        self.provider_id: str | None = msg.get("provider_id")
+        self.code_context: str = msg.get("code") or ""
+        self.file_path: str | None = msg.get("file_path")
+        self.attachments: list[dict] | None = msg.get("attachments")
+        self.include_entities: list[str] = msg.get("include_entities") or []
+        self.user_id = str(user_id) if user_id else None
+        self.trace = trace or Trace("generate", self.user_id)
+
+
+class _InflightGeneration:
+    """A running generation shared by identical concurrent requests.
+
+    The generation runs in its own task, so it outlives the request that
+    started it as long as another request still waits for it.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the waiter count and the stream and queue fan-out."""
+        self.task: asyncio.Task[dict[str, Any]] | None = None
+        self.waiters = 0
+        self.chunks: list[str] = []
+        self.listeners: list[Callable[[str], None]] = []
+        self.position: int | None = None
+        self.queue_listeners: list[Callable[[int], None]] = []
+        self.reset_listeners: list[Callable[[], None]] = []
+
+    def subscribe(
+        self,
+        on_delta: Callable[[str], None] | None,
+        on_queued: Callable[[int], None] | None,
+        on_reset: Callable[[], None] | None = None,
+    ) -> None:
+        """Replay the chunks and queue position so far, then forward new ones."""
+        if on_delta is not None:
+            for chunk in self.chunks:
+                on_delta(chunk)
+            self.listeners.append(on_delta)
+        if on_reset is not None:
+            self.reset_listeners.append(on_reset)
+        if on_queued is not None:
+            if self.position is not None:
+                on_queued(self.position)
+            self.queue_listeners.append(on_queued)
+
+    def unsubscribe(
+        self,
+        on_delta: Callable[[str], None] | None,
+        on_queued: Callable[[int], None] | None,
+        on_reset: Callable[[], None] | None = None,
+    ) -> None:
+        """Stop forwarding to a request that went away."""
+        if on_delta in self.listeners:
+            self.listeners.remove(on_delta)
+        if on_reset in self.reset_listeners:
+            self.reset_listeners.remove(on_reset)
+        if on_queued in self.queue_listeners:
+            self.queue_listeners.remove(on_queued)
+
+    def emit(self, chunk: str) -> None:
+        """Forward a streamed chunk to every waiting request."""
+        self.chunks.append(chunk)
+        for listener in list(self.listeners):
+            listener(chunk)
+
+    def reset(self) -> None:
+        """Drop the chunks streamed so far: another provider streams next."""
+        self.chunks.clear()
+        for listener in list(self.reset_listeners):
+            listener()
+
+    def emit_queued(self, position: int) -> None:
+        """Forward the queue position to every waiting request."""
+        self.position = position
+        for listener in list(self.queue_listeners):
+            listener(position)
+
+
+def _fingerprint(provider_id: str, instructions: str, user_id: str | None) -> str:
+    """Identify requests that would produce the same provider call."""
+    digest = hashlib.sha256()
+    for part in (provider_id, instructions, user_id or ""):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class CodeGenerator:
+    """Runs the generate pipeline against the shared runtime."""
+
+    def __init__(self, hass: HomeAssistant, runtime: AICodeTaskRuntime) -> None:
+        """Initialize the generator."""
+        self.hass = hass
+        self.runtime = runtime
+        self._inflight: dict[str, _InflightGeneration] = {}
+
+    def resolve_provider(self, provider_id: str | None) -> str:
+        """Return the requested provider, the default, or the first available."""
+        provider_id = provider_id or self.runtime.default_provider
+        if provider_id:
+            return provider_id
+
+        # Fallback to the first available provider and log a warning
+        availability = self.runtime.provider_manager.get_provider_availability()
+        if not availability:
+            raise GenerationError("no_provider", "No AI Task provider available")
+        provider_id = next(
+            (entity_id for entity_id, available in availability.items() if available),
+            next(iter(availability)),
+        )
+        LOGGER.info(
+            "No provider specified and no default set. Falling back to %s",
+            provider_id,
+        )
+        return provider_id
+
+    def build_entity_context(self, include_entities: list[str]) -> str:
+        """Describe the state and attributes of the requested entities."""
+        if not include_entities:
+            return ""
+
+        lines = ["The user has provided the following entities for context:\n"]
+        for entity_id in include_entities:
+            state = self.hass.states.get(entity_id)
+            if state:
+                safe_attrs = {
+                    k: (v.isoformat() if isinstance(v, datetime) else v)
+                    for k, v in state.attributes.items()
+                }
+                lines.append(
+                    f"- {entity_id}: state='{state.state}', attributes={json.dumps(safe_attrs)}\n"
+                )
+            else:
+                lines.append(f"- {entity_id}: [ENTITY NOT FOUND]\n")
+        return "".join(lines)
+
+    async def async_build_instructions(
+        self, request: GenerationRequest
+    ) -> tuple[str, dict[str, Any]]:
+        """Assemble the final instructions sent to the provider.
+
+        Returns:
+            Tuple of (instructions, report of what was trimmed to fit)
+        """
+        trace = request.trace
+        hist_messages = []
+        if request.user_id:
+            with trace.span("history_load") as span:
+                hist_messages = await self.runtime.history_service.load_history(
+                    request.user_id, limit=self.runtime.history_size
+                )
+                span["messages"] = len(hist_messages)
+
+        with trace.span("entity_context", entities=len(request.include_entities)):
+            entity_context = self.build_entity_context(request.include_entities)
+
+        budgeter = ContextBudgeter(
+            self.runtime.prompt_builder, self.runtime.max_context_chars
+        )
+        with trace.span("prompt_build") as span:
+            final_instructions, trimmed = budgeter.fit(
+                system_prompt=self.runtime.system_prompt,
+                history_messages=hist_messages,
+                user_prompt=request.prompt,
+                code_context=request.code_context,
+                file_path=request.file_path,
+                attachments=request.attachments,
+                entity_context=entity_context,
+            )
+            span["chars"] = len(final_instructions)
+            span["trimmed"] = bool(trimmed)
+
+        if len(final_instructions) > self.runtime.max_context_chars:
+            raise GenerationError(
+                "context_too_large",
+                f"Context too large ({len(final_instructions)} chars)",
+            )
+        if trimmed:
+            LOGGER.debug("Prompt trimmed to fit the context budget: %s", trimmed)
+        return final_instructions, trimmed
+
+    async def async_generate(
+        self,
+        request: GenerationRequest,
+        on_delta: Callable[[str], None] | None = None,
+        on_queued: Callable[[int], None] | None = None,
+        on_reset: Callable[[], None] | None = None,
+    ) -> dict[str, str]:
+        """Run the whole pipeline and return the response payload.
+
+        Args:
+            request: Generate request
+            on_delta: Receives raw response text as it streams in, when the
+                provider supports streaming
+            on_queued: Receives the queue position while the request waits
+                for a provider slot, and 0 once it starts
+            on_reset: Called when the text streamed so far is discarded
+                because a fallback provider takes over the stream
+
+        Returns:
+            Dict with provider_id and provider_name (the provider that
+            answered), response_text, response_code, trimmed (what was cut
+            to fit the context budget, empty if nothing) and cached (True
+            when answered from the response cache)
+        """
+        trace = request.trace
+        with trace.span("resolve_provider"):
+            provider_id = self.resolve_provider(request.provider_id)
+        trace.attributes["provider_id"] = provider_id
+        final_instructions, trimmed = await self.async_build_instructions(request)
+
+        # Identical concurrent requests (double-click, two open tabs) share
+        # the running generation; only the first one writes the history.
+        key = _fingerprint(provider_id, final_instructions, request.user_id)
+        inflight = self._inflight.get(key)
+        joined = inflight is not None
+        if inflight is None:
+            inflight = self._inflight[key] = _InflightGeneration()
+            # Owned by the config entry, so unloading it cancels the run.
+            # It always streams when the provider can, since a streaming
+            # request may still join.
+            inflight.task = self.runtime.entry.async_create_background_task(
+                self.hass,
+                self._async_run_shared(
+                    key, inflight, request, provider_id, final_instructions, trimmed
+                ),
+                f"ai_code_task generation {key[:12]}",
+            )
+        else:
+            LOGGER.debug("Joining in-flight generation for %s", provider_id)
+            trace.attributes["coalesced"] = True
+
+        inflight.waiters += 1
+        inflight.subscribe(on_delta, on_queued, on_reset)
+        try:
+            with trace.span("join_inflight") if joined else nullcontext():
+                return dict(await asyncio.shield(inflight.task))
+        except asyncio.CancelledError:
+            current = asyncio.current_task()
+            if current is not None and current.cancelling():
+                raise
+            # The shared generation itself was cancelled (entry unload)
+            raise GenerationError(
+                "cancelled", "The shared generation was cancelled"
+            ) from None
+        finally:
+            inflight.unsubscribe(on_delta, on_queued, on_reset)
+            inflight.waiters -= 1
+            if not inflight.waiters and not inflight.task.done():
+                # The last waiter left: stop the provider call, which frees
+                # its slot, and let a new identical request start afresh
+                inflight.task.cancel()
+                if self._inflight.get(key) is inflight:
+                    del self._inflight[key]
+
+    async def _async_run_shared(
+        self,
+        key: str,
+        inflight: _InflightGeneration,
+        request: GenerationRequest,
+        provider_id: str,
+        final_instructions: str,
+        trimmed: dict[str, Any],
+    ) -> dict[str, Any]:
+        """Run a generation on behalf of every request waiting for it."""
+        try:
+            return await self._async_run(
+                request,
+                provider_id,
+                final_instructions,
+                trimmed,
+                inflight.emit,
+                inflight.emit_queued,
+                inflight.reset,
+            )
+        finally:
+            if self._inflight.get(key) is inflight:
+                del self._inflight[key]
+
+    async def _async_run(
+        self,
+        request: GenerationRequest,
+        provider_id: str,
+        final_instructions: str,
+        trimmed: dict[str, Any],
+        on_delta: Callable[[str], None] | None,
+        on_queued: Callable[[int], None] | None,
+        on_reset: Callable[[], None] | None = None,
+    ) -> dict[str, Any]:
+        """Answer from the cache or the providers and record the exchange."""
+        provider_manager = self.runtime.provider_manager
+        cache = self.runtime.response_cache
+
+        trace = request.trace
+        if cache:
+            with trace.span("cache_lookup") as span:
+                cached = await cache.async_get(
+                    provider_id, final_instructions, AI_TASK_OUTPUT_SCHEMA
+                )
+                span["hit"] = cached is not None
+            if cached is not None:
+                LOGGER.debug("Response cache hit for %s", provider_id)
+                answered_by = cached.get("provider_id") or provider_id
+                provider_name = provider_manager.get_provider_name(answered_by)
+                resp_text = cached.get("response_text", "")
+                resp_code = cached.get("response_code", "")
+                trace.attributes["answered_by"] = answered_by
+                trace.attributes["cached"] = True
+                await self.async_record(request, provider_name, resp_text, resp_code)
+                return {
+                    "provider_id": answered_by,
+                    "provider_name": provider_name,
+                    "response_code": resp_code,
+                    "response_text": resp_text,
+                    "trimmed": trimmed,
+                    "cached": True,
+                }
+
+        # Cancellation propagates from here: slots are released and the
+        # exchange is not recorded.
+        answered_by, resp_text, resp_code = await self._async_call_chain(
+            request, provider_id, final_instructions, on_delta, on_queued, on_reset
+        )
+        provider_name = provider_manager.get_provider_name(answered_by)
+        trace.attributes["answered_by"] = answered_by
+
+        if cache:
+            with trace.span("cache_store"):
+                await cache.async_put(
+                    provider_id,
+                    final_instructions,
+                    AI_TASK_OUTPUT_SCHEMA,
+                    {
+                        "response_text": resp_text,
+                        "response_code": resp_code,
+                        "provider_id": answered_by,
+                    },
+                )
+        await self.async_record(request, provider_name, resp_text, resp_code)
+
+        return {
+            "provider_id": answered_by,
+            "provider_name": provider_name,
+            "response_code": resp_code,
+            "response_text": resp_text,
+            "trimmed": trimmed,
+            "cached": False,
+        }
+
+    def provider_chain(self, provider_id: str) -> list[str]:
+        """Return the provider followed by the configured fallbacks."""
+        chain = [provider_id]
+        for fallback in self.runtime.fallback_providers:
+            if fallback not in chain:
+                chain.append(fallback)
+        return chain
+
+    def _hedge_delay(self, provider_id: str) -> float | None:
+        """Return how long to wait for a provider before hedging it."""
+        if not self.runtime.hedging:
+            return None
+        return self.runtime.provider_stats.latency_percentile(
+            provider_id, self.runtime.hedge_percentile, HEDGE_MIN_SAMPLES
+        )
+
+    async def _async_call_chain(
+        self,
+        request: GenerationRequest,
+        provider_id: str,
+        final_instructions: str,
+        on_delta: Callable[[str], None] | None,
+        on_queued: Callable[[int], None] | None,
+        on_reset: Callable[[], None] | None = None,
+    ) -> tuple[str, str, str]:
+        """Call the provider chain until one provider answers.
+
+        A provider that fails hands over to the next one in the chain. With
+        hedging enabled, a provider that is slower than its usual latency
+        percentile is raced against the next one; the first answer wins and
+        the other call is cancelled.
+
+        Only one attempt streams into on_delta at a time. When it fails after
+        streaming, on_reset is called and a running attempt that streamed
+        meanwhile is replayed from its first chunk, so the client never
+        decodes two responses as one.
+
+        Returns:
+            Tuple of (provider that answered, response text, response code)
+        """
+        pending = self.provider_chain(provider_id)
+        running: dict[asyncio.Task[tuple[str, str]], str] = {}
+        errors: list[tuple[str, GenerationError]] = []
+        # Only one attempt may stream into the response at a time; the
+        # chunks of every attempt are kept to replay a new owner
+        stream_owner: list[str] = []
+        streamed: dict[str, list[str]] = {}
+
+        def _start(attempt_provider: str) -> None:
+            chunks = streamed[attempt_provider] = []
+
+            def forward(chunk: str) -> None:
+                chunks.append(chunk)
+                if not stream_owner:
+                    stream_owner.append(attempt_provider)
+                if stream_owner[0] == attempt_provider:
+                    on_delta(chunk)
+
+            task = asyncio.create_task(
+                self._async_call_provider(
+                    request,
+                    attempt_provider,
+                    final_instructions,
+                    forward if on_delta is not None else None,
+                    on_queued if not running and not errors else None,
+                )
+            )
+            running[task] = attempt_provider
+
+        def _hand_over_stream() -> None:
+            if on_reset is not None:
+                on_reset()
+            for other in running.values():
+                if streamed[other]:
+                    stream_owner.append(other)
+                    for chunk in streamed[other]:
+                        on_delta(chunk)
+                    return
+
+        _start(pending.pop(0))
+        try:
+            while running:
+                hedge_delay = None
+                if pending and len(running) == 1:
+                    hedge_delay = self._hedge_delay(next(iter(running.values())))
+                done, _ = await asyncio.wait(
+                    running, timeout=hedge_delay, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    LOGGER.debug(
+                        "No answer within %.1fs, hedging with %s",
+                        hedge_delay,
+                        pending[0],
+                    )
+                    _start(pending.pop(0))
+                    continue
+
+                for task in done:
+                    attempt_provider = running.pop(task)
+                    try:
+                        resp_text, resp_code = task.result()
+                    except GenerationError as err:
+                        errors.append((attempt_provider, err))
+                        if stream_owner and stream_owner[0] == attempt_provider:
+                            stream_owner.clear()
+                            _hand_over_stream()
+                        continue
+                    return attempt_provider, resp_text, resp_code
+
+                if not running and pending:
+                    LOGGER.warning(
+                        "Provider %s failed (%s), falling back to %s",
+                        errors[-1][0],
+                        errors[-1][1],
+                        pending[0],
+                    )
+                    _start(pending.pop(0))
+        finally:
+            # Cancel the losers; their slots are released on the way out
+            for task in running:
+                task.cancel()
+            if running:
+                await asyncio.gather(*running, return_exceptions=True)
+
+        if len(errors) == 1:
+            raise errors[0][1]
+        raise GenerationError(
+            errors[-1][1].code,
+            "All providers failed: "
+            + "; ".join(f"{failed}: {err}" for failed, err in errors),
+        )
+
+    async def _async_call_provider(
+        self,
+        request: GenerationRequest,
+        provider_id: str,
+        final_instructions: str,
+        on_delta: Callable[[str], None] | None,
+        on_queued: Callable[[int], None] | None,
+    ) -> tuple[str, str]:
+        """Call a single provider within its concurrency slot and timeout.
+
+        Returns:
+            Tuple of (response text, response code)
+        """
+        provider_manager = self.runtime.provider_manager
+        provider_stats = self.runtime.provider_stats
+        timeout = self.runtime.request_timeout or None
+        trace = request.trace
+        prompt_chars = len(final_instructions)
+        started: float | None = None
+        queued = time.monotonic()
+        try:
+            async with self.runtime.limiter.slot(
+                provider_id, request.user_id, on_queued
+            ):
+                started = time.monotonic()
+                trace.add_span("queue_wait", queued, started, provider=provider_id)
+                async with asyncio.timeout(timeout):
+                    if on_delta is None:
+                        response = await provider_manager.generate_response(
+                            provider_id, final_instructions, AI_TASK_OUTPUT_SCHEMA
+                        )
+                    else:
+                        response = await provider_manager.generate_response_stream(
+                            provider_id,
+                            final_instructions,
+                            AI_TASK_OUTPUT_SCHEMA,
+                            on_delta,
+                        )
+        except QueueFullError as err:
+            raise GenerationError("queue_full", str(err)) from err
+        except asyncio.CancelledError:
+            if started is not None:
+                trace.add_span(
+                    "provider_call", started, provider=provider_id, outcome="cancelled"
+                )
+            raise
+        except TimeoutError as err:
+            trace.add_span(
+                "provider_call", started, provider=provider_id, outcome=OUTCOME_TIMEOUT
+            )
+            provider_stats.record(
+                provider_id,
+                OUTCOME_TIMEOUT,
+                time.monotonic() - started,
+                prompt_chars,
+            )
+            raise GenerationError(
+                "timeout", f"No response from provider within {timeout:g} seconds"
+            ) from err
+        except Exception as err:
+            if started is not None:
+                trace.add_span(
+                    "provider_call",
+                    started,
+                    provider=provider_id,
+                    outcome=OUTCOME_ERROR,
+                )
+                provider_stats.record(
+                    provider_id, OUTCOME_ERROR, time.monotonic() - started, prompt_chars
+                )
+            raise GenerationError("generation_failed", str(err)) from err
+
+        ended = time.monotonic()
+        latency = ended - started
+        if not response:
+            trace.add_span(
+                "provider_call", started, ended, provider=provider_id, outcome="empty"
+            )
+            provider_stats.record(provider_id, OUTCOME_ERROR, latency, prompt_chars)
+            raise GenerationError("no_response", "No response from provider")
+
+        trace.add_span(
+            "provider_call", started, ended, provider=provider_id, outcome=OUTCOME_OK
+        )
+        with trace.span("response_parse", provider=provider_id) as span:
+            resp_text, resp_code = extract_response_fields(response)
+            span["chars"] = len(resp_text or "") + len(resp_code or "")
+        provider_stats.record(
+            provider_id,
+            OUTCOME_OK,
+            latency,
+            prompt_chars,
+            len(resp_text or "") + len(resp_code or ""),
+        )
+        return resp_text, resp_code
+
+    async def async_record(
+        self,
+        request: GenerationRequest,
+        provider_name: str,
+        resp_text: str,
+        resp_code: str,
+    ) -> None:
+        """Save the exchange to the user's history and fire the response event."""
+        trace = request.trace
+        if request.user_id:
+            with trace.span("history_save"):
+                await self.runtime.history_service.save_exchange_async(
+                    request.user_id,
+                    {
+                        "response_text": request.prompt,
+                        "response_code": request.code_context,
+                        "file_path": request.file_path,
+                        "attachments": request.attachments,
+                        "include_entities": request.include_entities,
+                    },
+                    {
+                        "response_text": resp_text,
+                        "response_code": resp_code,
+                        "provider_name": provider_name,
+                    },
+                )
+
+        with trace.span("event_fire"):
+            self.hass.bus.async_fire(
+                EVENT_CODE_RESPONSE,
+                {
+                    "prompt": request.prompt,
+                    "provider_name": provider_name,
+                    "response_code": resp_code,
+                    "response_text": resp_text,
+                    "timestamp": datetime.now().isoformat(),
+                },
+            )
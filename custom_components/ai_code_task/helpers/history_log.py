@@ -0,0 +1,89 @@
+"""Append-only chat history log for AI Code Task.
+
+Every write to a user's history is one JSON line appended to
+``<shard>.jsonl``. A line holds all messages of one exchange (user prompt
+and assistant reply), so a pair is either fully on disk or, after a crash
+mid-write, dropped as a whole. Each message carries a per-shard ``seq``
+number; the snapshot records the last ``seq`` it contains so the loader
+can replay only the tail that is newer than the snapshot.
+
+All functions perform blocking I/O and must run in the executor.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from typing import Any
+
+from ..const import LOGGER
+
+
+class HistoryLog:
+    """Blocking file operations on a single append-only history log."""
+
+    def __init__(self, path: str) -> None:
+        """Initialize with the path of the ``.jsonl`` file."""
+        self.path = path
+
+    def append(self, messages: list[dict[str, Any]]) -> None:
+        """Append messages as a single line and sync it to disk.
+
+        A torn last line left by a crash is terminated first, so it stays a
+        single corrupt line that ``read`` skips instead of swallowing the
+        new record.
+        """
+        line = json.dumps({"messages": messages}, ensure_ascii=False) + "\n"
+        with open(self.path, "a+b") as file:
+            size = file.seek(0, os.SEEK_END)
+            if size:
+                file.seek(size - 1)
+                if file.read(1) != b"\n":
+                    line = "\n" + line
+            # Append mode: the write goes to the end whatever the position
+            file.write(line.encode("utf-8"))
+            file.flush()
+            os.fsync(file.fileno())
+
+    def read(self, after_seq: int = 0) -> tuple[list[dict[str, Any]], int]:
+        """Read messages newer than ``after_seq``.
+
+        Returns:
+            Tuple of (messages, number of messages in the log)
+        """
+        messages: list[dict[str, Any]] = []
+        total = 0
+        try:
+            with open(self.path, encoding="utf-8") as file:
+                for raw in file:
+                    try:
+                        record = json.loads(raw)
+                    except ValueError:
+                        record = None
+                    if not isinstance(record, dict) or not isinstance(
+                        record.get("messages", []), list
+                    ):
+                        # Torn or overwritten line: the whole exchange is dropped
+                        LOGGER.warning("Skipping corrupt line in %s", self.path)
+                        continue
+                    for msg in record.get("messages", []):
+                        if not isinstance(msg, dict):
+                            continue
+                        total += 1
+                        if msg.get("seq", 0) > after_seq:
+                            messages.append(msg)
+        except FileNotFoundError:
+            pass
+        return messages, total
+
+    def truncate(self) -> None:
+        """Drop every line of the log (after a snapshot was written)."""
+        with open(self.path, "w", encoding="utf-8"):
+            pass
+
+    def remove(self) -> None:
+        """Delete the log file."""
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
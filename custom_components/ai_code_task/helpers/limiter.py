@@ -0,0 +1,184 @@
+"""Per-provider concurrency limiter for AI Code Task.
+
+Each provider runs at most ``max_concurrent`` generations at a time. Extra
+requests wait in a queue that is fair across users: when a slot frees up,
+users take turns (round-robin) instead of being served strictly in arrival
+order, so one user sending many requests cannot starve the others.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections import OrderedDict, deque
+from collections.abc import AsyncIterator, Callable
+from contextlib import asynccontextmanager
+
+from homeassistant.exceptions import HomeAssistantError
+
+from ..const import LOGGER
+
+
+class QueueFullError(HomeAssistantError):
+    """The provider queue is deeper than the configured maximum."""
+
+
+class _Waiter:
+    """A request waiting for a provider slot."""
+
+    def __init__(
+        self,
+        future: asyncio.Future[None],
+        on_position: Callable[[int], None] | None,
+    ) -> None:
+        """Initialize the waiter."""
+        self.future = future
+        self.on_position = on_position
+        self.position = 0
+
+
+class _ProviderQueue:
+    """Running count and per-user waiting queues of one provider."""
+
+    def __init__(self) -> None:
+        """Initialize an idle queue."""
+        self.active = 0
+        # user id -> waiters of that user, in round-robin order
+        self.users: OrderedDict[str, deque[_Waiter]] = OrderedDict()
+
+    @property
+    def depth(self) -> int:
+        """Return the number of waiting requests."""
+        return sum(len(waiters) for waiters in self.users.values())
+
+    def service_order(self) -> list[_Waiter]:
+        """Return waiters in the order they will be served."""
+        queues = [list(waiters) for waiters in self.users.values()]
+        order = []
+        for turn in range(max((len(queue) for queue in queues), default=0)):
+            order.extend(queue[turn] for queue in queues if turn < len(queue))
+        return order
+
+    def pop_next(self) -> _Waiter | None:
+        """Take the next waiter and move its user to the back of the turn."""
+        if not self.users:
+            return None
+        user_id, waiters = next(iter(self.users.items()))
+        waiter = waiters.popleft()
+        del self.users[user_id]
+        if waiters:
+            self.users[user_id] = waiters
+        return waiter
+
+    def remove(self, user_id: str, waiter: _Waiter) -> None:
+        """Drop a waiter that gave up."""
+        waiters = self.users.get(user_id)
+        if waiters is None or waiter not in waiters:
+            return
+        waiters.remove(waiter)
+        if not waiters:
+            del self.users[user_id]
+
+
+class ProviderLimiter:
+    """Limit concurrent generations per provider with fair queuing."""
+
+    def __init__(self, hass, max_concurrent: int, max_queue: int = 0) -> None:
+        """Initialize the limiter.
+
+        Args:
+            hass: Home Assistant instance
+            max_concurrent: Generations allowed at once per provider (0 = no limit)
+            max_queue: Waiting requests allowed per provider (0 = no limit)
+        """
+        self.hass = hass
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self._queues: dict[str, _ProviderQueue] = {}
+
+    @asynccontextmanager
+    async def slot(
+        self,
+        provider_id: str,
+        user_id: str | None,
+        on_position: Callable[[int], None] | None = None,
+    ) -> AsyncIterator[None]:
+        """Hold a slot of the provider for the duration of the block.
+
+        Args:
+            provider_id: Provider entity ID
+            user_id: User the request belongs to (fairness key)
+            on_position: Receives the 1-based queue position whenever it
+                changes while waiting, and 0 once the request starts
+
+        Raises:
+            QueueFullError: The queue is already at its maximum depth
+        """
+        if not self.max_concurrent:
+            yield
+            return
+
+        queue = self._queues.setdefault(provider_id, _ProviderQueue())
+        if queue.active >= self.max_concurrent or queue.users:
+            await self._async_wait(queue, provider_id, user_id or "", on_position)
+        else:
+            queue.active += 1
+
+        try:
+            yield
+        finally:
+            self._release(queue, provider_id)
+
+    async def _async_wait(
+        self,
+        queue: _ProviderQueue,
+        provider_id: str,
+        user_id: str,
+        on_position: Callable[[int], None] | None,
+    ) -> None:
+        """Queue the request until a slot is handed over to it."""
+        if self.max_queue and queue.depth >= self.max_queue:
+            raise QueueFullError(
+                f"Too many requests queued for {provider_id} ({queue.depth})"
+            )
+
+        waiter = _Waiter(self.hass.loop.create_future(), on_position)
+        queue.users.setdefault(user_id, deque()).append(waiter)
+        LOGGER.debug("Request queued for %s (depth %d)", provider_id, queue.depth)
+        self._notify_positions(queue)
+
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # The slot was handed over just before the cancellation
+                self._release(queue, provider_id)
+            else:
+                queue.remove(user_id, waiter)
+                self._notify_positions(queue)
+            raise
+
+        if on_position is not None:
+            on_position(0)
+
+    def _release(self, queue: _ProviderQueue, provider_id: str) -> None:
+        """Hand the slot to the next waiter, or free it."""
+        waiter = queue.pop_next()
+        # Skip waiters cancelled before their task could dequeue them
+        while waiter is not None and waiter.future.done():
+            waiter = queue.pop_next()
+        if waiter is None:
+            queue.active -= 1
+            if not queue.active:
+                self._queues.pop(provider_id, None)
+            return
+        # The slot passes directly to the waiter, active stays the same
+        waiter.future.set_result(None)
+        self._notify_positions(queue)
+
+    def _notify_positions(self, queue: _ProviderQueue) -> None:
+        """Tell every waiter whose position changed where it stands."""
+        for position, waiter in enumerate(queue.service_order(), start=1):
+            if waiter.position != position:
+                waiter.position = position
+                if waiter.on_position is not None:
+                    waiter.on_position(position)
@@ -2,7 +2,6 @@
 
 from __future__ import annotations
 
-import json
 from ..const import (
     CONF_ASSISTANT_NAME,
     CONF_SYSTEM_PROMPT,
@@ -14,6 +13,30 @@ from ..const import (
 )
 
 
+HISTORY_CODE_OMITTED = "\n[Code omitted for brevity, refer to CURRENT CONTEXT]"
+
+
+def render_history_fragments(role: str, data: dict) -> tuple[str, str]:
+    """Pre-render a history message for the HISTORY section.
+
+    Args:
+        role: Message role (user/assistant)
+        data: Structured message payload (response_text, response_code, ...)
+
+    Returns:
+        Tuple of (fragment with the full code, fragment with the code omitted)
+    """
+    prefix = f"{role.upper()}: {data.get('response_text') or ''}"
+    code = data.get("response_code")
+    if not code:
+        fragment = f"{prefix}\n\n"
+        return fragment, fragment
+    return (
+        f"{prefix}\n```\n{code}\n```\n\n",
+        f"{prefix}{HISTORY_CODE_OMITTED}\n\n",
+    )
+
+
 class PromptBuilder:
     """Helper to build prompts for the LLM."""
 
@@ -37,6 +60,18 @@ class PromptBuilder:
 
         return f"{identity}\n{instructions}"
 
+    def render_history_message(self, msg: dict, code_context: str = "") -> str:
+        """Render one history message as it appears in the HISTORY section.
+
+        Uses the fragments cached on the message by the history service and
+        only renders them when the message does not carry any.
+        """
+        fragments = msg.get("fragments") or render_history_fragments(
+            msg["role"], msg.get("data") or {}
+        )
+        # HISTORY SLIMMING: the current code supersedes code in the history
+        return fragments[1] if code_context else fragments[0]
+
     def build_conversation_context(
         self,
         system_prompt: str,
@@ -47,66 +82,40 @@ class PromptBuilder:
         attachments: list[dict] | None = None,
         entity_context: str = "",
     ) -> str:
-        """Assemble the full prompt text including history and context."""
-
-        full_conversation_text = ""
-
-        # Process History
-        for msg in history_messages:
-            role = msg["role"].upper()
-            content = msg["content"]
-            # Try to parse strict JSON content if it came from us
-            try:
-                parsed = json.loads(content)
-                text = parsed.get("response_text", "")
-                code = parsed.get("response_code", "")
-
-                content_display = text
-                # HISTORY SLIMMING
-                if code and not code_context:
-                    content_display += f"\n```\n{code}\n```"
-                elif code and code_context:
-                    content_display += (
-                        "\n[Code omitted for brevity, refer to CURRENT CONTEXT]"
-                    )
-            except (json.JSONDecodeError, TypeError):
-                content_display = content
-
-            full_conversation_text += f"{role}: {content_display}\n\n"
+        """Assemble the full prompt text including history and context.
+
+        The prompt is collected as a list of parts and joined once, so the
+        cost is proportional to the size of the prompt.
+        """
+        parts = [f"## ROLE\n{system_prompt}\n\n"]
+        if entity_context:
+            parts.append(
+                f"## ENTITY CONTEXT (States & Attributes)\n{entity_context}\n\n"
+            )
+
+        # History fragments are pre-rendered by the history service
+        parts.append("## HISTORY\n")
+        parts.extend(
+            self.render_history_message(msg, code_context) for msg in history_messages
+        )
 
         # Current Request
-        current_request_text = f"USER: {user_prompt}"
+        parts.append(f"\n## TASK\nUSER: {user_prompt}")
         if code_context:
             file_info = f" (File: {file_path})" if file_path else ""
-            current_request_text += (
+            parts.append(
                 f"\n\nCURRENT CODE CONTEXT{file_info}:\n```\n{code_context}\n```"
             )
 
         # Attachments
         if attachments:
-            current_request_text += "\n\nUPLOADED FILES:"
+            parts.append("\n\nUPLOADED FILES:")
             for att in attachments:
-                filename = att.get("filename", "unknown")
                 content = att.get("content", "")
                 if content:
-                    current_request_text += (
-                        f"\n\n--- FILE: {filename} ---\n```\n{content}\n```"
-                    )
+                    filename = att.get("filename", "unknown")
+                    parts.append(f"\n\n--- FILE: {filename} ---\n```\n{content}\n```")
 
         # Final Payload
-        return (
-            (
-                f"## ROLE\n{system_prompt}\n\n"
-                f"## ENTITY CONTEXT (States & Attributes)\n{entity_context}\n\n"
-                f"## HISTORY\n{full_conversation_text}\n"
-                f"## TASK\n{current_request_text}\n\n"
-                f"RESPONSE:"
-            )
-            if entity_context
-            else (
-                f"## ROLE\n{system_prompt}\n\n"
-                f"## HISTORY\n{full_conversation_text}\n"
-                f"## TASK\n{current_request_text}\n\n"
-                f"RESPONSE:"
-            )
-        )
+        parts.append("\n\nRESPONSE:")
+        return "".join(parts)
@@ -2,56 +2,136 @@
 
 from __future__ import annotations
 
-from homeassistant.core import HomeAssistant
+from collections.abc import Callable
+
+from homeassistant.const import STATE_UNAVAILABLE
+from homeassistant.core import Event, HomeAssistant, callback
 from homeassistant.helpers import entity_registry as er
+from homeassistant.helpers.event import TrackStates, async_track_state_change_filtered
 from homeassistant.exceptions import HomeAssistantError
 
 from ..const import LOGGER, DEFAULT_TASK_NAME
 
+PROVIDER_DOMAIN = "ai_task"
+
+# Optional method of an ai_task entity that streams the raw response text.
+# Signature: (task_name, instructions, structure) -> AsyncIterator[str]
+STREAM_HOOK = "async_stream_generate_data"
+
 
 class ProviderManager:
-    """Manages AI Task providers."""
+    """Manages AI Task providers.
+
+    Providers are kept in an index that is built once and then updated from
+    state changes and entity registry updates, so lookups never scan all
+    states or the whole registry.
+    """
 
     def __init__(self, hass: HomeAssistant, config: dict):
         """Initialize the provider manager."""
         self.hass = hass
         self.config = config
+        # entity_id -> friendly name, in discovery order (None = not built)
+        self._names: dict[str, str] | None = None
+        # entity_id -> whether the provider currently has a usable state
+        self._available: dict[str, bool] = {}
+        self._unsubs: list[Callable[[], None]] = []
 
-    def get_all_providers(self) -> dict[str, str]:
-        """Return a dict of entity_id -> friendly_name for all ai_task providers."""
-        providers = {}
+    @callback
+    def async_start(self) -> None:
+        """Build the index and keep it updated from events."""
+        self._ensure_index()
+        # Only state changes of the ai_task domain are dispatched to us
+        state_tracker = async_track_state_change_filtered(
+            self.hass,
+            TrackStates(False, set(), {PROVIDER_DOMAIN}),
+            self._async_state_changed,
+        )
+        self._unsubs = [
+            state_tracker.async_remove,
+            self.hass.bus.async_listen(
+                er.EVENT_ENTITY_REGISTRY_UPDATED, self._async_registry_updated
+            ),
+        ]
+
+    @callback
+    def async_stop(self) -> None:
+        """Stop listening for events and drop the index."""
+        while self._unsubs:
+            self._unsubs.pop()()
+        self._names = None
+        self._available.clear()
 
-        # 1. Get from States (active entities)
-        for state in self.hass.states.async_all():
-            if state.domain == "ai_task":
-                friendly_name = state.attributes.get("friendly_name")
-                providers[state.entity_id] = (
-                    friendly_name if friendly_name else state.entity_id
-                )
+    def _ensure_index(self) -> dict[str, str]:
+        """Return the index, building it with one scan if needed."""
+        if self._names is not None:
+            return self._names
 
-        # 2. Get from Entity Registry (inactive/unavailable entities)
+        self._names = {}
+        # 1. Active entities
+        for state in self.hass.states.async_all(PROVIDER_DOMAIN):
+            self._refresh(state.entity_id)
+
+        # 2. Inactive/unavailable entities only known to the registry
         ent_reg = er.async_get(self.hass)
         for entity in ent_reg.entities.values():
-            if entity.domain == "ai_task" and entity.entity_id not in providers:
-                name = entity.name or entity.original_name or entity.entity_id
-                providers[entity.entity_id] = name
+            if entity.domain == PROVIDER_DOMAIN and entity.entity_id not in self._names:
+                self._refresh(entity.entity_id)
 
-        return providers
+        LOGGER.debug("Provider index built: %d providers", len(self._names))
+        return self._names
 
-    def get_provider_name(self, provider_id: str) -> str:
-        """Resolve a friendly name for a provider ID."""
-        # Try state first
-        state = self.hass.states.get(provider_id)
-        if state:
-            return state.attributes.get("friendly_name") or provider_id
+    def _refresh(self, entity_id: str) -> None:
+        """Update the index entry of a provider from its state and registry entry."""
+        state = self.hass.states.get(entity_id)
+        if state is not None:
+            self._names[entity_id] = state.attributes.get("friendly_name") or entity_id
+            self._available[entity_id] = state.state != STATE_UNAVAILABLE
+            return
 
-        # Try registry
-        ent_reg = er.async_get(self.hass)
-        entry_item = ent_reg.async_get(provider_id)
-        if entry_item:
-            return entry_item.name or entry_item.original_name or provider_id
+        entry_item = er.async_get(self.hass).async_get(entity_id)
+        if entry_item is not None:
+            self._names[entity_id] = (
+                entry_item.name or entry_item.original_name or entity_id
+            )
+            self._available[entity_id] = False
+            return
+
+        self._names.pop(entity_id, None)
+        self._available.pop(entity_id, None)
+
+    @callback
+    def _async_state_changed(self, event: Event) -> None:
+        """Update the index when the state of a provider changes."""
+        if self._names is not None:
+            self._refresh(event.data["entity_id"])
 
-        return provider_id
+    @callback
+    def _async_registry_updated(self, event: Event) -> None:
+        """Update the index when a provider is added, renamed or removed."""
+        if self._names is None:
+            return
+        for entity_id in (event.data.get("old_entity_id"), event.data["entity_id"]):
+            if entity_id and entity_id.startswith(f"{PROVIDER_DOMAIN}."):
+                self._refresh(entity_id)
+
+    def get_all_providers(self) -> dict[str, str]:
+        """Return a dict of entity_id -> friendly_name for all ai_task providers."""
+        return dict(self._ensure_index())
+
+    def get_provider_availability(self) -> dict[str, bool]:
+        """Return a dict of entity_id -> availability for all ai_task providers."""
+        self._ensure_index()
+        return dict(self._available)
+
+    def is_available(self, provider_id: str) -> bool:
+        """Return whether a provider currently has a usable state."""
+        self._ensure_index()
+        return self._available.get(provider_id, False)
+
+    def get_provider_name(self, provider_id: str) -> str:
+        """Resolve a friendly name for a provider ID."""
+        return self._ensure_index().get(provider_id, provider_id)
 
     async def generate_response(
         self, provider_id: str, instructions: str, structure: dict
@@ -76,3 +156,41 @@ class ProviderManager:
         except Exception as err:
             LOGGER.error("Error calling provider %s: %s", provider_id, err)
             raise HomeAssistantError(f"Provider error: {err}")
+
+    def _get_stream_source(self, provider_id: str) -> Callable | None:
+        """Return the streaming hook of a provider entity, if it has one."""
+        component = self.hass.data.get("ai_task")
+        get_entity = getattr(component, "get_entity", None)
+        if get_entity is None:
+            return None
+        entity = get_entity(provider_id)
+        return getattr(entity, STREAM_HOOK, None)
+
+    async def generate_response_stream(
+        self,
+        provider_id: str,
+        instructions: str,
+        structure: dict,
+        on_delta: Callable[[str], None],
+    ) -> dict | str | None:
+        """Call the provider, forwarding response text to on_delta as it arrives.
+
+        Providers whose entity implements the streaming hook are streamed.
+        Any other provider goes through the regular ``generate_data`` service:
+        on_delta is not called and the service response is returned, so the
+        answer arrives as a single ``done`` event.
+        """
+        stream_source = self._get_stream_source(provider_id)
+        if stream_source is None:
+            return await self.generate_response(provider_id, instructions, structure)
+
+        chunks: list[str] = []
+        try:
+            async for chunk in stream_source(DEFAULT_TASK_NAME, instructions, structure):
+                if chunk:
+                    chunks.append(chunk)
+                    on_delta(chunk)
+        except Exception as err:
+            LOGGER.error("Error streaming from provider %s: %s", provider_id, err)
+            raise HomeAssistantError(f"Provider error: {err}") from err
+        return "".join(chunks)
@@ -0,0 +1,162 @@
+"""Provider statistics for AI Code Task.
+
+Keeps a rolling window of the most recent calls of every provider: outcome,
+latency and prompt/response sizes. Hedged generation uses the latency
+percentiles to decide how long to wait for a provider before asking the next
+one in the fallback chain; the diagnostic sensors and the
+``ai_code_task/provider_stats`` command report the full summary.
+"""
+
+from __future__ import annotations
+
+from collections import deque
+from collections.abc import Callable
+import math
+import time
+from typing import Any, NamedTuple
+
+from homeassistant.core import callback
+
+from ..const import PROVIDER_STATS_WINDOW
+
+OUTCOME_OK = "ok"
+OUTCOME_ERROR = "error"
+OUTCOME_TIMEOUT = "timeout"
+
+
+class _Sample(NamedTuple):
+    """One provider call."""
+
+    outcome: str
+    latency: float
+    prompt_chars: int
+    response_chars: int
+
+
+def _percentile(ordered: list[float], percentile: float) -> float | None:
+    """Return the nearest-rank percentile of sorted values."""
+    if not ordered:
+        return None
+    rank = max(1, math.ceil(percentile / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+class ProviderStats:
+    """Rolling window of call statistics of every provider."""
+
+    def __init__(self, window: int = PROVIDER_STATS_WINDOW) -> None:
+        """Initialize empty statistics.
+
+        Args:
+            window: Number of most recent calls kept per provider
+        """
+        self._window = window
+        self._samples: dict[str, deque[_Sample]] = {}
+        self._last_call: dict[str, float] = {}
+        self._listeners: list[Callable[[str], None]] = []
+
+    @callback
+    def async_add_listener(self, listener: Callable[[str], None]) -> Callable[[], None]:
+        """Call listener with the provider ID after every recorded call.
+
+        Returns:
+            Callable that removes the listener
+        """
+        self._listeners.append(listener)
+
+        @callback
+        def _remove() -> None:
+            self._listeners.remove(listener)
+
+        return _remove
+
+    def record(
+        self,
+        provider_id: str,
+        outcome: str,
+        latency: float,
+        prompt_chars: int = 0,
+        response_chars: int = 0,
+    ) -> None:
+        """Record a finished provider call.
+
+        Args:
+            provider_id: Provider entity ID
+            outcome: OUTCOME_OK, OUTCOME_ERROR or OUTCOME_TIMEOUT
+            latency: Seconds from the start of the call to its end
+            prompt_chars: Size of the instructions sent
+            response_chars: Size of the response received
+        """
+        samples = self._samples.get(provider_id)
+        if samples is None:
+            samples = self._samples[provider_id] = deque(maxlen=self._window)
+        samples.append(_Sample(outcome, latency, prompt_chars, response_chars))
+        self._last_call[provider_id] = time.time()
+        for listener in list(self._listeners):
+            listener(provider_id)
+
+    @property
+    def providers(self) -> list[str]:
+        """Return the providers with at least one recorded call."""
+        return list(self._samples)
+
+    def latency_percentile(
+        self, provider_id: str, percentile: float, min_samples: int = 1
+    ) -> float | None:
+        """Return a latency percentile (nearest rank) of successful calls.
+
+        Returns:
+            Latency in seconds, or None with fewer than min_samples samples
+        """
+        latencies = [
+            sample.latency
+            for sample in self._samples.get(provider_id, ())
+            if sample.outcome == OUTCOME_OK
+        ]
+        if len(latencies) < max(1, min_samples):
+            return None
+        return _percentile(sorted(latencies), percentile)
+
+    def summary(self, provider_id: str) -> dict[str, Any]:
+        """Summarize the window of a provider.
+
+        Returns:
+            Dict with call counts, error/timeout rates, latency percentiles
+            (seconds, successful calls only) and average sizes
+        """
+        samples = list(self._samples.get(provider_id, ()))
+        ok = [sample for sample in samples if sample.outcome == OUTCOME_OK]
+        errors = sum(sample.outcome == OUTCOME_ERROR for sample in samples)
+        timeouts = sum(sample.outcome == OUTCOME_TIMEOUT for sample in samples)
+        latencies = sorted(sample.latency for sample in ok)
+        requests = len(samples)
+
+        def _rate(count: int) -> float | None:
+            return round(count / requests * 100, 1) if requests else None
+
+        def _average(values: list[int]) -> int | None:
+            return round(sum(values) / len(values)) if values else None
+
+        return {
+            "requests": requests,
+            "successes": len(ok),
+            "errors": errors,
+            "timeouts": timeouts,
+            "error_rate": _rate(errors + timeouts),
+            "timeout_rate": _rate(timeouts),
+            "latency_p50": _percentile(latencies, 50),
+            "latency_p95": _percentile(latencies, 95),
+            "latency_p99": _percentile(latencies, 99),
+            "avg_prompt_chars": _average([sample.prompt_chars for sample in samples]),
+            "avg_response_chars": _average([sample.response_chars for sample in ok]),
+            "last_call": self._last_call.get(provider_id),
+        }
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the window size and the summary of every provider."""
+        return {
+            "window": self._window,
+            "providers": {
+                provider_id: self.summary(provider_id) for provider_id in self._samples
+            },
+        }
@@ -1,100 +1,228 @@
 """Response parsing utilities for AI Code Task.
 
-This module provides modular parsing strategies for handling
-structured JSON response formats from AI providers.
+Providers are asked for a JSON object with ``response_text`` and
+``response_code``, but their output varies: strict JSON, JSON inside a
+markdown fence or surrounded by prose, JSON with raw newlines or unescaped
+quotes in its strings, or plain prose with code blocks.
+
+``parse_structured_response`` handles all of them in linear time. It does
+one string-aware scan for top-level ``{...}`` objects, a tolerant field
+extraction when no object parses, and a code block split for prose. None
+of the steps backtrack, so malformed output of any size cannot make the
+parser degrade.
 """
 
 from __future__ import annotations
 
 import json
 import re
-from collections.abc import Callable
+from typing import Any
 
 
 # ==============================================================================
-# COMPILED REGEX PATTERNS
+# COMPILED PATTERNS (none of them can backtrack)
 # ==============================================================================
-_JSON_FENCE_PATTERN = re.compile(r"```(?:json)?\s*([\s\S]*?)```", re.IGNORECASE)
-_CODE_BLOCK_PATTERN = re.compile(r"```(?:\w+)?\s*\n?(.*?)```", re.DOTALL)
-
-# AI Code Patterns (Legacy Support & Robustness)
-_RESPONSE_TEXT_PATTERN = re.compile(
-    r'"response_text"\s*:\s*"(.*?)"(?=\s*,\s*"response_code"|\s*})', re.DOTALL
-)
-_RESPONSE_CODE_PATTERN = re.compile(r'"response_code"\s*:\s*"(.*?)"\s*}', re.DOTALL)
+_SCAN_TOKEN = re.compile(r'[{}"]')
+_WHITESPACE = re.compile(r"\s*")
+_WORD = re.compile(r"\w*")
+_ESCAPE = re.compile(r"\\(u[0-9a-fA-F]{4}|[\"\\/bfnrt])")
+
+# Cleanup of text left around code blocks by half-structured answers
 _RESPONSE_CLEANUP_PREFIX = re.compile(r'^\s*{"response_text"\s*:\s*"')
 _RESPONSE_CLEANUP_MIDDLE = re.compile(r'"\s*,?\s*"response_code".*$', re.DOTALL)
 _RESPONSE_CLEANUP_SUFFIX = re.compile(r'"\s*}?\s*$')
 
+_TEXT_KEY = '"response_text"'
+_CODE_KEY = '"response_code"'
+_FENCE = "```"
+
+# Accepts raw control characters (newlines) inside strings
+_DECODER = json.JSONDecoder(strict=False)
+
+# Partial (streaming) extraction
+_STRING_SPECIAL = re.compile(r'["\\]')
+_HEX4 = re.compile(r"[0-9a-fA-F]{4}")
+_JSON_ESCAPES = {
+    '"': '"',
+    "\\": "\\",
+    "/": "/",
+    "b": "\b",
+    "f": "\f",
+    "n": "\n",
+    "r": "\r",
+    "t": "\t",
+}
+_TEXT_FIELD = "response_text"
+_CODE_FIELD = "response_code"
+_FIELDS = (_TEXT_FIELD, _CODE_FIELD)
+_MAX_KEY_LENGTH = max(map(len, _FIELDS))
+# States of PartialResponseParser
+_SEEK = 0  # between strings
+_TOKEN = 1  # inside a string that is not a field value
+_BEFORE_VALUE = 2  # after the colon of a response field
+_VALUE = 3  # inside a response field value
+
 
 # ==============================================================================
-# BASE PARSING STRATEGIES
+# SCANNING PRIMITIVES
 # ==============================================================================
 
 
-def parse_strict_json(text: str) -> dict | None:
-    """Strategy 1: Strict JSON parsing."""
-    try:
-        return json.loads(text)
-    except (json.JSONDecodeError, ValueError):
-        return None
+def _is_response(data: Any) -> bool:
+    """Return whether parsed JSON has the response structure."""
+    return isinstance(data, dict) and (
+        "response_text" in data or "response_code" in data
+    )
 
 
-def parse_json_fenced(text: str) -> dict | None:
-    """Strategy 2: Extract JSON from markdown code fence."""
-    fence = _JSON_FENCE_PATTERN.search(text)
-    if fence:
-        inner = fence.group(1).strip()
-        return parse_strict_json(inner)
+def _skip_whitespace(text: str, pos: int) -> int:
+    """Return the index of the first non-whitespace character from pos."""
+    return _WHITESPACE.match(text, pos).end()
+
+
+def _string_end(text: str, pos: int) -> int | None:
+    """Return the index after the closing quote of a string body at pos."""
+    while (quote := text.find('"', pos)) != -1:
+        # The quote is escaped when preceded by an odd number of backslashes
+        backslash = quote
+        while backslash > pos and text[backslash - 1] == "\\":
+            backslash -= 1
+        if (quote - backslash) % 2 == 0:
+            return quote + 1
+        pos = quote + 1
     return None
 
 
-def parse_balanced_braces(text: str) -> dict | None:
-    """Strategy 3: Extract first balanced {{...}} or [...] and parse as JSON."""
-
-    def _find_balanced(s: str) -> str | None:
-        opens = "{[ "
-        closes = "}] "
-        stack = []
-        start = -1
-        for i, ch in enumerate(s):
-            if ch in opens:
-                if not stack:
-                    start = i
-                stack.append(ch)
-            elif ch in closes and stack:
-                if (stack[-1] == "{" and ch == "}") or (stack[-1] == "[" and ch == "]"):
-                    stack.pop()
-                    if not stack and start != -1:
-                        return s[start : i + 1]
-                else:
-                    stack.clear()
-                    start = -1
-        return None
+def _span_end(text: str, start: int) -> int | None:
+    """Return the end of the balanced ``{...}`` span opened at start.
 
-    candidate = _find_balanced(text)
-    if candidate:
-        return parse_strict_json(candidate)
+    Strings are skipped as a whole, so braces in string values do not
+    count. Returns None when the span never closes.
+    """
+    depth = 0
+    pos = start
+    while token := _SCAN_TOKEN.search(text, pos):
+        if token.group() == '"':
+            pos = _string_end(text, token.end())
+            if pos is None:
+                return None
+            continue
+        depth += 1 if token.group() == "{" else -1
+        pos = token.end()
+        if depth == 0:
+            return pos
     return None
 
 
-def parse_with_strategies(
-    text: str,
-    strategies: list[Callable[[str], dict | None]],
-    validator: Callable[[dict], bool] | None = None,
-) -> dict | None:
-    """Apply parsing strategies in order."""
-    for strategy in strategies:
+def _find_response_object(text: str) -> dict | None:
+    """Return the first top-level JSON object with the response structure.
+
+    Only the span of each top-level ``{...}`` is decoded, and spans never
+    overlap, so every character is read a bounded number of times.
+    """
+    pos = 0
+    while (start := text.find("{", pos)) != -1:
+        pos = _span_end(text, start)
+        if pos is None:
+            return None
         try:
-            result = strategy(text)
-            if result is not None:
-                if validator is None or validator(result):
-                    return result
-        except Exception:
+            data = _DECODER.decode(text[start:pos])
+        except (ValueError, RecursionError):
             continue
+        if _is_response(data):
+            return data
+    return None
+
+
+def _unescape(value: str) -> str:
+    """Decode the JSON escapes of a raw string value, keeping unknown ones."""
+
+    def _replace(match: re.Match[str]) -> str:
+        escape = match.group(1)
+        if escape[0] == "u":
+            return chr(int(escape[1:], 16))
+        return _JSON_ESCAPES[escape]
+
+    decoded = _ESCAPE.sub(_replace, value)
+    try:
+        # Join surrogate pairs (\ud83d\ude00) into a single character
+        return decoded.encode("utf-16", "surrogatepass").decode("utf-16")
+    except UnicodeError:
+        return decoded
+
+
+def _field_value_start(text: str, key: str) -> int | None:
+    """Return where the string value of the first ``"key": "`` begins."""
+    pos = text.find(key)
+    while pos != -1:
+        colon = _skip_whitespace(text, pos + len(key))
+        if text.startswith(":", colon):
+            quote = _skip_whitespace(text, colon + 1)
+            if text.startswith('"', quote):
+                return quote + 1
+        pos = text.find(key, pos + 1)
     return None
 
 
+def _field_value_end(text: str, start: int, before_code: bool) -> int | None:
+    """Return the closing quote of a tolerant string value.
+
+    The value ends at the first quote followed by ``}`` or, when
+    before_code is set, by ``, "response_code"``. Quotes followed by
+    anything else are taken as unescaped quotes inside the value.
+    """
+    quote = text.find('"', start)
+    while quote != -1:
+        after = _skip_whitespace(text, quote + 1)
+        if text.startswith("}", after):
+            return quote
+        if before_code and text.startswith(",", after):
+            if text.startswith(_CODE_KEY, _skip_whitespace(text, after + 1)):
+                return quote
+        quote = text.find('"', quote + 1)
+    return None
+
+
+def _extract_fields(text: str) -> dict | None:
+    """Tolerantly extract the response fields from malformed JSON."""
+    fields = {}
+    for name, key, before_code in (
+        ("response_text", _TEXT_KEY, True),
+        ("response_code", _CODE_KEY, False),
+    ):
+        start = _field_value_start(text, key)
+        if start is None:
+            continue
+        end = _field_value_end(text, start, before_code)
+        if end is not None:
+            fields[name] = _unescape(text[start:end])
+    if not fields:
+        return None
+    return {"response_text": "", "response_code": "", **fields}
+
+
+def _split_code_blocks(text: str) -> tuple[list[str], str]:
+    """Split markdown code blocks from the surrounding text.
+
+    Returns:
+        Tuple of (stripped block contents, text with the blocks removed)
+    """
+    blocks: list[str] = []
+    rest: list[str] = []
+    pos = 0
+    while (opening := text.find(_FENCE, pos)) != -1:
+        # Skip the language tag of the fence
+        body = _WORD.match(text, opening + len(_FENCE)).end()
+        closing = text.find(_FENCE, body)
+        if closing == -1:
+            break
+        blocks.append(text[body:closing].strip())
+        rest.append(text[pos:opening])
+        pos = closing + len(_FENCE)
+    rest.append(text[pos:])
+    return blocks, "".join(rest)
+
+
 # ==============================================================================
 # STRUCTURED RESPONSE PARSER
 # ==============================================================================
@@ -109,37 +237,7 @@ def parse_structured_response(response_data: str) -> tuple[str, str]:
     Returns:
         Tuple of (response_text, response_code)
     """
-
-    # Validator: Check if parsed JSON has required structure
-    def _validate_code_structure(data: dict) -> bool:
-        """Validate that dict has response_text or response_code fields."""
-        return isinstance(data, dict) and (
-            "response_text" in data or "response_code" in data
-        )
-
-    # Strategy: Regex for tolerant extraction
-    def _code_regex_strategy(text: str) -> dict | None:
-        text_match = _RESPONSE_TEXT_PATTERN.search(text)
-        code_match = _RESPONSE_CODE_PATTERN.search(text)
-
-        if text_match or code_match:
-            return {
-                "response_text": text_match.group(1) if text_match else "",
-                "response_code": code_match.group(1) if code_match else "",
-            }
-        return None
-
-    # Try parsing using modular strategies
-    parsed = parse_with_strategies(
-        response_data,
-        strategies=[
-            parse_strict_json,
-            parse_json_fenced,
-            parse_balanced_braces,
-            _code_regex_strategy,
-        ],
-        validator=_validate_code_structure,
-    )
+    parsed = _find_response_object(response_data) or _extract_fields(response_data)
 
     if parsed:
         response_text = parsed.get("response_text", "")
@@ -149,7 +247,7 @@ def parse_structured_response(response_data: str) -> tuple[str, str]:
         if isinstance(response_text, str) and response_text.strip().startswith("{"):
             try:
                 inner_parsed = json.loads(response_text)
-                if _validate_code_structure(inner_parsed):
+                if _is_response(inner_parsed):
                     response_text = inner_parsed.get("response_text", "")
                     response_code = inner_parsed.get("response_code", response_code)
             except (json.JSONDecodeError, ValueError):
@@ -160,21 +258,14 @@ def parse_structured_response(response_data: str) -> tuple[str, str]:
         if not isinstance(response_code, str):
             response_code = str(response_code)
 
-        # Unicode escape fix
-        if "\\" in response_code and not isinstance(parsed, dict):
-            try:
-                response_code = response_code.encode("utf-8").decode("unicode_escape")
-            except Exception:
-                pass
-
         return response_text, response_code
 
     # Fallback: Try to extract code blocks from plain text
-    code_blocks = _CODE_BLOCK_PATTERN.findall(response_data)
+    code_blocks, response_text = _split_code_blocks(response_data)
 
     if code_blocks:
-        response_code = code_blocks[0].strip()
-        response_text = _CODE_BLOCK_PATTERN.sub("", response_data).strip()
+        response_code = code_blocks[0]
+        response_text = response_text.strip()
 
         # CLEANUP regex artifacts
         response_text = _RESPONSE_CLEANUP_PREFIX.sub("", response_text)
@@ -185,3 +276,275 @@ def parse_structured_response(response_data: str) -> tuple[str, str]:
 
     # Final fallback
     return response_data, ""
+
+
+# ==============================================================================
+# PROVIDER RESULT EXTRACTION
+# ==============================================================================
+
+
+def extract_response_fields(response: Any) -> tuple[str, str]:
+    """Extract (response_text, response_code) from an ai_task service response.
+
+    Args:
+        response: Service response (dict with ``data``/``value``) or raw text
+
+    Returns:
+        Tuple of (response_text, response_code)
+    """
+    result_data = response
+    if isinstance(response, dict):
+        if "data" in response:
+            result_data = response["data"]
+        elif "value" in response:
+            result_data = response["value"]
+
+    resp_text = ""
+    resp_code = ""
+    if isinstance(result_data, dict):
+        resp_text = result_data.get("response_text", "")
+        resp_code = result_data.get("response_code", "")
+        if not resp_text and not resp_code and len(result_data) > 0:
+            first_val = next(iter(result_data.values()))
+            if isinstance(first_val, dict):
+                resp_text = first_val.get("response_text", "")
+                resp_code = first_val.get("response_code", "")
+        if not resp_text and not resp_code:
+            resp_text, resp_code = parse_structured_response(json.dumps(result_data))
+    else:
+        resp_text, resp_code = parse_structured_response(str(result_data))
+
+    resp_text = str(resp_text) if resp_text is not None else ""
+    resp_code = str(resp_code) if resp_code is not None else ""
+    return resp_text, resp_code
+
+
+# ==============================================================================
+# PARTIAL RESPONSE PARSER (STREAMING)
+# ==============================================================================
+
+
+class PartialResponseParser:
+    """Incremental decoder for a response that arrives in chunks.
+
+    Each ``feed`` returns the part of ``response_text`` and ``response_code``
+    that became unambiguous with that chunk, so the total work is linear in
+    the response size however it is split. An escape sequence (including a
+    surrogate pair) cut by a chunk boundary is held back until it completes.
+
+    A response that does not start with ``{`` (optionally inside a markdown
+    fence) is treated as plain explanation text and passed through as is.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the parser."""
+        # Text received while the response format is still unknown
+        self._head = ""
+        self._plain: bool | None = None
+        # Incomplete escape sequence held back from the previous chunk
+        self._carry = ""
+        self._state = _SEEK
+        # Characters of the string being read outside of a field value
+        self._token: list[str] | None = None
+        self._key: str | None = None
+        self._field = ""
+        self._high_surrogate: int | None = None
+        self._complete: set[str] = set()
+        self._parts: dict[str, list[str]] = {_TEXT_FIELD: [], _CODE_FIELD: []}
+        self._delta: dict[str, list[str]] = {_TEXT_FIELD: [], _CODE_FIELD: []}
+
+    @property
+    def response_text(self) -> str:
+        """Return the response_text decoded so far."""
+        return "".join(self._parts[_TEXT_FIELD])
+
+    @property
+    def response_code(self) -> str:
+        """Return the response_code decoded so far."""
+        return "".join(self._parts[_CODE_FIELD])
+
+    def feed(self, chunk: str) -> tuple[str, str]:
+        """Decode the next chunk of the response.
+
+        Args:
+            chunk: Text received after the previous chunk
+
+        Returns:
+            Tuple of (response_text, response_code) decoded from this chunk
+        """
+        if self._plain is None:
+            self._head += chunk
+            chunk = self._detect_format()
+            if not chunk:
+                return "", ""
+        if self._plain:
+            self._parts[_TEXT_FIELD].append(chunk)
+            return chunk, ""
+
+        self._scan(self._carry + chunk)
+        decoded = []
+        for field in (_TEXT_FIELD, _CODE_FIELD):
+            value = "".join(self._delta[field])
+            self._delta[field].clear()
+            if value:
+                self._parts[field].append(value)
+            decoded.append(value)
+        return decoded[0], decoded[1]
+
+    def _detect_format(self) -> str:
+        """Decide between JSON and plain text once the head allows it.
+
+        Returns:
+            The received text to process, or "" while still undecided
+        """
+        stripped = self._head.lstrip()
+        if stripped.startswith(_FENCE):
+            newline = stripped.find("\n")
+            if newline == -1:
+                return ""
+            stripped = stripped[newline + 1 :].lstrip()
+        elif _FENCE.startswith(stripped):
+            # Empty, or the start of what may still become a fence
+            return ""
+        if not stripped:
+            return ""
+        self._plain = stripped[0] != "{"
+        if self._plain:
+            head, self._head = self._head, ""
+            return head
+        self._head = ""
+        return stripped
+
+    def _emit(self, value: str) -> None:
+        """Append decoded characters to the field value being read."""
+        if self._high_surrogate is not None:
+            # A high surrogate not followed by a low one cannot be encoded
+            self._high_surrogate = None
+            self._delta[self._field].append("\ufffd")
+        self._delta[self._field].append(value)
+
+    def _emit_unicode(self, code: int) -> None:
+        """Append a decoded \\uXXXX escape, joining surrogate pairs."""
+        if 0xD800 <= code <= 0xDBFF:
+            # Flushes a previous high surrogate that had no low one
+            self._emit("")
+            self._high_surrogate = code
+        elif 0xDC00 <= code <= 0xDFFF:
+            if self._high_surrogate is None:
+                self._emit("\ufffd")
+                return
+            high, self._high_surrogate = self._high_surrogate, None
+            self._emit(chr(0x10000 + ((high - 0xD800) << 10) + (code - 0xDC00)))
+        else:
+            self._emit(chr(code))
+
+    def _scan(self, text: str) -> None:
+        """Advance the state machine over text, holding back a cut escape."""
+        self._carry = ""
+        pos = 0
+        length = len(text)
+        while pos < length:
+            state = self._state
+            if state == _VALUE or state == _TOKEN:
+                match = _STRING_SPECIAL.search(text, pos)
+                end = match.start() if match else length
+                if end > pos:
+                    if state == _VALUE:
+                        self._emit(text[pos:end])
+                    elif self._token is not None:
+                        self._token.append(text[pos:end])
+                        if sum(map(len, self._token)) > _MAX_KEY_LENGTH:
+                            self._token = None
+                if match is None:
+                    return
+                if text[end] == '"':
+                    self._end_string()
+                    pos = end + 1
+                    continue
+                pos = self._scan_escape(text, end)
+                if pos == -1:
+                    self._carry = text[end:]
+                    return
+                continue
+
+            char = text[pos]
+            if state == _BEFORE_VALUE:
+                if char.isspace():
+                    pos += 1
+                    continue
+                if char == '"':
+                    self._state = _VALUE
+                    self._field = self._key or ""
+                    pos += 1
+                    continue
+                # Not a string value (null, nested object...): keep seeking
+                self._state = _SEEK
+                self._key = None
+                continue
+            if char == '"':
+                self._state = _TOKEN
+                self._token = []
+            elif char == ":":
+                if self._key in _FIELDS and self._key not in self._complete:
+                    self._state = _BEFORE_VALUE
+                else:
+                    self._key = None
+            elif not char.isspace():
+                self._key = None
+            pos += 1
+
+    def _scan_escape(self, text: str, pos: int) -> int:
+        """Decode the escape at pos.
+
+        Returns:
+            Index after the escape, or -1 if it is cut by the end of text
+        """
+        if pos + 1 >= len(text):
+            return -1
+        escape = text[pos + 1]
+        if escape != "u":
+            if self._state == _VALUE:
+                self._emit(_JSON_ESCAPES.get(escape, escape))
+            elif self._token is not None:
+                # An escaped key is never one of the response fields
+                self._token = None
+            return pos + 2
+        if pos + 6 > len(text):
+            return -1
+        if self._state == _VALUE:
+            digits = text[pos + 2 : pos + 6]
+            if _HEX4.fullmatch(digits):
+                self._emit_unicode(int(digits, 16))
+            else:
+                self._emit(text[pos : pos + 6])
+        else:
+            self._token = None
+        return pos + 6
+
+    def _end_string(self) -> None:
+        """Handle the closing quote of the current string."""
+        if self._state == _VALUE:
+            self._emit("")
+            self._complete.add(self._field)
+            self._key = None
+        else:
+            self._key = "".join(self._token) if self._token is not None else None
+        self._token = None
+        self._state = _SEEK
+
+
+def parse_partial_response(text: str) -> tuple[str, str]:
+    """Extract the decoded text/code prefixes of an incomplete response.
+
+    One-shot form of ``PartialResponseParser`` for text that is already
+    fully buffered.
+
+    Args:
+        text: Response text received so far
+
+    Returns:
+        Tuple of (response_text prefix, response_code prefix)
+    """
+    parser = PartialResponseParser()
+    parser.feed(text)
+    return parser.response_text, parser.response_code
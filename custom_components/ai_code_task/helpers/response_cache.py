@@ -0,0 +1,255 @@
+"""Response cache for AI Code Task.
+
+Identical generate requests (same provider, same final instructions, same
+output schema) are answered from a cache instead of a new provider round
+trip. The cache has two tiers:
+
+- Memory: a small LRU of recent responses.
+- Disk: one JSON file per response under ``.storage``, capped in total size.
+  The oldest entries are evicted first.
+
+Entries expire after the configured TTL. The cache is opt-in and can be
+cleared from the frontend.
+"""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+import hashlib
+import json
+import os
+import time
+from typing import Any
+
+from homeassistant.core import HomeAssistant
+
+from ..const import (
+    LOGGER,
+    RESPONSE_CACHE_MAX_DISK_BYTES,
+    RESPONSE_CACHE_MAX_MEMORY_ENTRIES,
+)
+
+
+def build_cache_key(provider_id: str, instructions: str, structure: dict) -> str:
+    """Hash the provider, instructions and output schema of a request."""
+    digest = hashlib.sha256()
+    for part in (
+        provider_id,
+        instructions,
+        json.dumps(structure, sort_keys=True, default=str),
+    ):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class ResponseCache:
+    """Two-tier (memory LRU + disk) cache of provider responses."""
+
+    def __init__(self, hass: HomeAssistant, storage_path: str, ttl: float) -> None:
+        """Initialize the cache.
+
+        Args:
+            hass: Home Assistant instance
+            storage_path: Storage directory of the disk tier
+            ttl: Seconds an entry stays valid
+        """
+        self.hass = hass
+        self.ttl = ttl
+        self._path = hass.config.path(".storage", storage_path)
+        self._memory: OrderedDict[str, dict[str, Any]] = OrderedDict()
+        # Disk index: key -> (provider_id, expires_at, size in bytes)
+        self._index: dict[str, tuple[str, float, int]] = {}
+        self._disk_bytes = 0
+        self._stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,
+        }
+
+    async def async_load(self) -> None:
+        """Index the disk tier and drop expired entries."""
+        try:
+            self._index = await self.hass.async_add_executor_job(self._scan)
+        except OSError as err:
+            LOGGER.warning("Failed to load the response cache: %s", err)
+            return
+        self._disk_bytes = sum(size for _, _, size in self._index.values())
+        LOGGER.debug("Response cache loaded: %d entries on disk", len(self._index))
+
+    def _scan(self) -> dict[str, tuple[str, float, int]]:
+        """Read the disk tier index (runs in the executor)."""
+        os.makedirs(self._path, exist_ok=True)
+        now = time.time()
+        index = {}
+        for name in os.listdir(self._path):
+            key, ext = os.path.splitext(name)
+            if ext != ".json":
+                continue
+            path = os.path.join(self._path, name)
+            try:
+                with open(path, encoding="utf-8") as file:
+                    entry = json.load(file)
+                expires_at = float(entry["expires_at"])
+            except (OSError, ValueError, KeyError, TypeError):
+                expires_at = 0
+                entry = {}
+            if expires_at <= now:
+                self._remove_file(key)
+                continue
+            index[key] = (
+                entry.get("provider_id", ""),
+                expires_at,
+                os.path.getsize(path),
+            )
+        return index
+
+    def _file_path(self, key: str) -> str:
+        """Return the disk tier file of an entry."""
+        return os.path.join(self._path, f"{key}.json")
+
+    def _remove_file(self, key: str) -> None:
+        """Delete the disk tier file of an entry (runs in the executor)."""
+        try:
+            os.remove(self._file_path(key))
+        except FileNotFoundError:
+            pass
+
+    def _write_file(self, key: str, entry: dict[str, Any]) -> int:
+        """Write an entry to the disk tier and return its size (executor)."""
+        from homeassistant.util.file import write_utf8_file
+
+        data = json.dumps(entry, ensure_ascii=False)
+        write_utf8_file(self._file_path(key), data)
+        return len(data.encode("utf-8"))
+
+    def _read_file(self, key: str) -> dict[str, Any] | None:
+        """Read an entry from the disk tier (runs in the executor)."""
+        try:
+            with open(self._file_path(key), encoding="utf-8") as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return None
+
+    async def async_get(
+        self, provider_id: str, instructions: str, structure: dict
+    ) -> dict[str, Any] | None:
+        """Return the cached response of a request, if any.
+
+        Returns:
+            Dict with response_text and response_code, or None on a miss
+        """
+        key = build_cache_key(provider_id, instructions, structure)
+        now = time.time()
+
+        entry = self._memory.get(key)
+        if entry is not None:
+            if entry["expires_at"] > now:
+                self._memory.move_to_end(key)
+                self._stats["memory_hits"] += 1
+                return entry["response"]
+            del self._memory[key]
+
+        indexed = self._index.get(key)
+        if indexed is not None:
+            if indexed[1] > now:
+                entry = await self.hass.async_add_executor_job(self._read_file, key)
+                if entry is not None:
+                    self._remember(key, entry)
+                    self._stats["disk_hits"] += 1
+                    return entry["response"]
+            await self._async_forget(key)
+
+        self._stats["misses"] += 1
+        return None
+
+    async def async_put(
+        self,
+        provider_id: str,
+        instructions: str,
+        structure: dict,
+        response: dict[str, Any],
+    ) -> None:
+        """Store a response in both tiers."""
+        key = build_cache_key(provider_id, instructions, structure)
+        entry = {
+            "provider_id": provider_id,
+            "expires_at": time.time() + self.ttl,
+            "response": response,
+        }
+        self._remember(key, entry)
+        self._stats["stores"] += 1
+
+        try:
+            size = await self.hass.async_add_executor_job(self._write_file, key, entry)
+        except OSError as err:
+            LOGGER.warning("Failed to write the response cache: %s", err)
+            return
+        previous = self._index.get(key)
+        if previous is not None:
+            self._disk_bytes -= previous[2]
+        self._index[key] = (provider_id, entry["expires_at"], size)
+        self._disk_bytes += size
+        await self._async_evict_disk()
+
+    def _remember(self, key: str, entry: dict[str, Any]) -> None:
+        """Put an entry in the memory tier, evicting the least recently used."""
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > RESPONSE_CACHE_MAX_MEMORY_ENTRIES:
+            self._memory.popitem(last=False)
+
+    async def _async_forget(self, key: str) -> None:
+        """Remove an entry from both tiers."""
+        self._memory.pop(key, None)
+        await self._async_remove_from_disk(key)
+
+    async def _async_remove_from_disk(self, key: str) -> None:
+        """Remove an entry from the disk tier."""
+        indexed = self._index.pop(key, None)
+        if indexed is not None:
+            self._disk_bytes -= indexed[2]
+            await self.hass.async_add_executor_job(self._remove_file, key)
+
+    async def _async_evict_disk(self) -> None:
+        """Evict the entries closest to expiry while over the disk cap."""
+        if self._disk_bytes <= RESPONSE_CACHE_MAX_DISK_BYTES:
+            return
+        for key, _ in sorted(self._index.items(), key=lambda item: item[1][1]):
+            if self._disk_bytes <= RESPONSE_CACHE_MAX_DISK_BYTES:
+                break
+            await self._async_remove_from_disk(key)
+            self._stats["evictions"] += 1
+
+    async def async_invalidate(self, provider_id: str | None = None) -> int:
+        """Drop cached responses, optionally only those of one provider.
+
+        Returns:
+            Number of entries removed
+        """
+        keys = {
+            key
+            for key, entry in self._memory.items()
+            if provider_id is None or entry["provider_id"] == provider_id
+        }
+        keys.update(
+            key
+            for key, indexed in self._index.items()
+            if provider_id is None or indexed[0] == provider_id
+        )
+        for key in keys:
+            await self._async_forget(key)
+        LOGGER.debug("Response cache invalidated: %d entries", len(keys))
+        return len(keys)
+
+    @property
+    def stats(self) -> dict[str, Any]:
+        """Return the hit/miss counters and the size of both tiers."""
+        return {
+            **self._stats,
+            "memory_entries": len(self._memory),
+            "disk_entries": len(self._index),
+            "disk_bytes": self._disk_bytes,
+        }
@@ -0,0 +1,125 @@
+"""Runtime state shared by all AI Code Task websocket calls.
+
+A single runtime object is created per config entry and stored on
+``entry.runtime_data``. It keeps the chat history cache warm and holds the
+helpers that used to be rebuilt on every request. The update listener
+reloads the entry, so a new runtime is built whenever the options change.
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from ..const import (
+    CHAT_HISTORY_STORAGE_PATH,
+    CONF_CHAT_HISTORY_SIZE,
+    CONF_DEFAULT_PROVIDER,
+    CONF_FALLBACK_PROVIDERS,
+    CONF_HEDGE_PERCENTILE,
+    CONF_HEDGING,
+    CONF_MAX_CONCURRENT_REQUESTS,
+    CONF_MAX_CONTEXT_CHARS,
+    CONF_MAX_QUEUE_DEPTH,
+    CONF_REQUEST_TIMEOUT,
+    CONF_RESPONSE_CACHE,
+    CONF_RESPONSE_CACHE_TTL,
+    DEFAULT_CHAT_HISTORY_SIZE,
+    DEFAULT_HEDGE_PERCENTILE,
+    DEFAULT_HEDGING,
+    DEFAULT_MAX_CONCURRENT_REQUESTS,
+    DEFAULT_MAX_QUEUE_DEPTH,
+    DEFAULT_REQUEST_TIMEOUT,
+    DEFAULT_RESPONSE_CACHE,
+    DEFAULT_RESPONSE_CACHE_TTL,
+    RECOMMENDED_MAX_CONTEXT_CHARS,
+    RESPONSE_CACHE_STORAGE_PATH,
+)
+from .chat_history import ChatHistoryService
+from .file_follow import FileFollower
+from .file_index import FileIndex
+from .file_manager import FileManager
+from .generation import CodeGenerator
+from .limiter import ProviderLimiter
+from .prompt_builder import PromptBuilder
+from .provider_manager import ProviderManager
+from .provider_stats import ProviderStats
+from .response_cache import ResponseCache
+from .tracing import TraceRecorder
+
+
+class AICodeTaskRuntime:
+    """Long-lived services and precomputed configuration for a config entry."""
+
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry) -> None:
+        """Initialize the runtime from the entry data and options."""
+        self.hass = hass
+        self.entry = entry
+        self.config: dict[str, Any] = {**entry.data, **entry.options}
+
+        self.history_service = ChatHistoryService(
+            hass, CHAT_HISTORY_STORAGE_PATH, entry
+        )
+        self.prompt_builder = PromptBuilder(self.config)
+        self.provider_manager = ProviderManager(hass, self.config)
+        self.provider_stats = ProviderStats()
+        self.traces = TraceRecorder()
+        self.file_index = FileIndex(hass)
+        self.file_follower = FileFollower(hass)
+        self.file_manager = FileManager(hass, self.file_index, self.file_follower)
+        self.generator = CodeGenerator(hass, self)
+        self.limiter = ProviderLimiter(
+            hass,
+            int(
+                self.config.get(
+                    CONF_MAX_CONCURRENT_REQUESTS, DEFAULT_MAX_CONCURRENT_REQUESTS
+                )
+            ),
+            int(self.config.get(CONF_MAX_QUEUE_DEPTH, DEFAULT_MAX_QUEUE_DEPTH)),
+        )
+        self.response_cache: ResponseCache | None = None
+        if self.config.get(CONF_RESPONSE_CACHE, DEFAULT_RESPONSE_CACHE):
+            ttl_minutes = float(
+                self.config.get(CONF_RESPONSE_CACHE_TTL, DEFAULT_RESPONSE_CACHE_TTL)
+            )
+            self.response_cache = ResponseCache(
+                hass, RESPONSE_CACHE_STORAGE_PATH, ttl_minutes * 60
+            )
+
+        # Values derived from the configuration, computed once
+        self.system_prompt = self.prompt_builder.build_system_prompt()
+        self.default_provider: str | None = self.config.get(CONF_DEFAULT_PROVIDER)
+        self.fallback_providers: list[str] = list(
+            self.config.get(CONF_FALLBACK_PROVIDERS) or []
+        )
+        self.hedging = bool(self.config.get(CONF_HEDGING, DEFAULT_HEDGING))
+        self.hedge_percentile = float(
+            self.config.get(CONF_HEDGE_PERCENTILE, DEFAULT_HEDGE_PERCENTILE)
+        )
+        self.history_size = int(
+            self.config.get(CONF_CHAT_HISTORY_SIZE, DEFAULT_CHAT_HISTORY_SIZE)
+        )
+        self.max_context_chars = int(
+            self.config.get(CONF_MAX_CONTEXT_CHARS, RECOMMENDED_MAX_CONTEXT_CHARS)
+        )
+        self.request_timeout = float(
+            self.config.get(CONF_REQUEST_TIMEOUT, DEFAULT_REQUEST_TIMEOUT)
+        )
+
+    async def async_setup(self) -> None:
+        """Prepare storage and caches so requests do not pay for them."""
+        self.provider_manager.async_start()
+        self.file_index.async_start()
+        await self.history_service.async_load()
+        self.history_service.async_start()
+        if self.response_cache:
+            await self.response_cache.async_load()
+
+    async def async_shutdown(self) -> None:
+        """Release resources held by the runtime."""
+        self.history_service.async_stop()
+        self.provider_manager.async_stop()
+        self.file_follower.async_stop()
+        await self.file_index.async_stop()
@@ -0,0 +1,141 @@
+"""Request tracing for AI Code Task.
+
+Every generate request carries a trace with a correlation id. Each stage
+of the pipeline (history load, prompt build, queue wait, provider call,
+response parsing, history save, ...) is recorded as a span with its start
+offset and duration, so the stage that made a request slow is visible
+without a profiler. The last finished traces are kept in a ring buffer and
+can be read over the websocket API and from the diagnostics download.
+
+Traces only hold timings and sizes, never prompts or responses.
+"""
+
+from __future__ import annotations
+
+from collections import deque
+from collections.abc import Iterator
+from contextlib import contextmanager
+import time
+from typing import Any
+import uuid
+
+from ..const import TRACE_MAX_ENTRIES
+
+
+def _ms(seconds: float) -> float:
+    """Convert seconds to rounded milliseconds."""
+    return round(seconds * 1000, 2)
+
+
+class Trace:
+    """Spans recorded for one request."""
+
+    def __init__(self, command: str, user_id: str | None = None) -> None:
+        """Start a trace.
+
+        Args:
+            command: Websocket command that started the request
+            user_id: User the request belongs to
+        """
+        self.trace_id = uuid.uuid4().hex
+        self.command = command
+        self.user_id = user_id
+        self.started_at = time.time()
+        self.status = "running"
+        self.error: str | None = None
+        self.duration: float | None = None
+        self.attributes: dict[str, Any] = {}
+        self.spans: list[dict[str, Any]] = []
+        self._start = time.monotonic()
+
+    def add_span(
+        self, name: str, start: float, end: float | None = None, **attributes: Any
+    ) -> dict[str, Any]:
+        """Record a span from monotonic timestamps.
+
+        Args:
+            name: Stage name
+            start: ``time.monotonic()`` when the stage started
+            end: ``time.monotonic()`` when it ended (default: now)
+            **attributes: Extra details (provider, sizes, outcome, ...)
+
+        Returns:
+            The recorded span
+        """
+        if end is None:
+            end = time.monotonic()
+        span = {
+            "name": name,
+            "start_ms": _ms(start - self._start),
+            "duration_ms": _ms(end - start),
+        }
+        if attributes:
+            span["attributes"] = attributes
+        self.spans.append(span)
+        return span
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[dict[str, Any]]:
+        """Record the duration of the enclosed block as a span.
+
+        Yields the span attributes, so the block can add details it only
+        learns while running.
+        """
+        start = time.monotonic()
+        try:
+            yield attributes
+        except BaseException as err:
+            attributes["error"] = type(err).__name__
+            raise
+        finally:
+            self.add_span(name, start, **attributes)
+
+    def finish(self, status: str, error: str | None = None) -> None:
+        """Mark the trace as finished.
+
+        Args:
+            status: "ok", "cancelled" or the error code of the failure
+            error: Error message of a failure
+        """
+        self.status = status
+        self.error = error
+        self.duration = time.monotonic() - self._start
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the trace in its wire format."""
+        return {
+            "trace_id": self.trace_id,
+            "command": self.command,
+            "user_id": self.user_id,
+            "started_at": self.started_at,
+            "status": self.status,
+            "error": self.error,
+            "duration_ms": _ms(self.duration) if self.duration is not None else None,
+            "attributes": self.attributes,
+            "spans": sorted(self.spans, key=lambda span: span["start_ms"]),
+        }
+
+
+class TraceRecorder:
+    """Ring buffer of the most recent finished traces."""
+
+    def __init__(self, max_traces: int = TRACE_MAX_ENTRIES) -> None:
+        """Initialize an empty buffer."""
+        self._traces: deque[Trace] = deque(maxlen=max_traces)
+
+    def record(self, trace: Trace) -> None:
+        """Keep a finished trace, dropping the oldest one when full."""
+        self._traces.append(trace)
+
+    def get(self, trace_id: str) -> Trace | None:
+        """Return a trace by its correlation id."""
+        return next(
+            (trace for trace in self._traces if trace.trace_id == trace_id), None
+        )
+
+    def as_list(self, limit: int | None = None) -> list[dict[str, Any]]:
+        """Return the traces, newest first."""
+        traces = list(reversed(self._traces))
+        if limit:
+            traces = traces[:limit]
+        return [trace.as_dict() for trace in traces]
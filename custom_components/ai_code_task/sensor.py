@@ -0,0 +1,176 @@
+"""Diagnostic sensors with the statistics of the AI Task providers."""
+
+from __future__ import annotations
+
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any
+
+from homeassistant.components.sensor import (
+    SensorDeviceClass,
+    SensorEntity,
+    SensorEntityDescription,
+    SensorStateClass,
+)
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import PERCENTAGE, EntityCategory, UnitOfTime
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.device_registry import DeviceEntryType, DeviceInfo
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+
+from .const import DOMAIN, INTEGRATION_TITLE
+from .helpers import AICodeTaskRuntime
+
+
+@dataclass(frozen=True, kw_only=True)
+class ProviderStatsSensorDescription(SensorEntityDescription):
+    """Describes a provider statistics sensor."""
+
+    value_fn: Callable[[dict[str, Any]], Any]
+
+
+SENSORS: tuple[ProviderStatsSensorDescription, ...] = (
+    ProviderStatsSensorDescription(
+        key="requests",
+        translation_key="requests",
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda stats: stats["requests"],
+    ),
+    ProviderStatsSensorDescription(
+        key="error_rate",
+        translation_key="error_rate",
+        native_unit_of_measurement=PERCENTAGE,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda stats: stats["error_rate"],
+    ),
+    ProviderStatsSensorDescription(
+        key="timeouts",
+        translation_key="timeouts",
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda stats: stats["timeouts"],
+    ),
+    ProviderStatsSensorDescription(
+        key="latency_p50",
+        translation_key="latency_p50",
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.SECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        suggested_display_precision=2,
+        value_fn=lambda stats: stats["latency_p50"],
+    ),
+    ProviderStatsSensorDescription(
+        key="latency_p95",
+        translation_key="latency_p95",
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.SECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        suggested_display_precision=2,
+        value_fn=lambda stats: stats["latency_p95"],
+    ),
+    ProviderStatsSensorDescription(
+        key="latency_p99",
+        translation_key="latency_p99",
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.SECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        suggested_display_precision=2,
+        entity_registry_enabled_default=False,
+        value_fn=lambda stats: stats["latency_p99"],
+    ),
+    ProviderStatsSensorDescription(
+        key="avg_prompt_chars",
+        translation_key="avg_prompt_chars",
+        native_unit_of_measurement="chars",
+        state_class=SensorStateClass.MEASUREMENT,
+        entity_registry_enabled_default=False,
+        value_fn=lambda stats: stats["avg_prompt_chars"],
+    ),
+    ProviderStatsSensorDescription(
+        key="avg_response_chars",
+        translation_key="avg_response_chars",
+        native_unit_of_measurement="chars",
+        state_class=SensorStateClass.MEASUREMENT,
+        entity_registry_enabled_default=False,
+        value_fn=lambda stats: stats["avg_response_chars"],
+    ),
+)
+
+
+async def async_setup_entry(
+    hass: HomeAssistant,
+    entry: ConfigEntry,
+    async_add_entities: AddEntitiesCallback,
+) -> None:
+    """Set up the provider statistics sensors.
+
+    Sensors are created for every known provider and for any provider that
+    answers a request later on.
+    """
+    runtime: AICodeTaskRuntime = entry.runtime_data
+    added: set[str] = set()
+
+    @callback
+    def _async_add_provider(provider_id: str) -> None:
+        if provider_id in added:
+            return
+        added.add(provider_id)
+        async_add_entities(
+            ProviderStatsSensor(runtime, entry, provider_id, description)
+            for description in SENSORS
+        )
+
+    for provider_id in runtime.provider_manager.get_all_providers():
+        _async_add_provider(provider_id)
+    for provider_id in runtime.provider_stats.providers:
+        _async_add_provider(provider_id)
+    entry.async_on_unload(
+        runtime.provider_stats.async_add_listener(_async_add_provider)
+    )
+
+
+class ProviderStatsSensor(SensorEntity):
+    """Statistic of one provider over the rolling window."""
+
+    entity_description: ProviderStatsSensorDescription
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_has_entity_name = True
+    _attr_should_poll = False
+
+    def __init__(
+        self,
+        runtime: AICodeTaskRuntime,
+        entry: ConfigEntry,
+        provider_id: str,
+        description: ProviderStatsSensorDescription,
+    ) -> None:
+        """Initialize the sensor."""
+        self.entity_description = description
+        self._runtime = runtime
+        self._provider_id = provider_id
+        self._attr_unique_id = f"{entry.entry_id}_{provider_id}_{description.key}"
+        self._attr_device_info = DeviceInfo(
+            identifiers={(DOMAIN, f"{entry.entry_id}_{provider_id}")},
+            name=runtime.provider_manager.get_provider_name(provider_id),
+            manufacturer=INTEGRATION_TITLE,
+            model=provider_id,
+            entry_type=DeviceEntryType.SERVICE,
+        )
+
+    async def async_added_to_hass(self) -> None:
+        """Update the sensor whenever the provider records a call."""
+        self.async_on_remove(
+            self._runtime.provider_stats.async_add_listener(self._async_stats_updated)
+        )
+
+    @callback
+    def _async_stats_updated(self, provider_id: str) -> None:
+        """Write the new state when the provider of this sensor was called."""
+        if provider_id == self._provider_id:
+            self.async_write_ha_state()
+
+    @property
+    def native_value(self) -> Any:
+        """Return the statistic over the current window."""
+        return self.entity_description.value_fn(
+            self._runtime.provider_stats.summary(self._provider_id)
+        )
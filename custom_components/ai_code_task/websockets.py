@@ -2,35 +2,44 @@
 
 from __future__ import annotations
 
-import json
-from datetime import datetime
+import asyncio
+import re
+import time
 from typing import Any
 
 import voluptuous as vol
 
 from homeassistant.components import websocket_api
-from homeassistant.config_entries import ConfigEntry
+from homeassistant.config_entries import ConfigEntryState
 from homeassistant.core import HomeAssistant, callback
 from homeassistant.exceptions import HomeAssistantError
 import homeassistant.helpers.config_validation as cv
 
 from .const import (
-    AI_TASK_OUTPUT_SCHEMA,
     ALLOWED_FILES_MAP,
-    CONF_CHAT_HISTORY_SIZE,
-    CONF_DEFAULT_PROVIDER,
-    CONF_MAX_CONTEXT_CHARS,
-    DEFAULT_CHAT_HISTORY_SIZE,
     DOMAIN,
-    EVENT_CODE_RESPONSE,
-    RECOMMENDED_MAX_CONTEXT_CHARS,
+    FILE_FIND_DEFAULT_LIMIT,
+    FILE_FIND_MAX_LIMIT,
+    FILE_LIST_MAX_LIMIT,
+    FILE_LIST_SORTS,
+    FILE_READ_MAX_BYTES,
+    FILE_READ_MAX_TAIL_LINES,
+    FILE_SAVE_MAX_EDITS,
+    FILE_SEARCH_DEFAULT_MAX_PER_FILE,
+    FILE_SEARCH_DEFAULT_MAX_RESULTS,
+    FILE_SEARCH_MAX_PER_FILE,
+    FILE_SEARCH_MAX_RESULTS,
+    LOGGER,
 )
 from .helpers import (
-    ChatHistoryService,
-    FileManager,
-    PromptBuilder,
-    ProviderManager,
-    parse_structured_response,
+    AICodeTaskRuntime,
+    FileManagerError,
+    GenerationError,
+    GenerationRequest,
+    PartialResponseParser,
+    Trace,
+    compile_query,
+    serialize_history_message,
 )
 
 
@@ -40,19 +49,28 @@ def async_setup_websockets(hass: HomeAssistant) -> None:
     websocket_api.async_register_command(hass, ws_get_config)
     websocket_api.async_register_command(hass, ws_get_providers)
     websocket_api.async_register_command(hass, ws_generate)
+    websocket_api.async_register_command(hass, ws_generate_stream)
+    websocket_api.async_register_command(hass, ws_cancel)
     websocket_api.async_register_command(hass, ws_sync_history)
     websocket_api.async_register_command(hass, ws_clear_history)
+    websocket_api.async_register_command(hass, ws_cache_stats)
+    websocket_api.async_register_command(hass, ws_cache_clear)
+    websocket_api.async_register_command(hass, ws_provider_stats)
+    websocket_api.async_register_command(hass, ws_traces)
     websocket_api.async_register_command(hass, ws_file_list)
+    websocket_api.async_register_command(hass, ws_file_find)
+    websocket_api.async_register_command(hass, ws_file_search)
     websocket_api.async_register_command(hass, ws_file_read)
+    websocket_api.async_register_command(hass, ws_file_follow)
     websocket_api.async_register_command(hass, ws_file_save)
 
 
-def _get_entry(hass: HomeAssistant) -> ConfigEntry:
-    """Get the first config entry for AI Code Task."""
-    entries = hass.config_entries.async_entries(DOMAIN)
-    if not entries:
-        raise HomeAssistantError("Integration not set up")
-    return entries[0]
+def _get_runtime(hass: HomeAssistant) -> AICodeTaskRuntime:
+    """Get the shared runtime of the loaded AI Code Task config entry."""
+    for entry in hass.config_entries.async_entries(DOMAIN):
+        if entry.state is ConfigEntryState.LOADED:
+            return entry.runtime_data
+    raise HomeAssistantError("Integration not set up")
 
 
 @websocket_api.websocket_command(
@@ -85,34 +103,80 @@ async def ws_get_providers(
 ) -> None:
     """Handle get providers command."""
     try:
-        entry = _get_entry(hass)
+        runtime = _get_runtime(hass)
     except HomeAssistantError as err:
         connection.send_error(msg["id"], "not_setup", str(err))
         return
 
-    config = {**entry.data, **entry.options}
-    provider_manager = ProviderManager(hass, config)
-
-    providers = provider_manager.get_all_providers()
-    default_provider = config.get(CONF_DEFAULT_PROVIDER)
+    provider_manager = runtime.provider_manager
 
     connection.send_result(
-        msg["id"], {"default_provider": default_provider, "providers": providers}
+        msg["id"],
+        {
+            "default_provider": runtime.default_provider,
+            "providers": provider_manager.get_all_providers(),
+            "availability": provider_manager.get_provider_availability(),
+        },
+    )
+
+
+GENERATE_SCHEMA = {
+    vol.Required("prompt"): cv.string,
+    vol.Optional("provider_id"): vol.Any(cv.string, None),
+    vol.Optional("code"): vol.Any(cv.string, None),
+    vol.Optional("file_path"): vol.Any(cv.string, None),
+    vol.Optional("attachments"): vol.Any(vol.All(cv.ensure_list, [dict]), None),
+    vol.Optional("include_entities"): vol.Any(
+        vol.All(cv.ensure_list, [cv.entity_id]), None
+    ),
+    vol.Optional("user_id"): vol.Any(cv.string, None),
+}
+
+
+def _finish_trace(
+    runtime: AICodeTaskRuntime, trace: Trace, status: str, error: str | None = None
+) -> None:
+    """Finish the trace of a request and keep it in the ring buffer."""
+    trace.finish(status, error)
+    runtime.traces.record(trace)
+    LOGGER.debug(
+        "Trace %s (%s): %s in %.0f ms",
+        trace.trace_id,
+        trace.command,
+        status,
+        trace.duration * 1000,
     )
 
 
+def _register_cancellation(
+    connection: websocket_api.ActiveConnection, msg_id: int
+) -> dict[str, bool]:
+    """Make the running generation cancellable under its message id.
+
+    The callback is stored in ``connection.subscriptions``, so it also runs
+    when the client unsubscribes or the connection closes.
+
+    Returns:
+        State whose ``cancelled`` flag tells a requested cancellation apart
+        from Home Assistant shutting down
+    """
+    state = {"cancelled": False}
+    task = asyncio.current_task()
+
+    @callback
+    def _cancel() -> None:
+        state["cancelled"] = True
+        if task is not None:
+            task.cancel()
+
+    connection.subscriptions[msg_id] = _cancel
+    return state
+
+
 @websocket_api.websocket_command(
     {
         vol.Required("type"): "ai_code_task/generate",
-        vol.Required("prompt"): cv.string,
-        vol.Optional("provider_id"): vol.Any(cv.string, None),
-        vol.Optional("code"): vol.Any(cv.string, None),
-        vol.Optional("file_path"): vol.Any(cv.string, None),
-        vol.Optional("attachments"): vol.Any(vol.All(cv.ensure_list, [dict]), None),
-        vol.Optional("include_entities"): vol.Any(
-            vol.All(cv.ensure_list, [cv.entity_id]), None
-        ),
-        vol.Optional("user_id"): vol.Any(cv.string, None),
+        **GENERATE_SCHEMA,
     }
 )
 @websocket_api.async_response
@@ -122,161 +186,156 @@ async def ws_generate(
     msg: dict[str, Any],
 ) -> None:
     """Handle generate code command."""
+    user_id = msg.get("user_id") or connection.context.user_id
+    trace = Trace("generate", str(user_id) if user_id else None)
     try:
-        entry = _get_entry(hass)
+        with trace.span("entry_lookup"):
+            runtime = _get_runtime(hass)
     except HomeAssistantError as err:
         connection.send_error(msg["id"], "not_setup", str(err))
         return
 
-    prompt = msg.get("prompt")
-    provider_id_override = msg.get("provider_id")
-    code_context = msg.get("code", "")
-    file_path = msg.get("file_path")
-    attachments = msg.get("attachments")
-    include_entities = msg.get("include_entities", [])
-    user_id = msg.get("user_id") or connection.context.user_id
-
-    config = {**entry.data, **entry.options}
-    history_service = ChatHistoryService(hass, f"{DOMAIN}/chat_history", entry)
-    prompt_builder = PromptBuilder(config)
-    provider_manager = ProviderManager(hass, config)
-
-    provider_id = provider_id_override or config.get(CONF_DEFAULT_PROVIDER)
-    if not provider_id:
-        # Fallback to the first available provider and log a warning
-        available_providers = provider_manager.get_all_providers()
-        if available_providers:
-            provider_id = next(iter(available_providers))
-            LOGGER.info(
-                "No provider specified and no default set. Falling back to %s",
-                provider_id,
-            )
-        else:
-            connection.send_error(msg["id"], "no_provider", "No AI Task provider available")
-            return
-
-    system_prompt = prompt_builder.build_system_prompt()
-    history_size = int(config.get(CONF_CHAT_HISTORY_SIZE, DEFAULT_CHAT_HISTORY_SIZE))
+    request = GenerationRequest(msg, user_id, trace)
+    cancellation = _register_cancellation(connection, msg["id"])
+    try:
+        result = await runtime.generator.async_generate(request)
+    except GenerationError as err:
+        _finish_trace(runtime, trace, err.code, str(err))
+        connection.send_error(msg["id"], err.code, str(err))
+        return
+    except asyncio.CancelledError:
+        _finish_trace(runtime, trace, "cancelled")
+        if not cancellation["cancelled"]:
+            raise
+        connection.send_error(msg["id"], "cancelled", "Generation cancelled")
+        return
+    finally:
+        connection.subscriptions.pop(msg["id"], None)
 
-    hist_messages = []
-    if user_id:
-        hist_messages = await history_service.load_history(
-            str(user_id), limit=history_size
-        )
+    _finish_trace(runtime, trace, "ok")
+    connection.send_result(msg["id"], {**result, "trace_id": trace.trace_id})
 
-    entity_context = ""
-    if include_entities:
-        entity_context = "The user has provided the following entities for context:\n"
-        for entity_id in include_entities:
-            state = hass.states.get(entity_id)
-            if state:
-                safe_attrs = {
-                    k: (v.isoformat() if isinstance(v, datetime) else v)
-                    for k, v in state.attributes.items()
-                }
-                entity_context += f"- {entity_id}: state='{state.state}', attributes={json.dumps(safe_attrs)}\n"
-            else:
-                entity_context += f"- {entity_id}: [ENTITY NOT FOUND]\n"
-
-    final_instructions = prompt_builder.build_conversation_context(
-        system_prompt=system_prompt,
-        history_messages=hist_messages,
-        user_prompt=prompt,
-        code_context=code_context,
-        file_path=file_path,
-        attachments=attachments,
-        entity_context=entity_context,
-    )
 
-    max_context_chars = config.get(
-        CONF_MAX_CONTEXT_CHARS, RECOMMENDED_MAX_CONTEXT_CHARS
-    )
-    if len(final_instructions) > max_context_chars:
-        connection.send_error(
-            msg["id"],
-            "context_too_large",
-            f"Context too large ({len(final_instructions)} chars)",
-        )
+@websocket_api.websocket_command(
+    {
+        vol.Required("type"): "ai_code_task/generate_stream",
+        **GENERATE_SCHEMA,
+    }
+)
+@websocket_api.async_response
+async def ws_generate_stream(
+    hass: HomeAssistant,
+    connection: websocket_api.ActiveConnection,
+    msg: dict[str, Any],
+) -> None:
+    """Handle streaming generate command.
+
+    Sends ``queued`` events with the queue position while the request waits
+    for a provider slot, ``delta`` events with the newly decoded
+    ``response_text`` and ``response_code`` while the provider streams, then
+    a ``done`` event with the complete response (or an ``error`` event). A
+    ``reset`` event means the text streamed so far is void: the provider
+    failed and a fallback provider streams its answer from the start.
+    """
+    user_id = msg.get("user_id") or connection.context.user_id
+    trace = Trace("generate_stream", str(user_id) if user_id else None)
+    try:
+        with trace.span("entry_lookup"):
+            runtime = _get_runtime(hass)
+    except HomeAssistantError as err:
+        connection.send_error(msg["id"], "not_setup", str(err))
         return
 
+    msg_id = msg["id"]
+    request = GenerationRequest(msg, user_id, trace)
+    partial = PartialResponseParser()
+    # Time spent decoding partial responses, summed over all chunks
+    stream_parse = {"chunks": 0, "seconds": 0.0}
+
+    @callback
+    def _send_event(event: dict[str, Any]) -> None:
+        connection.send_message(websocket_api.event_message(msg_id, event))
+
+    @callback
+    def _on_delta(chunk: str) -> None:
+        started = time.monotonic()
+        response_text, response_code = partial.feed(chunk)
+        stream_parse["chunks"] += 1
+        stream_parse["seconds"] += time.monotonic() - started
+        delta: dict[str, Any] = {"type": "delta"}
+        if response_text:
+            delta["response_text"] = response_text
+        if response_code:
+            delta["response_code"] = response_code
+        if len(delta) > 1:
+            _send_event(delta)
+
+    @callback
+    def _on_reset() -> None:
+        nonlocal partial
+        partial = PartialResponseParser()
+        _send_event({"type": "reset"})
+
+    @callback
+    def _on_queued(position: int) -> None:
+        _send_event({"type": "queued", "position": position})
+
+    # Unsubscribing (or closing the connection) cancels the generation
+    cancellation = _register_cancellation(connection, msg_id)
+    connection.send_result(msg_id)
+
     try:
-        response = await provider_manager.generate_response(
-            provider_id, final_instructions, AI_TASK_OUTPUT_SCHEMA
+        result = await runtime.generator.async_generate(
+            request, on_delta=_on_delta, on_queued=_on_queued, on_reset=_on_reset
         )
-    except Exception as err:
-        connection.send_error(msg["id"], "generation_failed", str(err))
-        return
-
-    if not response:
-        connection.send_error(msg["id"], "no_response", "No response from provider")
-        return
-
-    result_data = response
-    if isinstance(response, dict):
-        if "data" in response:
-            result_data = response["data"]
-        elif "value" in response:
-            result_data = response["value"]
-
-    resp_text = ""
-    resp_code = ""
-    if isinstance(result_data, dict):
-        resp_text = result_data.get("response_text", "")
-        resp_code = result_data.get("response_code", "")
-        if not resp_text and not resp_code and len(result_data) > 0:
-            first_val = next(iter(result_data.values()))
-            if isinstance(first_val, dict):
-                resp_text = first_val.get("response_text", "")
-                resp_code = first_val.get("response_code", "")
-        if not resp_text and not resp_code:
-            resp_text, resp_code = parse_structured_response(json.dumps(result_data))
-    else:
-        resp_text, resp_code = parse_structured_response(str(result_data))
-
-    resp_text = str(resp_text) if resp_text is not None else ""
-    resp_code = str(resp_code) if resp_code is not None else ""
-    provider_name = provider_manager.get_provider_name(provider_id)
-
-    if user_id:
-        user_json = json.dumps(
+    except GenerationError as err:
+        _finish_trace(runtime, trace, err.code, str(err))
+        _send_event(
             {
-                "response_text": prompt,
-                "response_code": code_context,
-                "file_path": file_path,
-                "attachments": attachments,
-                "include_entities": include_entities,
+                "type": "error",
+                "code": err.code,
+                "message": str(err),
+                "trace_id": trace.trace_id,
             }
         )
-        await history_service.save_message_async(str(user_id), "user", user_json)
+        return
+    except asyncio.CancelledError:
+        _finish_trace(runtime, trace, "cancelled")
+        if not cancellation["cancelled"]:
+            raise
+        LOGGER.debug("Streaming generation %s cancelled", msg_id)
+        return
+    finally:
+        connection.subscriptions.pop(msg_id, None)
+        if stream_parse["chunks"]:
+            trace.attributes["stream_chunks"] = stream_parse["chunks"]
+            trace.attributes["stream_parse_ms"] = round(
+                stream_parse["seconds"] * 1000, 2
+            )
 
-        assist_json = json.dumps(
-            {
-                "response_text": resp_text,
-                "response_code": resp_code,
-                "provider_name": provider_name,
-            }
-        )
-        await history_service.save_message_async(str(user_id), "assistant", assist_json)
+    _finish_trace(runtime, trace, "ok")
+    _send_event({"type": "done", **result, "trace_id": trace.trace_id})
 
-    hass.bus.async_fire(
-        EVENT_CODE_RESPONSE,
-        {
-            "prompt": prompt,
-            "provider_name": provider_name,
-            "response_code": resp_code,
-            "response_text": resp_text,
-            "timestamp": datetime.now().isoformat(),
-        },
-    )
 
-    connection.send_result(
-        msg["id"],
-        {
-            "provider_name": provider_name,
-            "response_code": resp_code,
-            "response_text": resp_text,
-        },
-    )
+@websocket_api.websocket_command(
+    {
+        vol.Required("type"): "ai_code_task/cancel",
+        vol.Required("request_id"): cv.positive_int,
+    }
+)
+@callback
+def ws_cancel(
+    hass: HomeAssistant, connection: websocket_api.ActiveConnection, msg: dict[str, Any]
+) -> None:
+    """Handle cancel command for a running generate or generate_stream."""
+    cancel = connection.subscriptions.pop(msg["request_id"], None)
+    if cancel is None:
+        connection.send_error(
+            msg["id"], "not_found", "No running generation with this id"
+        )
+        return
+    cancel()
+    connection.send_result(msg["id"], {"success": True})
 
 
 @websocket_api.websocket_command(
@@ -294,7 +353,7 @@ async def ws_sync_history(
 ) -> None:
     """Handle sync history command."""
     try:
-        entry = _get_entry(hass)
+        runtime = _get_runtime(hass)
     except HomeAssistantError as err:
         connection.send_error(msg["id"], "not_setup", str(err))
         return
@@ -305,9 +364,11 @@ async def ws_sync_history(
         connection.send_result(msg["id"], {"messages": []})
         return
 
-    history_service = ChatHistoryService(hass, f"{DOMAIN}/chat_history", entry)
-    messages = await history_service.load_history(str(user_id), limit=limit)
-    connection.send_result(msg["id"], {"messages": messages})
+    messages = await runtime.history_service.load_history(str(user_id), limit=limit)
+    connection.send_result(
+        msg["id"],
+        {"messages": [serialize_history_message(message) for message in messages]},
+    )
 
 
 @websocket_api.websocket_command(
@@ -324,7 +385,7 @@ async def ws_clear_history(
 ) -> None:
     """Handle clear history command."""
     try:
-        entry = _get_entry(hass)
+        runtime = _get_runtime(hass)
     except HomeAssistantError as err:
         connection.send_error(msg["id"], "not_setup", str(err))
         return
@@ -334,66 +395,413 @@ async def ws_clear_history(
         connection.send_result(msg["id"], {"success": True})
         return
 
-    history_service = ChatHistoryService(hass, f"{DOMAIN}/chat_history", entry)
-    await history_service.clear_history(str(user_id))
+    await runtime.history_service.clear_history(str(user_id))
     hass.bus.async_fire(f"{DOMAIN}.history_cleared", {"user_id": user_id})
     connection.send_result(msg["id"], {"success": True})
 
 
+@websocket_api.websocket_command(
+    {
+        vol.Required("type"): "ai_code_task/provider_stats",
+    }
+)
+@callback
+def ws_provider_stats(
+    hass: HomeAssistant, connection: websocket_api.ActiveConnection, msg: dict[str, Any]
+) -> None:
+    """Handle provider statistics command."""
+    try:
+        runtime = _get_runtime(hass)
+    except HomeAssistantError as err:
+        connection.send_error(msg["id"], "not_setup", str(err))
+        return
+
+    stats = runtime.provider_stats.as_dict()
+    for provider_id, summary in stats["providers"].items():
+        summary["name"] = runtime.provider_manager.get_provider_name(provider_id)
+    connection.send_result(msg["id"], stats)
+
+
+@websocket_api.websocket_command(
+    {
+        vol.Required("type"): "ai_code_task/traces",
+        vol.Optional("trace_id"): cv.string,
+        vol.Optional("limit"): vol.Any(cv.positive_int, None),
+    }
+)
+@callback
+def ws_traces(
+    hass: HomeAssistant, connection: websocket_api.ActiveConnection, msg: dict[str, Any]
+) -> None:
+    """Handle request traces command (one trace, or the most recent ones)."""
+    try:
+        runtime = _get_runtime(hass)
+    except HomeAssistantError as err:
+        connection.send_error(msg["id"], "not_setup", str(err))
+        return
+
+    if "trace_id" in msg:
+        trace = runtime.traces.get(msg["trace_id"])
+        if trace is None:
+            connection.send_error(msg["id"], "not_found", "Trace not found")
+            return
+        connection.send_result(msg["id"], {"traces": [trace.as_dict()]})
+        return
+    connection.send_result(
+        msg["id"], {"traces": runtime.traces.as_list(msg.get("limit"))}
+    )
+
+
+@websocket_api.websocket_command(
+    {
+        vol.Required("type"): "ai_code_task/cache_stats",
+    }
+)
+@callback
+def ws_cache_stats(
+    hass: HomeAssistant, connection: websocket_api.ActiveConnection, msg: dict[str, Any]
+) -> None:
+    """Handle response cache stats command."""
+    try:
+        runtime = _get_runtime(hass)
+    except HomeAssistantError as err:
+        connection.send_error(msg["id"], "not_setup", str(err))
+        return
+
+    cache = runtime.response_cache
+    if cache is None:
+        connection.send_result(msg["id"], {"enabled": False})
+        return
+    connection.send_result(msg["id"], {"enabled": True, **cache.stats})
+
+
+@websocket_api.websocket_command(
+    {
+        vol.Required("type"): "ai_code_task/cache_clear",
+        vol.Optional("provider_id"): vol.Any(cv.string, None),
+    }
+)
+@websocket_api.async_response
+async def ws_cache_clear(
+    hass: HomeAssistant,
+    connection: websocket_api.ActiveConnection,
+    msg: dict[str, Any],
+) -> None:
+    """Handle response cache clear command."""
+    try:
+        runtime = _get_runtime(hass)
+    except HomeAssistantError as err:
+        connection.send_error(msg["id"], "not_setup", str(err))
+        return
+
+    removed = 0
+    if runtime.response_cache is not None:
+        removed = await runtime.response_cache.async_invalidate(msg.get("provider_id"))
+    connection.send_result(msg["id"], {"success": True, "removed": removed})
+
+
 @websocket_api.websocket_command(
     {
         vol.Required("type"): "ai_code_task/file_list",
         vol.Optional("path"): vol.Any(cv.string, None),
+        vol.Optional("sort", default="name"): vol.In(FILE_LIST_SORTS),
+        vol.Optional("descending", default=False): cv.boolean,
+        vol.Optional("limit"): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=FILE_LIST_MAX_LIMIT)
+        ),
+        vol.Optional("cursor"): cv.string,
     }
 )
 @websocket_api.async_response
 async def ws_file_list(
     hass: HomeAssistant, connection: websocket_api.ActiveConnection, msg: dict[str, Any]
 ) -> None:
-    """Handle file list command."""
-    path = msg.get("path", "")
-    file_manager = FileManager(hass)
-    items = await file_manager.list_files(path)
-    connection.send_result(msg["id"], {"items": items})
+    """Handle file list command.
+
+    Without ``limit`` the whole directory is returned. With it, the items
+    come in pages: pass the ``next_cursor`` of a page as ``cursor`` (with
+    the same path and sort) to get the next one.
+    """
+    try:
+        runtime = _get_runtime(hass)
+    except HomeAssistantError as err:
+        connection.send_error(msg["id"], "not_setup", str(err))
+        return
+
+    path = msg.get("path") or ""
+    file_manager = runtime.file_manager
+    try:
+        page = await file_manager.list_files(
+            path,
+            msg["sort"],
+            msg["descending"],
+            msg.get("limit"),
+            msg.get("cursor"),
+        )
+    except FileManagerError as err:
+        connection.send_error(msg["id"], err.code, str(err))
+        return
+    connection.send_result(msg["id"], page)
+
+
+@websocket_api.websocket_command(
+    {
+        vol.Required("type"): "ai_code_task/file_find",
+        vol.Required("query"): vol.All(cv.string, vol.Length(min=1)),
+        vol.Optional("limit", default=FILE_FIND_DEFAULT_LIMIT): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=FILE_FIND_MAX_LIMIT)
+        ),
+    }
+)
+@websocket_api.async_response
+async def ws_file_find(
+    hass: HomeAssistant, connection: websocket_api.ActiveConnection, msg: dict[str, Any]
+) -> None:
+    """Handle file find command.
+
+    Ranks every indexed file path against ``query`` (a fuzzy subsequence,
+    as in editor quick-open) and returns the best ``limit`` matches with the
+    matched character positions. ``complete`` is False when the time budget
+    ran out before all paths were searched.
+    """
+    try:
+        runtime = _get_runtime(hass)
+    except HomeAssistantError as err:
+        connection.send_error(msg["id"], "not_setup", str(err))
+        return
+
+    result = await runtime.file_manager.find_files(msg["query"], msg["limit"])
+    connection.send_result(msg["id"], result)
+
+
+@websocket_api.websocket_command(
+    {
+        vol.Required("type"): "ai_code_task/file_search",
+        vol.Required("query"): vol.All(cv.string, vol.Length(min=1)),
+        vol.Optional("regex", default=False): cv.boolean,
+        vol.Optional("case_sensitive", default=False): cv.boolean,
+        vol.Optional("path", default=""): cv.string,
+        vol.Optional("max_per_file", default=FILE_SEARCH_DEFAULT_MAX_PER_FILE): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=FILE_SEARCH_MAX_PER_FILE)
+        ),
+        vol.Optional("max_results", default=FILE_SEARCH_DEFAULT_MAX_RESULTS): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=FILE_SEARCH_MAX_RESULTS)
+        ),
+    }
+)
+@websocket_api.async_response
+async def ws_file_search(
+    hass: HomeAssistant, connection: websocket_api.ActiveConnection, msg: dict[str, Any]
+) -> None:
+    """Handle file search subscription.
+
+    Searches the indexed files below ``path`` for ``query`` (literal text,
+    or a regular expression with ``regex``). Sends ``results`` events with
+    the matching lines of each file as batches complete, then a ``done``
+    event with the totals. Unsubscribing cancels the search.
+    """
+    try:
+        runtime = _get_runtime(hass)
+    except HomeAssistantError as err:
+        connection.send_error(msg["id"], "not_setup", str(err))
+        return
+
+    try:
+        pattern = compile_query(msg["query"], msg["regex"], msg["case_sensitive"])
+    except re.error as err:
+        connection.send_error(msg["id"], "invalid_query", f"Invalid regex: {err}")
+        return
+
+    msg_id = msg["id"]
+
+    @callback
+    def _on_results(files: list[dict]) -> None:
+        connection.send_message(
+            websocket_api.event_message(msg_id, {"type": "results", "files": files})
+        )
+
+    cancellation = _register_cancellation(connection, msg_id)
+    connection.send_result(msg_id)
+
+    started = time.monotonic()
+    try:
+        summary = await runtime.file_manager.search_files(
+            pattern,
+            msg["path"],
+            msg["max_per_file"],
+            msg["max_results"],
+            _on_results,
+        )
+    except asyncio.CancelledError:
+        if not cancellation["cancelled"]:
+            raise
+        LOGGER.debug("File search %s cancelled", msg_id)
+        return
+    finally:
+        connection.subscriptions.pop(msg_id, None)
+
+    connection.send_message(
+        websocket_api.event_message(
+            msg_id,
+            {
+                "type": "done",
+                **summary,
+                "elapsed_ms": round((time.monotonic() - started) * 1000, 1),
+            },
+        )
+    )
 
 
 @websocket_api.websocket_command(
     {
         vol.Required("type"): "ai_code_task/file_read",
         vol.Required("path"): cv.string,
+        vol.Exclusive("offset", "mode"): vol.All(vol.Coerce(int), vol.Range(min=0)),
+        vol.Optional("length"): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=FILE_READ_MAX_BYTES)
+        ),
+        vol.Exclusive("tail_lines", "mode"): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=FILE_READ_MAX_TAIL_LINES)
+        ),
     }
 )
 @websocket_api.async_response
 async def ws_file_read(
     hass: HomeAssistant, connection: websocket_api.ActiveConnection, msg: dict[str, Any]
 ) -> None:
-    """Handle file read command."""
+    """Handle file read command.
+
+    Reads the whole file, the byte range starting at ``offset`` (up to
+    ``length`` bytes) or the last ``tail_lines`` lines. The result includes
+    the file ``size`` and the byte ``offset``/``end`` of the content, so a
+    client can page through a large file.
+    """
+    try:
+        runtime = _get_runtime(hass)
+    except HomeAssistantError as err:
+        connection.send_error(msg["id"], "not_setup", str(err))
+        return
+
     path = msg.get("path")
-    file_manager = FileManager(hass)
-    content = await file_manager.read_file(path)
-    if content is None:
+    file_manager = runtime.file_manager
+    result = await file_manager.read_file(
+        path, msg.get("offset"), msg.get("length"), msg.get("tail_lines")
+    )
+    if result is None:
         connection.send_error(msg["id"], "read_failed", f"Could not read file: {path}")
         return
-    connection.send_result(msg["id"], {"content": content})
+    connection.send_result(msg["id"], result)
+
+
+@websocket_api.websocket_command(
+    {
+        vol.Required("type"): "ai_code_task/file_follow",
+        vol.Required("path"): cv.string,
+        vol.Optional("offset"): vol.All(vol.Coerce(int), vol.Range(min=0)),
+    }
+)
+@websocket_api.async_response
+async def ws_file_follow(
+    hass: HomeAssistant, connection: websocket_api.ActiveConnection, msg: dict[str, Any]
+) -> None:
+    """Handle log follow subscription.
+
+    Sends a ``start`` event with the starting ``offset`` (the end of the file
+    unless ``offset`` is given) and the file ``size``, then ``lines`` events
+    with the complete lines appended since, batched per poll interval.
+    ``dropped`` counts the bytes skipped when more was appended than fits
+    in one batch. ``rotated`` and ``truncated`` events are sent when the
+    file is replaced or shrinks; following then restarts at its beginning.
+    """
+    try:
+        runtime = _get_runtime(hass)
+    except HomeAssistantError as err:
+        connection.send_error(msg["id"], "not_setup", str(err))
+        return
+
+    msg_id = msg["id"]
+
+    @callback
+    def _on_event(event: dict[str, Any]) -> None:
+        connection.send_message(websocket_api.event_message(msg_id, event))
+
+    try:
+        unfollow, start = await runtime.file_manager.follow_file(
+            msg["path"], msg.get("offset"), _on_event
+        )
+    except FileManagerError as err:
+        connection.send_error(msg_id, err.code, str(err))
+        return
+
+    connection.subscriptions[msg_id] = unfollow
+    connection.send_result(msg_id)
+    _on_event({"type": "start", **start})
 
 
 @websocket_api.websocket_command(
     {
         vol.Required("type"): "ai_code_task/file_save",
         vol.Required("path"): cv.string,
-        vol.Required("content"): cv.string,
+        vol.Exclusive("content", "change"): cv.string,
+        vol.Exclusive("patch", "change"): cv.string,
+        vol.Exclusive("edits", "change"): vol.All(
+            [
+                {
+                    vol.Required("start"): vol.All(vol.Coerce(int), vol.Range(min=1)),
+                    vol.Required("end"): vol.All(vol.Coerce(int), vol.Range(min=0)),
+                    vol.Required("text"): str,
+                }
+            ],
+            vol.Length(min=1, max=FILE_SAVE_MAX_EDITS),
+        ),
+        vol.Optional("version"): cv.string,
     }
 )
 @websocket_api.async_response
 async def ws_file_save(
     hass: HomeAssistant, connection: websocket_api.ActiveConnection, msg: dict[str, Any]
 ) -> None:
-    """Handle file save command."""
+    """Handle file save command.
+
+    Saves the full ``content``, or applies a unified diff (``patch``) or
+    line-range replacements (``edits``) on the server, so only the change
+    is sent. With the ``version`` returned by ``file_read`` (required for
+    ``patch`` and ``edits``), the file is only saved if it has not changed
+    since; otherwise a ``conflict`` error is returned and nothing is
+    written. The result carries the new ``version``.
+    """
+    try:
+        runtime = _get_runtime(hass)
+    except HomeAssistantError as err:
+        connection.send_error(msg["id"], "not_setup", str(err))
+        return
+
     path = msg.get("path")
     content = msg.get("content")
-    file_manager = FileManager(hass)
-    success = await file_manager.save_file(path, content)
-    if not success:
+    expected_version = msg.get("version")
+    if content is None and "patch" not in msg and "edits" not in msg:
+        connection.send_error(
+            msg["id"], "invalid_format", "One of content, patch or edits is required"
+        )
+        return
+    if content is None and expected_version is None:
+        connection.send_error(
+            msg["id"], "invalid_format", "A version is required to apply changes"
+        )
+        return
+
+    file_manager = runtime.file_manager
+    try:
+        if content is not None:
+            version = await file_manager.save_file(path, content, expected_version)
+        else:
+            version = await file_manager.patch_file(
+                path, expected_version, msg.get("patch"), msg.get("edits")
+            )
+    except FileManagerError as err:
+        connection.send_error(msg["id"], err.code, str(err))
+        return
+    if version is None:
         connection.send_error(msg["id"], "save_failed", f"Could not save file: {path}")
         return
-    connection.send_result(msg["id"], {"success": True})
+    connection.send_result(msg["id"], {"success": True, "version": version})
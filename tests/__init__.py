@@ -0,0 +1 @@
+"""Tests for the AI Code Task integration."""
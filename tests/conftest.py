@@ -0,0 +1,49 @@
+"""Fixtures for AI Code Task tests."""
+
+from __future__ import annotations
+
+from collections.abc import Callable
+from typing import Any
+
+import pytest
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from homeassistant.config_entries import ConfigEntryState
+from homeassistant.core import HomeAssistant
+
+from custom_components.ai_code_task.const import DOMAIN
+from custom_components.ai_code_task.helpers import AICodeTaskRuntime
+
+from .fake_ai_task import FakeAITask
+
+
+@pytest.fixture(autouse=True)
+def auto_enable_custom_integrations(enable_custom_integrations):
+    """Enable loading the integration from custom_components."""
+    return
+
+
+@pytest.fixture
+def fake_ai_task(hass: HomeAssistant) -> FakeAITask:
+    """Install a fake ai_task component; add providers with ``add_entity``."""
+    return FakeAITask(hass)
+
+
+@pytest.fixture
+def make_runtime(
+    hass: HomeAssistant, fake_ai_task: FakeAITask
+) -> Callable[..., AICodeTaskRuntime]:
+    """Build the runtime of a loaded config entry with the given options."""
+
+    def _make(**options: Any) -> AICodeTaskRuntime:
+        entry = MockConfigEntry(
+            domain=DOMAIN, data={}, options=options, state=ConfigEntryState.LOADED
+        )
+        entry.add_to_hass(hass)
+        # Normally created by async_setup, read again when the entry unloads
+        hass.data.setdefault(DOMAIN, {})
+        runtime = AICodeTaskRuntime(hass, entry)
+        entry.runtime_data = runtime
+        return runtime
+
+    return _make
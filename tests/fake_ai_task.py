@@ -0,0 +1,129 @@
+"""Fake local ai_task providers with injected delays, failures and streams.
+
+Stands in for the ai_task integration: registers its ``generate_data``
+service and exposes the entities through ``hass.data["ai_task"]``, which is
+where the provider manager looks up the streaming hook.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import AsyncIterator
+import json
+from typing import Any
+
+from homeassistant.core import (
+    HomeAssistant,
+    ServiceCall,
+    ServiceResponse,
+    SupportsResponse,
+)
+from homeassistant.exceptions import HomeAssistantError
+
+
+class FakeAITaskEntity:
+    """A provider answering after a delay, failing, or streaming chunks.
+
+    Args:
+        entity_id: ``ai_task.*`` entity id
+        response_text: Text of the structured answer
+        response_code: Code of the structured answer
+        delay: Seconds before answering (or between streamed chunks)
+        error: Raised instead of answering
+        chunks: Raw response text to stream; when None the entity has no
+            streaming hook and can only answer through the service
+    """
+
+    def __init__(
+        self,
+        entity_id: str,
+        response_text: str = "",
+        response_code: str = "",
+        delay: float = 0,
+        error: Exception | None = None,
+        chunks: list[str] | None = None,
+    ) -> None:
+        """Initialize the fake provider."""
+        self.entity_id = entity_id
+        self.response_text = response_text
+        self.response_code = response_code
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+        self.cancelled = 0
+        if chunks is not None:
+            self.chunks = chunks
+            self.async_stream_generate_data = self._async_stream
+
+    async def async_generate_data(self, instructions: str) -> dict[str, Any]:
+        """Answer a generate_data call."""
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.error is not None:
+            raise self.error
+        return {
+            "data": {
+                "response_text": self.response_text,
+                "response_code": self.response_code,
+            }
+        }
+
+    async def _async_stream(
+        self, task_name: str, instructions: str, structure: dict
+    ) -> AsyncIterator[str]:
+        """Stream the configured chunks, failing after them if set to."""
+        self.calls += 1
+        try:
+            for chunk in self.chunks:
+                await asyncio.sleep(self.delay)
+                yield chunk
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.error is not None:
+            raise self.error
+
+
+class FakeAITask:
+    """The fake ai_task component holding the fake entities."""
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Register the generate_data service."""
+        self.hass = hass
+        self.entities: dict[str, FakeAITaskEntity] = {}
+        hass.data["ai_task"] = self
+        hass.services.async_register(
+            "ai_task",
+            "generate_data",
+            self._async_generate_data,
+            supports_response=SupportsResponse.ONLY,
+        )
+
+    def add_entity(self, entity_id: str, **kwargs: Any) -> FakeAITaskEntity:
+        """Add a provider entity (see ``FakeAITaskEntity`` for the options)."""
+        entity = self.entities[entity_id] = FakeAITaskEntity(entity_id, **kwargs)
+        self.hass.states.async_set(
+            entity_id, "unknown", {"friendly_name": entity_id.split(".", 1)[1]}
+        )
+        return entity
+
+    def get_entity(self, entity_id: str) -> FakeAITaskEntity | None:
+        """Return an entity, like the entity component does."""
+        return self.entities.get(entity_id)
+
+    async def _async_generate_data(self, call: ServiceCall) -> ServiceResponse:
+        """Dispatch the service call to the target entity."""
+        entity = self.entities.get(call.data["entity_id"])
+        if entity is None:
+            raise HomeAssistantError(f"Unknown entity {call.data['entity_id']}")
+        return await entity.async_generate_data(call.data["instructions"])
+
+
+def structured_chunks(response_text: str, response_code: str, size: int) -> list[str]:
+    """Split the JSON answer of a streaming provider into chunks of size."""
+    raw = json.dumps({"response_text": response_text, "response_code": response_code})
+    return [raw[index : index + size] for index in range(0, len(raw), size)]
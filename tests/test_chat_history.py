@@ -0,0 +1,95 @@
+"""Tests for the chat history shards and their append-only log."""
+
+from __future__ import annotations
+
+import json
+from unittest.mock import patch
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+
+from custom_components.ai_code_task.const import CHAT_HISTORY_STORAGE_PATH
+from custom_components.ai_code_task.helpers import ChatHistoryService
+from custom_components.ai_code_task.helpers.history_log import HistoryLog
+
+MODULE = "custom_components.ai_code_task.helpers.chat_history"
+USER = "user-1"
+
+
+def test_read_skips_lines_that_are_not_records(tmp_path) -> None:
+    """JSON lines that are not records are skipped like torn ones."""
+    path = tmp_path / "shard.jsonl"
+    good = {"messages": [{"role": "user", "seq": 1}, {"role": "assistant", "seq": 2}]}
+    path.write_text(
+        "\n".join(
+            [
+                json.dumps(good),
+                "null",
+                "[]",
+                '{"messages": 5}',
+                '"text"',
+                json.dumps({"messages": [{"role": "user", "seq": 3}]}),
+                '{"messages": [{"ro',
+            ]
+        )
+    )
+
+    messages, total = HistoryLog(str(path)).read(after_seq=1)
+
+    assert [msg["seq"] for msg in messages] == [2, 3]
+    assert total == 3
+
+
+async def _service(hass: HomeAssistant, tmp_path) -> ChatHistoryService:
+    """Return a loaded history service storing under tmp_path."""
+    hass.config.config_dir = str(tmp_path)
+    service = ChatHistoryService(hass, CHAT_HISTORY_STORAGE_PATH)
+    await service.async_load()
+    return service
+
+
+async def _save(service: ChatHistoryService, text: str) -> None:
+    """Save one exchange (two messages)."""
+    await service.save_exchange_async(
+        USER, {"response_text": text}, {"response_text": f"re: {text}"}
+    )
+
+
+async def test_compaction_counts_messages(hass: HomeAssistant, tmp_path) -> None:
+    """The log is compacted once it holds more messages than the limit."""
+    service = await _service(hass, tmp_path)
+    limit = patch(f"{MODULE}.RECOMMENDED_CHAT_HISTORY_MAX_MESSAGES", 4)
+    spy = patch.object(service, "_async_compact", wraps=service._async_compact)
+    with limit, spy as compact:
+        await _save(service, "one")
+        await _save(service, "two")
+        assert compact.call_count == 0
+        await _save(service, "three")
+        assert compact.call_count == 1
+
+
+async def test_clear_history(hass: HomeAssistant, tmp_path) -> None:
+    """A cleared history does not come back from the log."""
+    service = await _service(hass, tmp_path)
+    await _save(service, "secret")
+
+    await service.clear_history(USER)
+
+    reloaded = await _service(hass, tmp_path)
+    assert await reloaded.load_history(USER) == []
+
+
+async def test_clear_history_failure_keeps_history(
+    hass: HomeAssistant, tmp_path
+) -> None:
+    """When the snapshot cannot be removed, the history stays loaded."""
+    service = await _service(hass, tmp_path)
+    await _save(service, "kept")
+
+    with patch.object(Store, "async_remove", side_effect=OSError("read-only")):
+        await service.clear_history(USER)
+
+    # Still loaded, and saves keep working
+    assert len(await service.load_history(USER)) == 2
+    await _save(service, "after")
+    assert len(await service.load_history(USER)) == 4
@@ -0,0 +1,127 @@
+"""Tests for identical concurrent requests sharing one generation."""
+
+from __future__ import annotations
+
+import asyncio
+
+from homeassistant.core import HomeAssistant
+import pytest
+
+from custom_components.ai_code_task.helpers import GenerationError, GenerationRequest
+
+from .fake_ai_task import FakeAITask, structured_chunks
+
+PROVIDER = "ai_task.slow"
+MSG = {"prompt": "Write an automation", "provider_id": PROVIDER}
+
+
+async def _start(runtime, on_delta=None) -> asyncio.Task:
+    """Start a generation and let it reach the provider."""
+    task = asyncio.create_task(
+        runtime.generator.async_generate(
+            GenerationRequest(MSG, None), on_delta=on_delta
+        )
+    )
+    await asyncio.sleep(0)
+    return task
+
+
+async def test_identical_requests_share_one_call(
+    hass: HomeAssistant, fake_ai_task: FakeAITask, make_runtime
+) -> None:
+    """The second request joins the first instead of calling the provider."""
+    runtime = make_runtime()
+    entity = fake_ai_task.add_entity(PROVIDER, response_text="ok", delay=0.05)
+
+    first = await _start(runtime)
+    second = await _start(runtime)
+
+    assert (await first)["response_text"] == "ok"
+    assert (await second)["response_text"] == "ok"
+    assert entity.calls == 1
+
+
+async def test_streaming_request_joins_plain_one(
+    hass: HomeAssistant, fake_ai_task: FakeAITask, make_runtime
+) -> None:
+    """A streaming request joining a non-streaming one still gets the deltas."""
+    runtime = make_runtime()
+    chunks = structured_chunks("streamed", "", 4)
+    fake_ai_task.add_entity(PROVIDER, chunks=chunks, delay=0.01)
+    deltas: list[str] = []
+
+    first = await _start(runtime)
+    second = await _start(runtime, deltas.append)
+
+    assert (await first)["response_text"] == "streamed"
+    assert (await second)["response_text"] == "streamed"
+    assert deltas == chunks
+
+
+async def test_cancelling_first_request_keeps_joined_one(
+    hass: HomeAssistant, fake_ai_task: FakeAITask, make_runtime
+) -> None:
+    """Cancelling the request that started the generation only detaches it."""
+    runtime = make_runtime()
+    chunks = structured_chunks("shared", "a: 1", 4)
+    entity = fake_ai_task.add_entity(PROVIDER, chunks=chunks, delay=0.01)
+    first_deltas: list[str] = []
+    second_deltas: list[str] = []
+
+    first = await _start(runtime, first_deltas.append)
+    second = await _start(runtime, second_deltas.append)
+    await asyncio.sleep(0.03)
+    first.cancel()
+    await asyncio.gather(first, return_exceptions=True)
+
+    result = await second
+    assert first.cancelled()
+    assert result["response_text"] == "shared"
+    assert second_deltas == chunks
+    assert len(first_deltas) < len(chunks)
+    assert entity.calls == 1
+    assert entity.cancelled == 0
+
+
+async def test_cancelling_every_request_stops_the_call(
+    hass: HomeAssistant, fake_ai_task: FakeAITask, make_runtime
+) -> None:
+    """The provider call is cancelled and its slot freed once nobody waits."""
+    runtime = make_runtime()
+    entity = fake_ai_task.add_entity(PROVIDER, response_text="late", delay=10)
+
+    first = await _start(runtime)
+    second = await _start(runtime)
+    first.cancel()
+    await asyncio.gather(first, return_exceptions=True)
+    await asyncio.sleep(0)
+    assert entity.cancelled == 0
+
+    second.cancel()
+    await asyncio.gather(second, return_exceptions=True)
+    await hass.async_block_till_done()
+
+    assert entity.cancelled == 1
+    assert not runtime.generator._inflight
+    assert not runtime.limiter._queues
+
+    # A new identical request starts a fresh call
+    entity.delay = 0
+    assert (await (await _start(runtime)))["response_text"] == "late"
+    assert entity.calls == 2
+
+
+async def test_entry_unload_cancels_the_generation(
+    hass: HomeAssistant, fake_ai_task: FakeAITask, make_runtime
+) -> None:
+    """The shared generation belongs to the config entry."""
+    runtime = make_runtime()
+    entity = fake_ai_task.add_entity(PROVIDER, delay=10)
+
+    request = await _start(runtime)
+    await asyncio.sleep(0)
+    await runtime.entry._async_process_on_unload(hass)
+
+    with pytest.raises(GenerationError, match="cancelled"):
+        await request
+    assert entity.cancelled == 1
@@ -0,0 +1,110 @@
+"""Tests for the /config file index."""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+from unittest.mock import patch
+
+from homeassistant.core import HomeAssistant
+
+from custom_components.ai_code_task.helpers import FileIndex
+
+MODULE = "custom_components.ai_code_task.helpers.file_index"
+
+
+async def _build(hass: HomeAssistant, config_dir) -> FileIndex:
+    """Build the index of a directory."""
+    hass.config.config_dir = str(config_dir)
+    index = FileIndex(hass)
+    index.async_start()
+    await index._build_task
+    return index
+
+
+async def test_rescan_restats_files_written_in_place(
+    hass: HomeAssistant, tmp_path
+) -> None:
+    """Without watchdog, a followed file appended to is re-stated by the rescan.
+
+    Files that were not opened or followed are not stated at all.
+    """
+    log = tmp_path / "home-assistant.log"
+    log.write_text("started\n")
+    other = tmp_path / "automations.yaml"
+    other.write_text("[]\n")
+    (tmp_path / "packages").mkdir()
+    (tmp_path / "packages" / "lights.yaml").write_text("light:\n")
+    with patch(f"{MODULE}.Observer", None):
+        index = await _build(hass, tmp_path)
+    try:
+        index.async_watch(str(log))
+        dir_mtime = os.stat(tmp_path).st_mtime
+        for path in (log, other):
+            with path.open("a") as file:
+                file.write("more lines\n" * 10)
+            os.utime(path, (1000, 1000))
+        os.utime(tmp_path, (dir_mtime, dir_mtime))
+
+        with patch(f"{MODULE}.FILE_INDEX_RESCAN_BATCH", 1):
+            await index._async_rescan()
+
+        (item,) = [item for item in index.listing("") if item["name"] == log.name]
+        assert item["size"] == log.stat().st_size
+        assert item["mtime"] == 1000
+        ordered, _ = index.ordered_listing("", "mtime", False)
+        # Directories first, then the oldest file
+        assert ordered[1] is item
+        (item,) = [item for item in index.listing("") if item["name"] == other.name]
+        assert item["mtime"] != 1000
+    finally:
+        await index.async_stop()
+
+
+class _SlowObserver:
+    """A watchdog observer whose start blocks until released."""
+
+    instances: list[_SlowObserver] = []
+
+    def __init__(self) -> None:
+        self.starting = threading.Event()
+        self.release = threading.Event()
+        self.stopped = False
+        _SlowObserver.instances.append(self)
+
+    def schedule(self, *args, **kwargs) -> None:
+        """Accept the watch."""
+
+    def start(self) -> None:
+        """Block until the test releases the start."""
+        self.starting.set()
+        self.release.wait(5)
+
+    def stop(self) -> None:
+        """Record the stop."""
+        self.stopped = True
+
+    def join(self) -> None:
+        """Nothing to wait for."""
+
+
+async def test_stop_while_observer_starts(hass: HomeAssistant, tmp_path) -> None:
+    """An observer still starting when the index stops is stopped too."""
+    _SlowObserver.instances.clear()
+    hass.config.config_dir = str(tmp_path)
+    with patch(f"{MODULE}.Observer", _SlowObserver):
+        index = FileIndex(hass)
+        index.async_start()
+        while not _SlowObserver.instances:
+            await asyncio.sleep(0.01)
+        observer = _SlowObserver.instances[0]
+        await hass.async_add_executor_job(observer.starting.wait, 5)
+
+        stop = asyncio.create_task(index.async_stop())
+        await asyncio.sleep(0.01)
+        observer.release.set()
+        await stop
+
+    assert observer.stopped
+    assert not index.stats["watching"]
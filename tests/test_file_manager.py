@@ -0,0 +1,29 @@
+"""Tests for reading and editing files under /config."""
+
+from __future__ import annotations
+
+from homeassistant.core import HomeAssistant
+
+from custom_components.ai_code_task.helpers import FileManager
+
+
+async def test_read_keeps_line_endings_for_line_edits(
+    hass: HomeAssistant, tmp_path
+) -> None:
+    """Full reads keep "\\r", so line numbers match those of line edits."""
+    hass.config.config_dir = str(tmp_path)
+    path = tmp_path / "scripts.yaml"
+    path.write_bytes(b"one\r\ntwo\rstill two\r\nthree\r\n")
+    manager = FileManager(hass)
+
+    read = await manager.read_file("scripts.yaml")
+    assert read["content"] == "one\r\ntwo\rstill two\r\nthree\r\n"
+    lines = read["content"].split("\n")
+    assert lines[2] == "three\r"
+
+    version = await manager.patch_file(
+        "scripts.yaml", read["version"], edits=[{"start": 3, "end": 3, "text": "3\n"}]
+    )
+
+    assert version is not None
+    assert path.read_bytes() == b"one\r\ntwo\rstill two\r\n3\r\n"
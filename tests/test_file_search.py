@@ -0,0 +1,121 @@
+"""Tests for the full-text file search."""
+
+from __future__ import annotations
+
+import re
+import threading
+import time
+from unittest.mock import patch
+
+from homeassistant.core import HomeAssistant
+import pytest
+
+from custom_components.ai_code_task.helpers import FileIndex, FileManager
+from custom_components.ai_code_task.helpers.file_search import (
+    compile_query,
+    has_nested_quantifier,
+    search_text,
+)
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        "(a+)+",
+        r"(\w+\s?)*$",
+        "((ab)*c)+",
+        "(?:x*y){2,}",
+        "((a+)?)+",
+        "(a{2,})*",
+        "(a|aa)*c",
+        "(a|a)*c",
+        r"(\w|\d)*!",
+        r"(\s| )*x",
+        "((a|b))+",
+    ],
+)
+def test_nested_quantifier_rejected(query: str) -> None:
+    """Quantified or alternating groups repeated without bound are rejected."""
+    assert has_nested_quantifier(query)
+    with pytest.raises(re.error):
+        compile_query(query, True, False)
+    # The same text searched literally is fine
+    compile_query(query, False, False)
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        r"^\s+platform: \w+",
+        r"(\d+\.){3}\d+",
+        "(a+)?",
+        "(ab)+",
+        r"\(a+\)+",
+        "[(a+)]+",
+        r"{{ states\(",
+        r"(?P<key>\w+):",
+        "(yaml|yml)?",
+        "(on|off){2}",
+        "[a|b]+",
+        r"a|b+",
+    ],
+)
+def test_plain_regex_accepted(query: str) -> None:
+    """Bounded repeats, escaped groups and classes are not nested quantifiers."""
+    assert not has_nested_quantifier(query)
+    compile_query(query, True, False)
+
+
+def test_search_gives_up_at_deadline() -> None:
+    """The match loop checks the deadline and the stop event."""
+    text = "match\n" * 1000
+    pattern = compile_query("match", False, False)
+
+    hits, truncated, gave_up = search_text(text, pattern, 10000)
+    assert (len(hits), truncated, gave_up) == (1000, False, False)
+
+    hits, truncated, gave_up = search_text(
+        text, pattern, 10000, deadline=time.monotonic() - 1
+    )
+    assert (hits, truncated, gave_up) == ([], True, True)
+
+    stop = threading.Event()
+    stop.set()
+    assert search_text(text, pattern, 10000, stop=stop)[2]
+
+
+async def _search(hass: HomeAssistant, config_dir, max_results: int) -> tuple:
+    """Search every file of config_dir for "hit"."""
+    hass.config.config_dir = str(config_dir)
+    with patch("custom_components.ai_code_task.helpers.file_index.Observer", None):
+        index = FileIndex(hass)
+        index.async_start()
+        await index._build_task
+    results: list[dict] = []
+    try:
+        summary = await FileManager(hass, index).search_files(
+            compile_query("hit", False, False), "", 20, max_results, results.extend
+        )
+    finally:
+        await index.async_stop()
+    return summary, results
+
+
+@pytest.mark.parametrize(
+    ("max_results", "hits", "truncated"),
+    [(5, 5, False), (6, 5, False), (4, 4, True)],
+)
+async def test_search_truncated_only_when_hits_are_left_out(
+    hass: HomeAssistant, tmp_path, max_results: int, hits: int, truncated: bool
+) -> None:
+    """Exactly max_results hits is a complete result."""
+    (tmp_path / "a.yaml").write_text("hit\nhit\nhit\n")
+    (tmp_path / "b.yaml").write_text("miss\nhit\nhit\n")
+    (tmp_path / "c.yaml").write_text("nothing here\n")
+
+    summary, results = await _search(hass, tmp_path, max_results)
+
+    assert summary["hits"] == hits
+    assert summary["truncated"] is truncated
+    assert summary["timed_out"] == 0
+    assert sum(len(file["hits"]) for file in results) == hits
@@ -0,0 +1,251 @@
+"""Tests for provider fallback and hedging in the generation pipeline."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from unittest.mock import MagicMock
+
+from homeassistant.core import HomeAssistant
+import pytest
+
+from custom_components.ai_code_task.const import (
+    CONF_DEFAULT_PROVIDER,
+    CONF_FALLBACK_PROVIDERS,
+    CONF_HEDGE_PERCENTILE,
+    CONF_HEDGING,
+    CONF_REQUEST_TIMEOUT,
+    HEDGE_MIN_SAMPLES,
+)
+from custom_components.ai_code_task.helpers import GenerationError, GenerationRequest
+from custom_components.ai_code_task.helpers.provider_stats import OUTCOME_OK
+from custom_components.ai_code_task.websockets import ws_generate_stream
+
+from .fake_ai_task import FakeAITask, structured_chunks
+
+PRIMARY = "ai_task.primary"
+SECONDARY = "ai_task.secondary"
+TERTIARY = "ai_task.tertiary"
+
+
+async def _generate(runtime) -> dict:
+    """Run a generation against the primary provider."""
+    return await runtime.generator.async_generate(
+        GenerationRequest({"prompt": "Fix it", "provider_id": PRIMARY}, None)
+    )
+
+
+def _record_latency(runtime, provider_id: str, latency: float) -> None:
+    """Give a provider enough successful calls to be hedged."""
+    for _ in range(HEDGE_MIN_SAMPLES):
+        runtime.provider_stats.record(provider_id, OUTCOME_OK, latency)
+
+
+async def test_fallback_in_order(
+    hass: HomeAssistant, fake_ai_task: FakeAITask, make_runtime
+) -> None:
+    """A failing provider hands over to the next fallback, and only that one."""
+    runtime = make_runtime(**{CONF_FALLBACK_PROVIDERS: [SECONDARY, TERTIARY]})
+    primary = fake_ai_task.add_entity(PRIMARY, error=RuntimeError("overloaded"))
+    secondary = fake_ai_task.add_entity(SECONDARY, response_text="second")
+    tertiary = fake_ai_task.add_entity(TERTIARY, response_text="third")
+
+    result = await _generate(runtime)
+
+    assert result["provider_id"] == SECONDARY
+    assert result["response_text"] == "second"
+    assert (primary.calls, secondary.calls, tertiary.calls) == (1, 1, 0)
+
+
+async def test_all_providers_fail(
+    hass: HomeAssistant, fake_ai_task: FakeAITask, make_runtime
+) -> None:
+    """The error lists every provider in the order they were tried."""
+    runtime = make_runtime(**{CONF_FALLBACK_PROVIDERS: [SECONDARY, TERTIARY]})
+    for entity_id in (PRIMARY, SECONDARY, TERTIARY):
+        fake_ai_task.add_entity(entity_id, error=RuntimeError(f"{entity_id} down"))
+
+    with pytest.raises(GenerationError) as err:
+        await _generate(runtime)
+
+    assert err.value.code == "generation_failed"
+    message = str(err.value)
+    assert message.startswith("All providers failed: ")
+    assert message.index(PRIMARY) < message.index(SECONDARY) < message.index(TERTIARY)
+
+
+async def test_timeout_falls_back(
+    hass: HomeAssistant, fake_ai_task: FakeAITask, make_runtime
+) -> None:
+    """A provider that times out is cancelled and the fallback answers."""
+    runtime = make_runtime(
+        **{CONF_FALLBACK_PROVIDERS: [SECONDARY], CONF_REQUEST_TIMEOUT: 0.05}
+    )
+    primary = fake_ai_task.add_entity(PRIMARY, delay=10)
+    fake_ai_task.add_entity(SECONDARY, response_text="in time")
+
+    result = await _generate(runtime)
+
+    assert result["provider_id"] == SECONDARY
+    assert primary.cancelled == 1
+
+
+async def test_hedge_races_slow_provider(
+    hass: HomeAssistant, fake_ai_task: FakeAITask, make_runtime
+) -> None:
+    """A provider slower than its percentile is raced; the loser is cancelled."""
+    runtime = make_runtime(
+        **{
+            CONF_FALLBACK_PROVIDERS: [SECONDARY],
+            CONF_HEDGING: True,
+            CONF_HEDGE_PERCENTILE: 95,
+        }
+    )
+    _record_latency(runtime, PRIMARY, 0.02)
+    primary = fake_ai_task.add_entity(PRIMARY, response_text="slow", delay=10)
+    secondary = fake_ai_task.add_entity(SECONDARY, response_text="fast")
+
+    started = time.monotonic()
+    result = await _generate(runtime)
+
+    assert time.monotonic() - started < 1
+    assert result["provider_id"] == SECONDARY
+    assert result["response_text"] == "fast"
+    assert secondary.calls == 1
+    assert primary.cancelled == 1
+    assert not runtime.limiter._queues
+
+
+async def test_hedge_loser_is_the_secondary(
+    hass: HomeAssistant, fake_ai_task: FakeAITask, make_runtime
+) -> None:
+    """When the primary answers first after all, the hedge call is cancelled."""
+    runtime = make_runtime(**{CONF_FALLBACK_PROVIDERS: [SECONDARY], CONF_HEDGING: True})
+    _record_latency(runtime, PRIMARY, 0.02)
+    fake_ai_task.add_entity(PRIMARY, response_text="primary", delay=0.1)
+    secondary = fake_ai_task.add_entity(SECONDARY, delay=10)
+
+    result = await _generate(runtime)
+
+    assert result["provider_id"] == PRIMARY
+    assert secondary.calls == 1
+    assert secondary.cancelled == 1
+
+
+@pytest.mark.parametrize(
+    ("hedging", "samples"), [(False, HEDGE_MIN_SAMPLES), (True, HEDGE_MIN_SAMPLES - 1)]
+)
+async def test_no_hedge(
+    hass: HomeAssistant,
+    fake_ai_task: FakeAITask,
+    make_runtime,
+    hedging: bool,
+    samples: int,
+) -> None:
+    """Without hedging or enough latency samples, the primary is waited for."""
+    runtime = make_runtime(
+        **{CONF_FALLBACK_PROVIDERS: [SECONDARY], CONF_HEDGING: hedging}
+    )
+    for _ in range(samples):
+        runtime.provider_stats.record(PRIMARY, OUTCOME_OK, 0.01)
+    fake_ai_task.add_entity(PRIMARY, response_text="primary", delay=0.1)
+    secondary = fake_ai_task.add_entity(SECONDARY, response_text="secondary")
+
+    result = await _generate(runtime)
+
+    assert result["provider_id"] == PRIMARY
+    assert secondary.calls == 0
+
+
+async def test_fallback_stream_resets(
+    hass: HomeAssistant, fake_ai_task: FakeAITask, make_runtime
+) -> None:
+    """A fallback provider streams from a reset, also to requests joining later."""
+    runtime = make_runtime(**{CONF_FALLBACK_PROVIDERS: [SECONDARY]})
+    fake_ai_task.add_entity(
+        PRIMARY,
+        chunks=structured_chunks("half an ans", "", 6)[:2],
+        error=RuntimeError("stream broken"),
+    )
+    fallback = structured_chunks("fallback answer", "b: 2", 6)
+    fake_ai_task.add_entity(SECONDARY, chunks=fallback, delay=0.01)
+    first: list[str | None] = []
+    joined: list[str | None] = []
+
+    def _request(events: list[str | None]) -> asyncio.Task:
+        return asyncio.create_task(
+            runtime.generator.async_generate(
+                GenerationRequest({"prompt": "Fix it", "provider_id": PRIMARY}, None),
+                on_delta=events.append,
+                on_reset=lambda: events.append(None),
+            )
+        )
+
+    task = _request(first)
+    await asyncio.sleep(0.025)
+    late = _request(joined)
+
+    assert (await task)["response_text"] == "fallback answer"
+    assert (await late)["response_text"] == "fallback answer"
+    assert first.count(None) == 1
+    assert first[first.index(None) + 1 :] == fallback
+    assert None not in joined
+    assert joined == fallback
+
+
+async def test_hedge_stream_hands_over(
+    hass: HomeAssistant, fake_ai_task: FakeAITask, make_runtime
+) -> None:
+    """When the streaming primary fails, the hedge call is replayed in full."""
+    runtime = make_runtime(**{CONF_FALLBACK_PROVIDERS: [SECONDARY], CONF_HEDGING: True})
+    _record_latency(runtime, PRIMARY, 0.02)
+    fake_ai_task.add_entity(
+        PRIMARY,
+        chunks=structured_chunks("primary text", "", 3),
+        delay=0.01,
+        error=RuntimeError("stream broken"),
+    )
+    hedge = structured_chunks("hedge text", "", 5)
+    fake_ai_task.add_entity(SECONDARY, chunks=hedge, delay=0.04)
+    events: list[str | None] = []
+
+    result = await runtime.generator.async_generate(
+        GenerationRequest({"prompt": "Fix it", "provider_id": PRIMARY}, None),
+        on_delta=events.append,
+        on_reset=lambda: events.append(None),
+    )
+
+    assert result["provider_id"] == SECONDARY
+    assert events.count(None) == 1
+    assert events[events.index(None) + 1 :] == hedge
+
+
+async def test_generate_stream_reset_event(
+    hass: HomeAssistant, fake_ai_task: FakeAITask, make_runtime
+) -> None:
+    """The client is told to discard the failed provider's text."""
+    make_runtime(
+        **{CONF_DEFAULT_PROVIDER: PRIMARY, CONF_FALLBACK_PROVIDERS: [SECONDARY]}
+    )
+    fake_ai_task.add_entity(
+        PRIMARY,
+        chunks=structured_chunks("broken off", "", 4)[:5],
+        error=RuntimeError("stream broken"),
+    )
+    fake_ai_task.add_entity(SECONDARY, chunks=structured_chunks("whole", "c", 4))
+    connection = MagicMock()
+    connection.context.user_id = None
+    connection.subscriptions = {}
+
+    await ws_generate_stream.__wrapped__(
+        hass, connection, {"id": 1, "type": "ai_code_task/generate_stream"}
+    )
+
+    events = [call.args[0]["event"] for call in connection.send_message.call_args_list]
+    types = [event["type"] for event in events]
+    assert types.count("reset") == 1
+    after = events[types.index("reset") + 1 :]
+    assert "".join(e.get("response_text", "") for e in after[:-1]) == "whole"
+    assert "".join(e.get("response_code", "") for e in after[:-1]) == "c"
+    assert after[-1]["type"] == "done"
+    assert after[-1]["response_text"] == "whole"
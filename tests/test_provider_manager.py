@@ -0,0 +1,46 @@
+"""Tests for the provider index."""
+
+from __future__ import annotations
+
+from unittest.mock import patch
+
+from homeassistant.const import STATE_UNAVAILABLE
+from homeassistant.core import HomeAssistant
+
+from custom_components.ai_code_task.helpers import ProviderManager
+
+
+async def test_index_follows_provider_states(hass: HomeAssistant) -> None:
+    """Provider state changes update the index; other domains are not seen."""
+    hass.states.async_set("ai_task.first", "unknown", {"friendly_name": "First"})
+    manager = ProviderManager(hass, {})
+    manager.async_start()
+    assert manager.get_all_providers() == {"ai_task.first": "First"}
+
+    with patch.object(manager, "_refresh", wraps=manager._refresh) as refresh:
+        hass.states.async_set("light.kitchen", "on")
+        hass.states.async_set("sensor.power", "12")
+        await hass.async_block_till_done()
+        assert refresh.call_count == 0
+
+        hass.states.async_set("ai_task.second", "unknown", {"friendly_name": "Two"})
+        await hass.async_block_till_done()
+        hass.states.async_set("ai_task.first", STATE_UNAVAILABLE)
+        await hass.async_block_till_done()
+        assert refresh.call_count == 2
+
+    assert manager.get_provider_availability() == {
+        "ai_task.first": False,
+        "ai_task.second": True,
+    }
+    assert manager.get_provider_name("ai_task.second") == "Two"
+
+    hass.states.async_remove("ai_task.second")
+    await hass.async_block_till_done()
+    assert "ai_task.second" not in manager.get_all_providers()
+
+    manager.async_stop()
+    with patch.object(manager, "_refresh") as refresh:
+        hass.states.async_set("ai_task.third", "unknown")
+        await hass.async_block_till_done()
+        assert refresh.call_count == 0
@@ -0,0 +1,144 @@
+"""Tests for streamed generation and the fallback for non-streaming providers."""
+
+from __future__ import annotations
+
+from unittest.mock import MagicMock
+
+from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import HomeAssistantError
+import pytest
+
+from custom_components.ai_code_task.const import CONF_DEFAULT_PROVIDER
+from custom_components.ai_code_task.websockets import ws_cancel, ws_generate_stream
+
+from .fake_ai_task import FakeAITask, structured_chunks
+
+STREAMING = "ai_task.streaming"
+BLOCKING = "ai_task.blocking"
+
+
+def _connection() -> MagicMock:
+    """Return a websocket connection recording the messages sent."""
+    connection = MagicMock()
+    connection.context.user_id = None
+    connection.subscriptions = {}
+    return connection
+
+
+async def _generate_stream(
+    hass: HomeAssistant, provider_id: str, connection: MagicMock | None = None
+) -> list[dict]:
+    """Run a generate_stream command and return its events."""
+    connection = connection or _connection()
+    # The undecorated handler, so the command runs to completion here
+    await ws_generate_stream.__wrapped__(
+        hass,
+        connection,
+        {"id": 1, "type": "ai_code_task/generate_stream", "prompt": "Write it"},
+    )
+    connection.send_result.assert_called_once_with(1)
+    # Finished: a later cancel must not find the request
+    assert 1 not in connection.subscriptions
+    return [call.args[0]["event"] for call in connection.send_message.call_args_list]
+
+
+async def test_stream_forwards_chunks(
+    hass: HomeAssistant, fake_ai_task: FakeAITask, make_runtime
+) -> None:
+    """A provider with the streaming hook has its chunks forwarded as they arrive."""
+    runtime = make_runtime()
+    chunks = structured_chunks("Here you go", "a: 1", 7)
+    fake_ai_task.add_entity(STREAMING, chunks=chunks)
+
+    deltas: list[str] = []
+    response = await runtime.provider_manager.generate_response_stream(
+        STREAMING, "instructions", {}, deltas.append
+    )
+
+    assert deltas == chunks
+    assert response == "".join(chunks)
+
+
+async def test_stream_falls_back_to_service(
+    hass: HomeAssistant, fake_ai_task: FakeAITask, make_runtime
+) -> None:
+    """A provider without the hook is called through generate_data."""
+    runtime = make_runtime()
+    fake_ai_task.add_entity(BLOCKING, response_text="Done", response_code="b: 2")
+
+    deltas: list[str] = []
+    response = await runtime.provider_manager.generate_response_stream(
+        BLOCKING, "instructions", {}, deltas.append
+    )
+
+    assert deltas == []
+    assert response == {"data": {"response_text": "Done", "response_code": "b: 2"}}
+
+
+async def test_stream_error(
+    hass: HomeAssistant, fake_ai_task: FakeAITask, make_runtime
+) -> None:
+    """A failure while streaming is reported as a provider error."""
+    runtime = make_runtime()
+    fake_ai_task.add_entity(
+        STREAMING, chunks=['{"response_'], error=RuntimeError("connection reset")
+    )
+
+    with pytest.raises(HomeAssistantError, match="connection reset"):
+        await runtime.provider_manager.generate_response_stream(
+            STREAMING, "instructions", {}, lambda chunk: None
+        )
+
+
+async def test_generate_stream_delta_events(
+    hass: HomeAssistant, fake_ai_task: FakeAITask, make_runtime
+) -> None:
+    """Delta events carry the decoded text and code, followed by done."""
+    make_runtime(**{CONF_DEFAULT_PROVIDER: STREAMING})
+    fake_ai_task.add_entity(
+        STREAMING, chunks=structured_chunks("Line one\nLine two", "x: \"é\"", 5)
+    )
+
+    events = await _generate_stream(hass, STREAMING)
+
+    deltas = [event for event in events if event["type"] == "delta"]
+    assert len(deltas) > 1
+    assert "".join(d.get("response_text", "") for d in deltas) == "Line one\nLine two"
+    assert "".join(d.get("response_code", "") for d in deltas) == 'x: "é"'
+    done = events[-1]
+    assert done["type"] == "done"
+    assert done["response_text"] == "Line one\nLine two"
+    assert done["response_code"] == 'x: "é"'
+
+
+async def test_generate_stream_single_chunk_fallback(
+    hass: HomeAssistant, fake_ai_task: FakeAITask, make_runtime
+) -> None:
+    """A provider that cannot stream answers with a single done event."""
+    make_runtime(**{CONF_DEFAULT_PROVIDER: BLOCKING})
+    fake_ai_task.add_entity(BLOCKING, response_text="All at once", response_code="c")
+
+    events = await _generate_stream(hass, BLOCKING)
+
+    assert [event["type"] for event in events] == ["done"]
+    assert events[0]["response_text"] == "All at once"
+    assert events[0]["response_code"] == "c"
+    assert events[0]["provider_id"] == BLOCKING
+
+
+async def test_cancel_after_done(
+    hass: HomeAssistant, fake_ai_task: FakeAITask, make_runtime
+) -> None:
+    """A finished stream can no longer be cancelled."""
+    make_runtime(**{CONF_DEFAULT_PROVIDER: BLOCKING})
+    fake_ai_task.add_entity(BLOCKING, response_text="Finished")
+    connection = _connection()
+    await _generate_stream(hass, BLOCKING, connection)
+
+    ws_cancel(
+        hass, connection, {"id": 2, "type": "ai_code_task/cancel", "request_id": 1}
+    )
+
+    connection.send_error.assert_called_once_with(
+        2, "not_found", "No running generation with this id"
+    )